@@ -0,0 +1,462 @@
+"""
+benchmarks.py
+Timing suite for the forecast engine and the portfolio pipeline.
+
+Run with:  python benchmarks.py                           # every suite
+           python benchmarks.py --suite engine --quick
+           python benchmarks.py --suite imports              # import time + cold start
+           python benchmarks.py --suite api                  # HTTP throughput
+           python benchmarks.py --suite montecarlo           # process‑pool scaling
+           python benchmarks.py --suite precision            # float32 error vs float64
+           python benchmarks.py --json HEAD.json --compare main.json
+
+Results are written as JSON (one record per case, best-of-N seconds) so two
+commits can be compared; --compare exits non-zero when a case got slower
+than --threshold × its baseline.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import forecast_engine as fe
+from quantile_sketch import QuantileSketch
+
+ENGINE_CALCS = ["calc_uk_schools", "calc_mat_revenue", "calc_us_revenue", "calc_eal_revenue",
+                "calc_payroll", "calc_cogs", "calc_fixed_costs", "run_forecast"]
+ENTRY_IMPORTS = ["numpy", "pandas", "streamlit", "altair", "forecast_engine", "scenario_store",
+                 "portfolio_data"]
+
+
+# ── harness ───────────────────────────────────────────────────────────────────
+def bench(name: str, fn, repeat: int = 5, min_time: float = 0.05, **params) -> dict:
+    """Best/median seconds per call; loops fast calls until `min_time` per sample."""
+    fn()                                            # warm up
+    number, t = 1, 0.0
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        t = time.perf_counter() - t0
+        if t >= min_time or number >= 1_000_000:
+            break
+        number *= 10
+    samples = [t / number]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number)
+    return record(name, samples, number, **params)
+
+
+def record(name: str, samples: list, loops: int = 1, **params) -> dict:
+    label = ",".join(f"{k}={v}" for k, v in params.items())
+    rec = {
+        "case": f"{name}[{label}]" if label else name,
+        "name": name,
+        "params": params,
+        "best_s": min(samples),
+        "median_s": statistics.median(samples),
+        "loops": loops,
+    }
+    print(f"  {rec['case']:<58} {rec['best_s'] * 1e3:>12.3f} ms")
+    return rec
+
+
+# ── synthetic inputs ──────────────────────────────────────────────────────────
+def scenario_batch(k: int, seed: int = 0) -> dict:
+    """K scenarios jittered ±20 % around the dataroom defaults."""
+    rng = np.random.default_rng(seed)
+    batch = {}
+    for key, val in fe.DEFAULTS.items():
+        if isinstance(val, str):
+            batch[key] = np.full(k, val)
+        else:
+            batch[key] = val * rng.uniform(0.8, 1.2, k)
+    for key in ("starting_uk_schools", "mat_trials_per_quarter", "schools_per_mat",
+                "districts_per_quarter", "initial_employees", "q4_2025_hires", "quarterly_hires"):
+        batch[key] = np.round(batch[key])
+    return batch
+
+
+def synthetic_judgements(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Portfolio‑shaped judgement rows: ~48 cells per pupil, a few re‑marks each."""
+    rng = np.random.default_rng(seed)
+    pupils = max(rows // 60, 1)
+    cell = rng.integers(0, 48, rows)
+    purpose = np.array(["Narrative", "Persuasive", "Report", "Poetry"])[rng.integers(0, 4, rows)]
+    return pd.DataFrame({
+        "Pupil Name": pd.Series(rng.integers(0, pupils, rows)).map("Pupil {:06d}".format),
+        "Judgement (%)": pd.Series(rng.integers(0, 101, rows)).map("{}%".format),
+        "KS2 Standard": pd.Series(cell // 16).map("Standard {}".format),
+        "KS2 Statement": pd.Series(cell // 4).map("Statement {}".format),
+        "Purpose": purpose,
+        "Criterion": pd.Series(cell).map("Criterion {}".format),
+        "🤖 REASON": pd.Series(rng.integers(0, 200, rows)).map("Reason text {}".format),
+        "criteria guidance": pd.Series(cell).map("Guidance {}".format),
+    })
+
+
+# ── suites ────────────────────────────────────────────────────────────────────
+def suite_engine(quick: bool, max_cells: float) -> list:
+    periods = [13, 52] if quick else [13, 52, 520]
+    sizes = [1, 100, 10_000] if quick else [1, 100, 10_000, 100_000, 1_000_000]
+    out = []
+    for T in periods:
+        qtrs = fe.timeline(num_quarters=T)
+        for K in sizes:
+            if K * T > max_cells:
+                print(f"  (skip T={T}, K={K:,}: {K * T:,} cells > --max-cells)")
+                continue
+            p = {**fe.DEFAULTS, **scenario_batch(K)}
+            us = fe._quarter_index(p, "us_launch_quarter", qtrs)
+            eal = fe._quarter_index(p, "eal_launch_quarter", qtrs)
+            rev = fe.run_revenue(p, qtrs)["quarterly_rev"]
+            cases = {
+                "calc_uk_schools": lambda: fe.calc_uk_schools(p, T),
+                "calc_mat_revenue": lambda: fe.calc_mat_revenue(p, T),
+                "calc_us_revenue": lambda: fe.calc_us_revenue(p, T, us),
+                "calc_eal_revenue": lambda: fe.calc_eal_revenue(p, T, eal),
+                "calc_payroll": lambda: fe.calc_payroll(p, T),
+                "calc_cogs": lambda: fe.calc_cogs(p, rev),
+                "calc_fixed_costs": lambda: fe.calc_fixed_costs(p, T),
+                "run_forecast": lambda: fe.run_forecast(p, qtrs),
+            }
+            repeat = 3 if K * T > 1e6 else 5
+            for name in ENGINE_CALCS:
+                out.append(bench(f"engine.{name}", cases[name], repeat=repeat, T=T, K=K))
+    # what each page runs on a cold cache: one scenario from its preset
+    for name in fe.preset_names():
+        preset = fe.load_preset(name)
+        out.append(bench("engine.preset", lambda: fe.run_forecast(preset["params"], preset["quarters"]), preset=name))
+    return out
+
+
+def suite_mat(quick: bool, max_cells: float) -> list:
+    """MAT cohort engine as the number of cohorts (= quarters) grows."""
+    out = []
+    for T in ([13, 52, 208] if quick else [13, 52, 208, 520, 2_080]):
+        for K in (1, 1_000):
+            if K * T > max_cells:
+                continue
+            p = {**fe.DEFAULTS, **scenario_batch(K)}
+            out.append(bench("mat.calc_mat_revenue", lambda: fe.calc_mat_revenue(p, T), cohorts=T, K=K))
+    return out
+
+
+def suite_portfolio(quick: bool, rows: list) -> list:
+    import portfolio_data as pdat
+
+    sizes = rows or ([1_000, 10_000, 100_000] if quick else
+                     [1_000, 10_000, 100_000, 1_000_000, 10_000_000])
+    out = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f"judgements_{n}.csv")
+            synthetic_judgements(n).to_csv(path, index=False)
+            repeat = 3 if n >= 1_000_000 else 5
+
+            out.append(bench("portfolio.load", lambda: pdat.load_judgements(path), repeat=repeat, rows=n))
+            df = pdat.load_judgements(path)
+            out.append(bench("portfolio.reasons", lambda: pdat.reason_cells(df), repeat=repeat, rows=n))
+            reasons = pdat.reason_cells(df)
+            pupil = df["Pupil Name"].iloc[0]
+            out.append(bench("portfolio.pivot", lambda: pdat.pupil_pivot(df, reasons, pupil), rows=n))
+            pivot, rs, guidance = pdat.pupil_pivot(df, reasons, pupil)
+            out.append(bench("portfolio.style_render",
+                             lambda: pdat.portfolio_styler(pivot, rs, guidance).to_html(), rows=n))
+            out.append(bench("portfolio.index", lambda: pdat.PupilIndex(df), repeat=repeat, rows=n))
+    return out
+
+
+def importtime(code: str) -> list:
+    """(module, self s, cumulative s) rows from `python -X importtime -c code`."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                         capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if line.startswith("import time:") and "|" in line and "self" not in line:
+            own, cum, mod = line[len("import time:"):].split("|")
+            rows.append((mod.strip(), int(own) / 1e6, int(cum) / 1e6))
+    return rows
+
+
+def _run_page(script: str, env: dict) -> None:
+    code = ("from streamlit.testing.v1 import AppTest;"
+            f"at = AppTest.from_file({script!r}, default_timeout=120); at.run();"
+            "assert not at.exception, at.exception")
+    subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True)
+
+
+def suite_imports(quick: bool, max_cells: float) -> list:
+    """Fresh‑interpreter import cost per entry‑point dependency, then a cold
+    process rendering the dataroom once with and without STYLUS_COLD_START."""
+    repeat = 3 if quick else 5
+    out = []
+    for mod in ENTRY_IMPORTS:
+        samples = [importtime(f"import {mod}")[-1][2] for _ in range(repeat)]
+        out.append(record(f"import.{mod}", samples))
+
+    rows = {mod: (own, cum) for mod, own, cum in
+            importtime("import streamlit, pandas, altair, forecast_engine, scenario_store")}
+    print("  slowest imports (cumulative, one run):")
+    for mod, (own, cum) in sorted(rows.items(), key=lambda r: -r[1][1])[:12]:
+        print(f"    {mod:<40} {cum * 1e3:>8.1f} ms  (self {own * 1e3:.1f})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for cold in (0, 1):
+            env = {**os.environ, "STYLUS_STORE": tmp, "STYLUS_COLD_START": str(cold),
+                   "STREAMLIT_LOGGER_LEVEL": "error"}
+            out.append(bench("cold_start.dataroom",
+                             lambda: _run_page("stylus-dataroom-forecast.py", env),
+                             repeat=repeat, min_time=0, cold=cold))
+    return out
+
+
+def _post(port: int, path: str, body: bytes) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    try:
+        conn.request("POST", path, body, {"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    finally:
+        conn.close()
+
+
+def suite_api(quick: bool, max_cells: float) -> list:
+    """Requests/s through forecast_api under concurrent clients (one round =
+    `requests` calls spread over `clients` threads)."""
+    import forecast_api
+    from shared_cache import shared
+
+    server = forecast_api.make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    requests = 32 if quick else 128
+    rng = np.random.default_rng(0)
+    out = []
+    try:
+        cases = {
+            # a few distinct scenarios, so most single calls are cache hits
+            "api.forecast": ("/forecast", [
+                json.dumps({"params": {"starting_uk_schools": int(n)}}).encode()
+                for n in rng.integers(10, 14, requests)
+            ]),
+        }
+        for k in ([100, 1_000] if quick else [100, 1_000, 10_000]):
+            if k * 13 > max_cells:
+                continue
+            batch = {key: v.tolist() for key, v in scenario_batch(k).items()}
+            body = json.dumps({"params": batch, "lines": ["total_arr", "cumulative_cash"]}).encode()
+            cases[f"api.batch[K={k}]"] = ("/forecast/batch", [body] * (requests // 8))
+
+        for clients in (1, 4, 16):
+            for name, (path, bodies) in cases.items():
+                def round_trip():
+                    with ThreadPoolExecutor(clients) as pool:
+                        statuses = list(pool.map(lambda b: _post(port, path, b), bodies))
+                    assert all(s == 200 for s in statuses), statuses
+                base, _, extra = name.partition("[")
+                params = dict(p.split("=") for p in extra.rstrip("]").split(",") if p)
+                rec = bench(base, round_trip, repeat=3, min_time=0, clients=clients, **params)
+                rec["requests_per_s"] = len(bodies) / rec["best_s"]
+                print(f"    → {rec['requests_per_s']:,.1f} req/s")
+                out.append(rec)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shared().clear()
+    return out
+
+
+def suite_montecarlo(quick: bool, max_cells: float) -> list:
+    """Draws/s of monte_carlo.simulate as workers double up to the core count."""
+    import monte_carlo as mc
+
+    draws = 200_000 if quick else 2_000_000
+    counts = sorted({min(2 ** i, os.cpu_count()) for i in range(os.cpu_count().bit_length() + 1)})
+    out = []
+    for workers in counts:
+        def run():
+            mc.simulate(mc.EXAMPLE_SPEC, draws, workers=workers).close()
+        rec = bench("montecarlo.simulate", run, repeat=3, min_time=0, draws=draws, workers=workers)
+        rec["draws_per_s"] = draws / rec["best_s"]
+        print(f"    → {rec['draws_per_s']:,.0f} draws/s")
+        out.append(rec)
+
+    # compact storage: float32 paths, or none (moments only)
+    for dtype, keep in (("float32", True), ("float64", False)):
+        def run():
+            mc.simulate(mc.EXAMPLE_SPEC, draws, workers=counts[-1], dtype=dtype, keep_paths=keep).close()
+        rec = bench("montecarlo.simulate", run, repeat=3, min_time=0, draws=draws, workers=counts[-1],
+                    dtype=dtype, paths=keep)
+        rec["draws_per_s"] = draws / rec["best_s"]
+        print(f"    → {rec['draws_per_s']:,.0f} draws/s")
+        out.append(rec)
+
+    # runway & breakeven reductions over every draw
+    runway_draws = min(draws, 100_000)
+    with mc.simulate(mc.EXAMPLE_SPEC, runway_draws) as result:
+        out.append(bench("montecarlo.runway", lambda: result.runway(1_000_000), draws=runway_draws))
+
+        # streaming quantiles: sketching one chunk, and the merged sketch's
+        # P5–P95 against exact quantiles of the kept paths
+        block = np.array(result.values[:20_000])
+        rec = bench("montecarlo.sketch", lambda: QuantileSketch.of(block), draws=len(block),
+                    cells=block[0].size)
+        q = (0.05, 0.25, 0.5, 0.75, 0.95)
+        exact = np.quantile(result.values, q, axis=0)
+        spread = np.maximum(exact[-1] - exact[0], 1.0)
+        rec["max_err_of_p5_p95_range"] = float((np.abs(result.sketch.quantile(q) - exact) / spread).max())
+        rec["sketch_bytes"] = result.sketch.nbytes
+        print(f"    → P5–P95 within {rec['max_err_of_p5_p95_range']:.2%} of the band width, "
+              f"{rec['sketch_bytes'] / 1024:,.0f} KB of sketch")
+        out.append(rec)
+    return out
+
+
+def _rel_err(approx: np.ndarray, exact: np.ndarray) -> float:
+    """Worst error relative to each scenario's largest magnitude in the line
+    (plain relative error explodes where cash crosses zero); cells that
+    overflowed float32 are left to the overflow count."""
+    scale = np.maximum(np.abs(exact).max(axis=-1, keepdims=True), 1.0)
+    err = np.abs(approx.astype(np.float64) - exact) / scale
+    return float(err[np.isfinite(err)].max(initial=0.0))
+
+
+def suite_precision(quick: bool, max_cells: float) -> list:
+    """float32 result storage against float64 on the benchmark scenarios:
+    time, bytes, worst error on any line, and the error it leaves in the
+    reductions read off the stored results (quantiles, means, runway).
+    Long horizons compound EAL growth past float32's 3.4e38 – those cells
+    are counted as overflow rather than silently folded into the error."""
+    grid = [(13, 10_000), (40, 10_000)]                     # 40 quarters = 120 months
+    if not quick:
+        grid += [(13, 100_000), (40, 100_000), (120, 10_000)]
+
+    def cases():
+        for name in fe.preset_names():
+            preset = fe.load_preset(name)
+            yield f"preset={name}", preset["params"], preset["quarters"]
+        for T, K in grid:
+            if K * T <= max_cells:
+                yield f"T={T},K={K}", {**fe.DEFAULTS, **scenario_batch(K)}, fe.timeline(num_quarters=T)
+
+    out = []
+    for label, p, qtrs in cases():
+        with np.errstate(over="ignore", invalid="ignore"):     # overflow is counted below
+            exact = fe.run_forecast(p, qtrs)
+            compact = fe.run_forecast(p, qtrs, dtype=np.float32)
+            params = dict(kv.split("=") for kv in label.split(","))
+            rec = bench("precision.run_forecast", lambda: fe.run_forecast(p, qtrs, dtype=np.float32),
+                        repeat=3, dtype="float32", **params)
+            overflow = sum(int(np.isinf(v).sum()) for v in compact.values())
+
+            errs = {line: _rel_err(compact[line], exact[line]) for line in exact}
+            worst = max(errs, key=errs.get)
+            q = (0.1, 0.5, 0.9)
+            q64 = np.quantile(exact["total_arr"], q, axis=0)
+            rw64 = fe.runway(exact["cumulative_cash"], 1_000_000)
+            rw32 = fe.runway(compact["cumulative_cash"], 1_000_000)
+            rec.update({
+                "bytes_float64": sum(v.nbytes for v in exact.values()),
+                "bytes_float32": sum(v.nbytes for v in compact.values()),
+                "max_rel_err": errs[worst],
+                "worst_line": worst,
+                "overflow_cells": overflow,
+                "quantile_rel_err": _rel_err(np.quantile(compact["total_arr"], q, axis=0), q64),
+                "mean_rel_err": _rel_err(compact["cumulative_cash"].mean(axis=0),
+                                         exact["cumulative_cash"].mean(axis=0)),
+                "runway_mismatch": float(np.mean(rw32["first_negative_quarter"] != rw64["first_negative_quarter"])),
+                "min_cash_rel_err": _rel_err(rw32["min_cash"], rw64["min_cash"]),
+            })
+            print(f"    → {rec['bytes_float64'] / 2**20:,.1f} → {rec['bytes_float32'] / 2**20:,.1f} MB, "
+                  f"worst {rec['max_rel_err']:.1e} ({worst}), quantiles {rec['quantile_rel_err']:.1e}, "
+                  f"mean {rec['mean_rel_err']:.1e}, runway quarter differs in {rec['runway_mismatch']:.2%}"
+                  + (f", {overflow:,} cells overflowed" if overflow else ""))
+        out.append(rec)
+    return out
+
+
+SUITES = {"engine": suite_engine, "mat": suite_mat, "portfolio": suite_portfolio,
+          "imports": suite_imports, "api": suite_api, "montecarlo": suite_montecarlo,
+          "precision": suite_precision}
+
+
+# ── reporting ─────────────────────────────────────────────────────────────────
+def meta() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> int:
+    with open(baseline_path) as f:
+        base = {r["case"]: r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nvs {baseline_path} (regression if > {threshold:.2f}×)")
+    for r in results:
+        if r["case"] not in base:
+            continue
+        ratio = r["best_s"] / base[r["case"]]["best_s"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"  {r['case']:<58} {ratio:>6.2f}×{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="stylus performance benchmarks")
+    ap.add_argument("--suite", action="append", choices=list(SUITES), help="repeatable (default: all)")
+    ap.add_argument("--quick", action="store_true", help="smaller grids for a fast check")
+    ap.add_argument("--max-cells", type=float, default=2e7, help="skip engine cases with K×T above this")
+    ap.add_argument("--rows", type=int, action="append", help="portfolio row counts (repeatable)")
+    ap.add_argument("--json", default="bench_results.json", help="where to write results")
+    ap.add_argument("--compare", help="baseline JSON from another commit")
+    ap.add_argument("--threshold", type=float, default=1.25)
+    args = ap.parse_args(argv)
+
+    results = []
+    for name in args.suite or list(SUITES):
+        print(f"{name}:")
+        if name == "portfolio":
+            results += suite_portfolio(args.quick, args.rows)
+        else:
+            results += SUITES[name](args.quick, args.max_cells)
+
+    with open(args.json, "w") as f:
+        json.dump({"meta": meta(), "results": results}, f, indent=1)
+    print(f"\n{len(results)} cases → {args.json}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""
+forecast_api.py — the stylus forecast engine over local HTTP
+Run with:  python forecast_api.py --port 8765
+
+  GET  /health            → {"status": "ok", "cache": {...}}
+  POST /forecast          {"params": {...}}                       one scenario
+  POST /forecast/batch    {"scenarios": [{...}, ...]}             K scenarios
+                       or {"params": {"lever": [K values], ...}}  (columnar)
+  POST /runway            same body as /forecast/batch, plus "opening_cash"
+                          (a number or K numbers) → runway & breakeven per scenario
+
+Scenarios may carry "pricing": {segment: {"from": [...], "price": [...]}} to
+override the tenure price schedules (forecast_engine.PRICING); columnar
+prices may be [K][bands].  "headcount_plan": {"start": [...], "salary": [...],
+"on_cost": [...], "count": [...]} replaces the hiring levers with a role table
+(see forecast_engine.HEADCOUNT_PLAN_COLUMNS).
+
+Optional body fields: "lines" (output keys to return, default all),
+"base_date" ("2025-10-01") and "num_quarters" (13) for the timeline.
+Levers left out take the dataroom defaults.
+
+Results are columnar: {"quarters": [...], "lines": {key: [T] or [K][T]}}.
+Add ?format=npz to the batch endpoint for an .npz of (K, T) float64 arrays
+(plus "quarters") instead of JSON; &dtype=float32 halves the download (the
+engine still computes in float64).  Single scenarios are served from the
+process‑wide shared cache.
+
+/runway returns {"quarters", "k", "runway": {key: [K]}, "summary": {...}}:
+quarter fields are timeline indices (-1 = not within the horizon), months are
+null when cash never runs out, and "summary" gives P10/P50/P90 and the share
+of scenarios that stay cash‑positive.
+
+Errors are JSON too: {"error": "..."} with 400 for a bad request, 404 for an
+unknown path and 500 if evaluation fails unexpectedly.
+"""
+
+import argparse
+import io
+import json
+import os
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from forecast_engine import (
+    DEFAULTS, PRECISIONS, PRICING, align_plans, run_forecast, runway, stack_params, timeline,
+)
+from scenario_store import result_key
+from shared_cache import shared
+
+MAX_BATCH = int(os.environ.get("STYLUS_API_MAX_BATCH", 100_000))
+MAX_QUARTERS = 400
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _timeline(body: dict) -> list:
+    n = body.get("num_quarters", 13)
+    if not isinstance(n, int) or not 1 <= n <= MAX_QUARTERS:
+        raise BadRequest(f"num_quarters must be an integer in 1..{MAX_QUARTERS}")
+    base = body.get("base_date", "2025-10-01")
+    try:
+        if not isinstance(base, str) or pd.isna(pd.Timestamp(base)):
+            raise ValueError("expected a date such as 2025-10-01")
+        return timeline(base, n)
+    except ValueError as e:                  # pandas' DateParseError / OutOfBoundsDatetime
+        raise BadRequest(f"invalid base_date {base!r}: {e}") from e
+
+
+def _check_levers(params: dict) -> None:
+    unknown = sorted(set(params) - set(DEFAULTS) - {"pricing", "headcount_plan"})
+    if unknown:
+        raise BadRequest(f"unknown levers: {', '.join(unknown)}")
+    pricing = params.get("pricing", {})
+    if not isinstance(pricing, dict) or not all(
+        isinstance(s, dict) and {"from", "price"} <= set(s) for s in pricing.values()
+    ):
+        raise BadRequest('"pricing" must map segments to {"from": [...], "price": [...]}')
+    unknown = sorted(set(pricing) - set(PRICING))
+    if unknown:
+        raise BadRequest(f"unknown pricing segments: {', '.join(unknown)}")
+    plan = params.get("headcount_plan", {"start": [], "salary": []})
+    if not isinstance(plan, dict) or not {"start", "salary"} <= set(plan):
+        raise BadRequest('"headcount_plan" needs at least "start" and "salary" columns')
+
+
+def _lines(body: dict, result: dict) -> list:
+    lines = body.get("lines")
+    if lines is not None and not (isinstance(lines, list) and all(isinstance(k, str) for k in lines)):
+        raise BadRequest('"lines" must be a list of output keys, e.g. ["total_arr"]')
+    lines = lines or list(result)
+    missing = [k for k in lines if k not in result]
+    if missing:
+        raise BadRequest(f"unknown lines: {', '.join(missing)}")
+    return lines
+
+
+def forecast_one(body: dict) -> dict:
+    params = body.get("params", {})
+    if not isinstance(params, dict):
+        raise BadRequest('"params" must be an object')
+    _check_levers(params)
+    qtrs = _timeline(body)
+    params = {**DEFAULTS, **params}
+    try:
+        result = shared().get_or_compute(
+            ("result", result_key(params, qtrs)), lambda: run_forecast(params, qtrs)
+        )
+    except (TypeError, ValueError, KeyError) as e:
+        raise BadRequest(f"could not evaluate scenario: {e}") from e
+    return {"quarters": qtrs, "lines": {k: result[k][0].tolist() for k in _lines(body, result)}}
+
+
+def _check_batch(k: int) -> None:
+    if k > MAX_BATCH:
+        raise BadRequest(f"batch of {k:,} exceeds the {MAX_BATCH:,} limit")
+
+
+def forecast_batch(body: dict, dtype=np.float64):
+    """(quarters, {line: (K, T) array}) for a batch request."""
+    qtrs = _timeline(body)
+    if "scenarios" in body:
+        scenarios = body["scenarios"]
+        if not isinstance(scenarios, list) or not scenarios:
+            raise BadRequest('"scenarios" must be a non-empty list')
+        _check_batch(len(scenarios))
+        for s in scenarios:
+            if not isinstance(s, dict):
+                raise BadRequest('each scenario must be an object')
+            _check_levers(s)
+        try:
+            params = stack_params(align_plans([{**DEFAULTS, **s} for s in scenarios], len(qtrs)))
+        except (TypeError, ValueError, KeyError) as e:
+            raise BadRequest(f"could not stack scenarios: {e}") from e
+    elif isinstance(body.get("params"), dict):
+        _check_levers(body["params"])
+        _check_batch(max((len(v) for v in body["params"].values() if isinstance(v, list)), default=1))
+        params = {key: v if isinstance(v, dict) else np.asarray(v) for key, v in body["params"].items()}
+        sizes = {v.shape[0] for v in params.values() if not isinstance(v, dict) and v.ndim == 1}
+        if len(sizes) > 1:
+            raise BadRequest("columnar params must all have the same length")
+    else:
+        raise BadRequest('batch needs "scenarios" or columnar "params"')
+
+    try:
+        result = run_forecast(params, qtrs, dtype=dtype)
+    except (TypeError, ValueError, KeyError) as e:
+        raise BadRequest(f"could not evaluate batch: {e}") from e
+    return qtrs, {key: result[key] for key in _lines(body, result)}
+
+
+def _finite(v):
+    return float(v) if np.isfinite(v) else None
+
+
+def runway_batch(body: dict) -> dict:
+    qtrs, lines = forecast_batch({**body, "lines": ["cumulative_cash"]})
+    cash = lines["cumulative_cash"]
+    try:
+        opening = np.broadcast_to(np.asarray(body.get("opening_cash", 0.0), dtype=float), cash.shape[:1])
+    except ValueError as e:
+        raise BadRequest('"opening_cash" must be a number or one number per scenario') from e
+    out = runway(cash, opening)
+
+    summary = {"share_never_negative": float((out["first_negative_quarter"] < 0).mean())}
+    for key in ("min_cash", "runway_months", "cash_out_months"):
+        q = np.quantile(out[key], (0.1, 0.5, 0.9), method="lower")
+        summary[key] = {"p10": _finite(q[0]), "p50": _finite(q[1]), "p90": _finite(q[2])}
+    return {"quarters": qtrs, "k": len(cash), "summary": summary,
+            "runway": {key: [_finite(v) if v.dtype.kind == "f" else int(v) for v in vals]
+                       for key, vals in out.items()}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "stylus-forecast/1"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):       # quiet unless --verbose
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status: int, payload: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _json(self, status: int, obj) -> None:
+        self._send(status, json.dumps(obj, separators=(",", ":")).encode(), "application/json")
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self._json(200, {"status": "ok", "cache": shared().stats()})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise BadRequest("request body must be a JSON object")
+
+            if url.path == "/forecast":
+                self._json(200, forecast_one(body))
+            elif url.path == "/forecast/batch":
+                query = parse_qs(url.query)
+                dtype = PRECISIONS.get(query.get("dtype", ["float64"])[0])
+                if dtype is None:
+                    raise BadRequest(f"dtype must be one of {', '.join(PRECISIONS)}")
+                qtrs, lines = forecast_batch(body, dtype)
+                if query.get("format") == ["npz"]:
+                    buf = io.BytesIO()
+                    np.savez(buf, quarters=np.array(qtrs), **lines)
+                    self._send(200, buf.getvalue(), "application/x-npz")
+                else:
+                    self._json(200, {"quarters": qtrs, "k": len(next(iter(lines.values()))),
+                                     "lines": {key: v.tolist() for key, v in lines.items()}})
+            elif url.path == "/runway":
+                self._json(200, runway_batch(body))
+            else:
+                self._json(404, {"error": "not found"})
+        except json.JSONDecodeError as e:
+            self._json(400, {"error": f"invalid JSON: {e}"})
+        except BadRequest as e:
+            self._json(400, {"error": str(e)})
+        except Exception as e:                # answer rather than drop the connection
+            traceback.print_exc()
+            self._json(500, {"error": f"internal error: {type(e).__name__}: {e}"})
+
+
+class ForecastServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128      # listen backlog; the default of 5 resets bursts of clients
+    verbose = False
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765, verbose: bool = False) -> ForecastServer:
+    server = ForecastServer((host, port), Handler)
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="stylus forecast engine over HTTP")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--verbose", action="store_true", help="log every request")
+    args = ap.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.verbose)
+    print(f"stylus forecast API on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
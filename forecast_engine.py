@@ -0,0 +1,719 @@
+"""
+forecast_engine.py
+Vectorised stylus revenue & cash-flow model (the dataroom forecast).
+
+Every lever may be a scalar or a 1-D array of length K.  Results come back
+as (K, T) arrays, so one call evaluates a whole batch of scenarios; a plain
+dict of scalars is simply a batch of one.
+"""
+
+import json
+import os
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+# Part of every cached result's key (scenario_store.result_key): bump it whenever
+# the same levers start producing different figures, so results cached on disk
+# by an older engine are recomputed rather than served.
+#   2 – tenure price schedules (PRICING)     3 – UK schools priced by vintage
+#   4 – role-based headcount plans           5 – runway lines; shared presets
+#   6 – UK pricing back to model_year by default (vintage is opt-in)
+ENGINE_VERSION = 6
+
+# ----------------------------------------------------------------------------------
+# Default parameters
+# ----------------------------------------------------------------------------------
+DEFAULTS = {
+    # Revenue
+    "starting_uk_schools": 25,
+    "hyper_growth_factor": 4.0,
+    "taper_growth_rate": 0.50,
+    "mat_trials_per_quarter": 20,
+    "mat_conversion_rate": 0.70,
+    "schools_per_mat": 10,
+    "mat_annual_churn": 0.20,
+    "us_launch_quarter": "Q1 2027",
+    "districts_per_quarter": 5,
+    "eal_launch_quarter": "Q1 2028",
+    "initial_eal_learners": 0.03 * 1_000_000,
+    "eal_growth_multiplier": 1.75,
+    "uk_pricing_mode": "model_year",     # or "vintage": each school priced by its own tenure
+    # Costs
+    "initial_employees": 3,
+    "q4_2025_hires": 3,
+    "quarterly_hires": 1,
+    "avg_new_hire_salary": 80_000,
+    "salary_inflation": 0.04,
+    "sales_marketing_pct": 0.15,
+    "api_cost_year1": 0.20,
+    "api_cost_year2": 0.15,
+    "api_cost_year3": 0.10,
+    "infrastructure_pct": 0.02,
+    "support_pct": 0.05,
+    "payment_processing_pct": 0.02,
+    "other_variable_pct": 0.00,
+    "office_rent_monthly": 10_000,
+    "other_opex_monthly": 10_000,
+    "operational_inflation": 0.15,
+    "rd_quarterly": 100_000,
+    "us_launch_cost": 250_000,
+    "eal_launch_cost": 750_000,
+}
+
+# Levers that move revenue lines; the rest only move costs (run_costs)
+REVENUE_LEVERS = list(DEFAULTS)[:list(DEFAULTS).index("initial_employees")]
+COST_LEVERS = [k for k in DEFAULTS if k not in REVENUE_LEVERS]
+
+KNOWN_SALARIES = [100_000, 100_000, 90_000, 90_000]
+ON_COST = 1.15                 # NI + pension assumed 15 %
+
+# Headcount plan: params["headcount_plan"] = {column: [one value per role]}.
+# "start" is the quarter index on the timeline (0 = first quarter; earlier
+# starts are already on payroll), "salary" the annual salary at today's prices,
+# "on_cost" the multiplier for NI + pension (default ON_COST) and "count" the
+# number of people hired into the role (default 1).  Any column may be (K, R)
+# to run a batch of hiring scenarios; without a plan the hiring levers apply.
+HEADCOUNT_PLAN_COLUMNS = ("role", "start", "salary", "on_cost", "count")
+UK_BASELINE_ARR = 50_000       # Q3 2025 revenue carried into the first ARR quarters
+
+# Pricing schedules: segment → tenure bands.  "from" is the tenure (quarters of
+# service) at which each band starts, "price" the annual price in that band.
+# Override any segment per scenario with params["pricing"] = {segment: {...}};
+# prices may be length-K arrays to price a batch differently.
+PRICING = {
+    "uk_school":   {"from": [0, 4, 8], "price": [5_000, 10_000, 15_000]},
+    "mat_school":  {"from": [0, 4, 8], "price": [5_000, 10_000, 15_000]},
+    "us_district": {"from": [0, 4],    "price": [100_000, 150_000]},
+    "eal_learner": {"from": [0],       "price": [30]},
+}
+
+# Output key → column label, in the order the report tables use
+REVENUE_COLUMNS = {
+    "uk_arr": "UK Schools",
+    "mat_arr": "MATs",
+    "us_arr": "US Districts",
+    "eal_arr": "EAL",
+    "total_arr": "Total",
+}
+CASH_COLUMNS = {
+    "total_arr": "ARR",
+    "quarterly_rev": "Quarterly Revenue",
+    "api": "API / AI",
+    "infra": "Infrastructure",
+    "support": "Support",
+    "payment": "Payment Processing",
+    "other_var": "Other Variable",
+    "cogs": "Total COGS",
+    "gross_profit": "Gross Profit",
+    "payroll": "Payroll",
+    "sales_marketing": "Sales & Marketing",
+    "office_rent": "Office Rent",
+    "other_opex": "Other OpEx",
+    "rd": "R&D",
+    "expansion": "Expansion",
+    "operating_cash": "Operating Cash",
+    "cumulative_cash": "Cumulative Cash",
+}
+
+# ----------------------------------------------------------------------------------
+# Timeline helpers
+# ----------------------------------------------------------------------------------
+
+def quarter_to_date(qstr: str) -> pd.Timestamp:
+    q, year = qstr.split()
+    month = (int(q[1]) - 1) * 3 + 1
+    return pd.Timestamp(f"{year}-{month:02d}-01")
+
+def date_to_quarter(date: pd.Timestamp) -> str:
+    return f"Q{((date.month - 1)//3) + 1} {date.year}"
+
+def timeline(base_date: str = "2025-10-01", num_quarters: int = 13) -> list:
+    """Quarter labels, e.g. Q4 2025 … Q4 2028 for the dataroom defaults."""
+    base = pd.Timestamp(base_date)
+    return [date_to_quarter(base + pd.DateOffset(months=3*i)) for i in range(num_quarters)]
+
+# ----------------------------------------------------------------------------------
+# Presets (presets/<name>.json: a page's timeline and its levers that differ
+# from DEFAULTS)
+# ----------------------------------------------------------------------------------
+
+PRESET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presets")
+
+def preset_names() -> list:
+    return sorted(f[:-5] for f in os.listdir(PRESET_DIR) if f.endswith(".json"))
+
+def load_preset(name: str) -> dict:
+    """{"description", "timeline", "quarters", "params"} for a preset; params
+    are complete (DEFAULTS filled in) and ready for run_forecast."""
+    with open(os.path.join(PRESET_DIR, f"{name}.json")) as f:
+        preset = json.load(f)
+    overrides = preset.get("params", {})
+    unknown = sorted(set(overrides) - set(DEFAULTS) - {"pricing", "headcount_plan"})
+    if unknown:
+        raise ValueError(f"preset {name!r} sets unknown levers: {', '.join(unknown)}")
+    return {
+        "description": preset.get("description", ""),
+        "timeline": preset["timeline"],
+        "quarters": timeline(**preset["timeline"]),
+        "params": {**DEFAULTS, **overrides},
+    }
+
+# ----------------------------------------------------------------------------------
+# Parameter plumbing
+# ----------------------------------------------------------------------------------
+
+def _lever(p: dict, key: str) -> np.ndarray:
+    """Lever as a (K, 1) float column so it broadcasts against (K, T)."""
+    return np.asarray(p[key], dtype=float).reshape(-1, 1)
+
+def _quarter_index(p: dict, key: str, qtrs: list) -> np.ndarray:
+    """Launch-quarter label(s) → (K, 1) period index; beyond the horizon → T."""
+    idx = pd.Index(qtrs).get_indexer(np.atleast_1d(p[key]))
+    return np.where(idx < 0, len(qtrs), idx).reshape(-1, 1)
+
+def _ages(start: np.ndarray, T: int) -> np.ndarray:
+    """Quarters since `start` for each period (negative before it)."""
+    return np.arange(T) - start
+
+def stack_params(scenarios: list) -> dict:
+    """List of parameter dicts → one dict of length-K arrays (a batch).
+
+    Every lever any scenario sets is stacked; scenarios without it take the
+    default.  "pricing" is completed per scenario from PRICING, so a saved
+    schedule on one scenario prices only that one.  Headcount plans must be
+    on every scenario or none (align_plans pads a mix).
+    """
+    if not scenarios:
+        raise ValueError("no scenarios to stack")
+    out = {}
+    for k in dict.fromkeys(k for s in scenarios for k in s):
+        if k == "pricing":
+            out[k] = _stack([{**PRICING, **s.get("pricing", {})} for s in scenarios])
+        elif k == "headcount_plan":
+            if not all(k in s for s in scenarios):
+                raise ValueError("headcount plans must be on every scenario or none (see align_plans)")
+            out[k] = _stack([s[k] for s in scenarios])
+        elif k in DEFAULTS:
+            out[k] = _stack([s.get(k, DEFAULTS[k]) for s in scenarios])
+        else:
+            raise ValueError(f"unknown lever {k!r}")
+    return out
+
+def _stack(values: list):
+    if isinstance(values[0], dict):          # e.g. pricing schedules
+        return {k: _stack([v[k] for v in values]) for k in values[0]}
+    return np.array(values)
+
+def _schedule(p: dict, segment: str) -> dict:
+    return p.get("pricing", {}).get(segment, PRICING[segment])
+
+def _bands(schedule: dict):
+    """(band starts (B,), prices (B,) or (K, B)) of a schedule.
+
+    Bands must start at tenure 0, rise strictly and have one price each;
+    searchsorted would otherwise price some tenures from the wrong band.
+    """
+    starts = np.asarray(schedule["from"])
+    if starts.ndim == 2:                      # stacked batch: bands must agree
+        if (starts != starts[:1]).any():
+            raise ValueError("pricing bands ('from') must be the same across a batch")
+        starts = starts[0]
+    prices = np.asarray(schedule["price"], dtype=float)
+    if starts.ndim != 1 or not len(starts):
+        raise ValueError(f"pricing 'from' must be a non-empty list of band starts, got {starts.tolist()}")
+    if prices.shape[-1:] != starts.shape:
+        raise ValueError(f"pricing has {len(starts)} bands ('from') but prices of shape {prices.shape}")
+    if starts[0] != 0:
+        raise ValueError(f"pricing bands must start at tenure 0, got 'from' {starts.tolist()}")
+    if (np.diff(starts) <= 0).any():
+        raise ValueError(f"pricing band starts must be strictly ascending, got 'from' {starts.tolist()}")
+    return starts, prices
+
+def annual_price(schedule: dict, tenure) -> np.ndarray:
+    """Annual price at each tenure (quarters of service); 0 before the first band.
+
+    Prices of shape (B,) follow the shape of `tenure`; a batch of schedules
+    with (K, B) prices gives (K, T) for tenure of shape (T,) or (K, T).
+    """
+    starts, prices = _bands(schedule)
+    band = np.searchsorted(starts, tenure, side="right") - 1
+    if prices.ndim == 1:
+        return np.where(band >= 0, prices[np.maximum(band, 0)], 0.0)
+    band = np.broadcast_to(band, (prices.shape[0], np.shape(band)[-1]))
+    return np.where(band >= 0, np.take_along_axis(prices, np.maximum(band, 0), axis=1), 0.0)
+
+def _take(table: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    """table[..., idx] row by row, for (T,) or (K, T) tables and (K, T) indices."""
+    table = np.atleast_2d(table)
+    shape = np.broadcast_shapes(table.shape[:1] + idx.shape[1:], idx.shape)
+    return np.take_along_axis(np.broadcast_to(table, (shape[0], table.shape[1])),
+                              np.broadcast_to(idx, shape), axis=1)
+
+# ----------------------------------------------------------------------------------
+# Revenue engines
+# ----------------------------------------------------------------------------------
+
+UK_PRICING_MODES = ("vintage", "model_year")
+
+def _uk_count(p: dict, T: int) -> np.ndarray:
+    start = _lever(p, "starting_uk_schools")
+    hyper = _lever(p, "hyper_growth_factor")
+    growth_q = (1 + _lever(p, "taper_growth_rate")) ** 0.25
+
+    # hyper-growth for 2 years, then compound on last quarter's whole schools
+    count = start * hyper ** (np.arange(T) / 4)
+    for i in range(8, T):
+        count[:, i] = np.floor(count[:, i-1]) * growth_q[:, 0]
+    return count
+
+def _lagged(a: np.ndarray, lag: int) -> np.ndarray:
+    """a shifted `lag` quarters later along the last axis, zeros before."""
+    out = np.zeros_like(a)
+    if lag < a.shape[-1]:
+        out[..., lag:] = a[..., :a.shape[-1] - lag]
+    return out
+
+def _vintage_billing(count: np.ndarray, schedule: dict) -> np.ndarray:
+    """Annual billing when each quarter's net-new schools age through the bands.
+
+    Schools with at least `s` quarters of tenure in quarter i are those counted
+    by quarter i - s, so band b holds count[i - from_b] - count[i - from_b+1].
+    """
+    starts, prices = _bands(schedule)
+    billed = np.zeros_like(count)
+    for b, start in enumerate(starts):
+        upper = _lagged(count, int(start))
+        lower = _lagged(count, int(starts[b + 1])) if b + 1 < len(starts) else 0.0
+        billed += (prices[b] if prices.ndim == 1 else prices[:, b:b+1]) * (upper - lower)
+    return billed
+
+def calc_uk_schools(p: dict, T: int):
+    count = _uk_count(p, T)
+    schedule = _schedule(p, "uk_school")
+    mode = np.asarray(p["uk_pricing_mode"]).reshape(-1, 1)
+    unknown = set(mode.ravel()) - set(UK_PRICING_MODES)
+    if unknown:
+        raise ValueError(f"unknown uk_pricing_mode {sorted(map(str, unknown))}; expected one of {UK_PRICING_MODES}")
+
+    # "vintage": each school priced by its own tenure; "model_year": the whole
+    # base moves up a tier together each model year
+    vintage = _vintage_billing(count, schedule) if (mode == "vintage").any() else 0.0
+    model_year = count * annual_price(schedule, np.arange(T)) if (mode == "model_year").any() else 0.0
+    return np.floor(count), np.where(mode == "vintage", vintage, model_year) / 4
+
+def uk_vintages(p: dict, T: int) -> dict:
+    """UK schools and quarterly revenue by joining cohort, as (K, cohort, quarter)
+    arrays; summing over cohorts gives the "vintage" calc_uk_schools revenue."""
+    p = {**DEFAULTS, **p}
+    count = _uk_count(p, T)
+    new = np.diff(count, axis=1, prepend=0.0)
+    tenure = np.arange(T) - np.arange(T)[:, None]             # [cohort, quarter]
+    price = annual_price(_schedule(p, "uk_school"), tenure.ravel())
+    price = price.reshape(price.shape[:-1] + (T, T))
+    schools = np.where(tenure >= 0, new[:, :, None], 0.0)
+    return {"schools": schools, "revenue": schools * price / 4}
+
+
+def calc_mat_revenue(p: dict, T: int):
+    trials = _lever(p, "mat_trials_per_quarter") + np.zeros(T)
+    new_conv = np.floor(_lever(p, "mat_trials_per_quarter") * _lever(p, "mat_conversion_rate"))
+    conversions = np.where(np.arange(T) >= 2, new_conv, 0.0)
+    churn_q = 1 - (1 - _lever(p, "mat_annual_churn")) ** 0.25
+
+    # conversions are constant from quarter 2, so quarter i holds one equal
+    # cohort of each age 0 … i-2: survivors and revenue are running sums by age
+    age = np.arange(T)
+    survive = (1 - churn_q) ** age
+    price = annual_price(_schedule(p, "mat_school"), age)
+    alive = np.cumsum(survive, axis=1)
+    billed = np.cumsum(survive * price, axis=1)
+
+    oldest = np.maximum(age - 2, 0)
+    converted = age >= 2
+    active = np.where(converted, new_conv * alive[:, oldest], 0.0)
+    revenue = np.where(converted, new_conv * _lever(p, "schools_per_mat") * billed[:, oldest] / 4, 0.0)
+    return trials, conversions, revenue, np.floor(active)
+
+
+
+def calc_mat_revenue_stochastic(p: dict, T: int, rng: np.random.Generator, draws: int = None):
+    """calc_mat_revenue with whole MATs: each quarter every cohort loses a
+    Binomial(survivors, churn_q) number of MATs.  One path per scenario, or
+    `draws` paths of a single scenario."""
+    trials = _lever(p, "mat_trials_per_quarter") + np.zeros(T)
+    new_conv = np.floor(_lever(p, "mat_trials_per_quarter") * _lever(p, "mat_conversion_rate"))
+    conversions = np.where(np.arange(T) >= 2, new_conv, 0.0)
+    churn_q = 1 - (1 - _lever(p, "mat_annual_churn")) ** 0.25
+    n = draws or new_conv.shape[0]
+    new_conv, churn_q = (np.broadcast_to(a, (n, 1)) for a in (new_conv, churn_q))
+
+    # alive[:, c] = MATs still active from the cohort converted in quarter c
+    alive = np.zeros((n, T), dtype=np.int64)
+    active = np.zeros((n, T))
+    billed = np.zeros((n, T))
+    price = np.broadcast_to(annual_price(_schedule(p, "mat_school"), np.arange(T)), (n, T))
+    for i in range(2, T):
+        alive[:, 2:i] -= rng.binomial(alive[:, 2:i], churn_q)
+        alive[:, i] = new_conv[:, 0]
+        active[:, i] = alive[:, 2:i+1].sum(axis=1)
+        billed[:, i] = (alive[:, 2:i+1] * price[:, i - np.arange(2, i+1)]).sum(axis=1)
+    revenue = billed * _lever(p, "schools_per_mat") / 4
+    return trials, conversions, revenue, active
+
+def calc_us_revenue(p: dict, T: int, launch_idx: np.ndarray):
+    per_q = _lever(p, "districts_per_quarter")
+    age = _ages(launch_idx, T)
+    live = age >= 0
+    districts = np.where(live, 1 + per_q * np.maximum(age, 0), 0.0)
+
+    # launch cohort of one district, then `per_q` a quarter, each priced by tenure
+    price = np.atleast_2d(annual_price(_schedule(p, "us_district"), np.arange(T)))
+    billed = np.concatenate([np.zeros((price.shape[0], 1)), np.cumsum(price, axis=1)], axis=1)
+    a = np.maximum(age, 0)                                    # billed[:, n] = Σ price[:, :n]
+    revenue = np.where(live, (_take(price, a) + per_q * _take(billed, a)) / 4, 0.0)
+    return districts, revenue
+
+
+def calc_eal_revenue(p: dict, T: int, launch_idx: np.ndarray):
+    age = _ages(launch_idx, T)
+    lrn = _lever(p, "initial_eal_learners") * _lever(p, "eal_growth_multiplier") ** np.maximum(age, 0)
+    lrn = np.where(age >= 0, lrn, 0.0)
+    return np.floor(lrn), lrn * annual_price(_schedule(p, "eal_learner"), np.maximum(age, 0)) / 4
+
+
+def calculate_arr(quarterly_values: np.ndarray, include_uk_baseline: bool = False) -> np.ndarray:
+    """ARR as a rolling 4-quarter sum (Q3 2025 baseline fills the first three)."""
+    run = np.cumsum(quarterly_values, axis=-1)
+    arr = run.copy()
+    arr[..., 4:] -= run[..., :-4]
+    if include_uk_baseline:
+        arr[..., :3] += UK_BASELINE_ARR
+    return arr
+
+# ----------------------------------------------------------------------------------
+# Cost engines
+# ----------------------------------------------------------------------------------
+
+def calc_payroll(p: dict, T: int):
+    if "headcount_plan" in p:
+        return calc_plan_payroll(p, T)
+    i = np.arange(T)
+    headcount = (_lever(p, "initial_employees")
+                 + _lever(p, "q4_2025_hires") * (i >= 1)
+                 + _lever(p, "quarterly_hires") * np.maximum(i - 1, 0))
+
+    # salary base: known salaries first, average new-hire salary after that
+    known = np.concatenate([[0], np.cumsum(KNOWN_SALARIES)])
+    n = len(KNOWN_SALARIES)
+    base = known[np.minimum(headcount, n).astype(int)] + np.maximum(headcount - n, 0) * _lever(p, "avg_new_hire_salary")
+    infl = (1 + _lever(p, "salary_inflation")) ** (i/4)
+    return headcount, base * infl * ON_COST / 4
+
+
+def calc_plan_payroll(p: dict, T: int):
+    """Headcount and payroll from a role table: each role's cost lands in its
+    start quarter, a running sum gives the salary base, times inflation."""
+    plan = p["headcount_plan"]
+    start, salary, on_cost, count = np.broadcast_arrays(
+        np.asarray(plan["start"]), np.asarray(plan["salary"], dtype=float),
+        np.asarray(plan.get("on_cost", ON_COST), dtype=float), np.asarray(plan.get("count", 1), dtype=float),
+    )
+    R = start.shape[-1]
+    start, cost, count = (a.reshape(-1, R) for a in (start, count * salary * on_cost, count))
+
+    # bucket by start quarter (column T collects starts beyond the horizon)
+    K = start.shape[0]
+    slot = (np.clip(start, 0, T) + (T + 1) * np.arange(K)[:, None]).ravel()
+    def by_start(w):
+        return np.bincount(slot, weights=w.ravel(), minlength=K * (T + 1)).reshape(K, T + 1)[:, :T]
+
+    headcount = np.cumsum(by_start(count), axis=1)
+    infl = (1 + _lever(p, "salary_inflation")) ** (np.arange(T)/4)
+    return headcount, np.cumsum(by_start(cost), axis=1) * infl / 4
+
+
+def headcount_plan(roles) -> dict:
+    """Role rows (a DataFrame or list of dicts) → plan columns for params;
+    blank on_cost and count cells take their defaults."""
+    roles = pd.DataFrame(roles).fillna({"on_cost": ON_COST, "count": 1})
+    return {c: roles[c].to_numpy() for c in HEADCOUNT_PLAN_COLUMNS if c in roles}
+
+
+def levers_plan(params: dict, T: int) -> pd.DataFrame:
+    """The hiring levers of one scenario written out as a role table (same payroll)."""
+    p = {**DEFAULTS, **params}
+    p.pop("headcount_plan", None)
+    hires = np.diff(calc_payroll(p, T)[0][0], prepend=0).astype(int)
+    people = np.repeat(np.arange(T), hires)                      # start quarter of each person, in hiring order
+    n = len(KNOWN_SALARIES)
+    rows = [(f"Team member {j + 1}", int(q), KNOWN_SALARIES[j], ON_COST, 1) for j, q in enumerate(people[:n])]
+    starts, counts = np.unique(people[n:], return_counts=True)
+    rows += [("New hires", int(q), p["avg_new_hire_salary"], ON_COST, int(c)) for q, c in zip(starts, counts)]
+    return pd.DataFrame(rows, columns=list(HEADCOUNT_PLAN_COLUMNS))
+
+
+def align_plans(scenarios: list, T: int) -> list:
+    """Give every scenario a headcount plan of the same length, so a mix of
+    plan and lever scenarios stacks into one batch (padding roles hire 0)."""
+    if not any("headcount_plan" in s for s in scenarios):
+        return scenarios
+    plans = [s["headcount_plan"] if "headcount_plan" in s else headcount_plan(levers_plan(s, T))
+             for s in scenarios]
+    R = max(len(plan["start"]) for plan in plans)
+    fill = {"role": "", "start": T, "salary": 0.0, "on_cost": ON_COST, "count": 0}
+    out = []
+    for s, plan in zip(scenarios, plans):
+        n = len(plan["start"])
+        cols = {c: np.broadcast_to(plan.get(c, fill[c]), n) for c in HEADCOUNT_PLAN_COLUMNS}
+        out.append({**s, "headcount_plan": {
+            c: np.concatenate([v, np.full(R - n, fill[c], dtype=v.dtype if c != "role" else object)])
+            for c, v in cols.items()
+        }})
+    return out
+
+
+def calc_cogs(p: dict, quarterly_rev: np.ndarray) -> dict:
+    yr = np.arange(quarterly_rev.shape[-1])//4 + 1
+    api_rate = np.where(yr == 1, _lever(p, "api_cost_year1"),
+                        np.where(yr == 2, _lever(p, "api_cost_year2"), _lever(p, "api_cost_year3")))
+    out = {
+        "api": quarterly_rev * api_rate,
+        "infra": quarterly_rev * _lever(p, "infrastructure_pct"),
+        "support": quarterly_rev * _lever(p, "support_pct"),
+        "payment": quarterly_rev * _lever(p, "payment_processing_pct"),
+        "other_var": quarterly_rev * _lever(p, "other_variable_pct"),
+    }
+    out["cogs"] = out["api"] + out["infra"] + out["support"] + out["payment"] + out["other_var"]
+    return out
+
+
+def calc_fixed_costs(p: dict, T: int):
+    infl = (1 + _lever(p, "operational_inflation")) ** (np.arange(T)/4)
+    office_rent = _lever(p, "office_rent_monthly") * 3 * infl
+    other_opex = _lever(p, "other_opex_monthly") * 3 * infl
+    rd = _lever(p, "rd_quarterly") + np.zeros(T)
+    return office_rent, other_opex, rd
+
+
+def calc_expansion(p: dict, T: int, us_idx: np.ndarray, eal_idx: np.ndarray) -> np.ndarray:
+    i = np.arange(T)
+    return (_lever(p, "us_launch_cost") * (i == us_idx)
+            + _lever(p, "eal_launch_cost") * (i == eal_idx))
+
+# ----------------------------------------------------------------------------------
+# Whole model
+# ----------------------------------------------------------------------------------
+
+def _no_stage(name: str):
+    return nullcontext()
+
+
+def run_revenue(params: dict, qtrs: list, stage=_no_stage, rng: np.random.Generator = None) -> dict:
+    p, T = {**DEFAULTS, **params}, len(qtrs)
+    us_idx = _quarter_index(p, "us_launch_quarter", qtrs)
+    eal_idx = _quarter_index(p, "eal_launch_quarter", qtrs)
+
+    with stage("calc_uk_schools"):
+        uk_schools, uk_rev = calc_uk_schools(p, T)
+    with stage("calc_mat_revenue"):
+        if rng is None:
+            mat_trials, mat_conversions, mat_rev, active_mats = calc_mat_revenue(p, T)
+        else:
+            mat_trials, mat_conversions, mat_rev, active_mats = calc_mat_revenue_stochastic(p, T, rng)
+    with stage("calc_us_revenue"):
+        districts, us_rev = calc_us_revenue(p, T, us_idx)
+    with stage("calc_eal_revenue"):
+        learners, eal_rev = calc_eal_revenue(p, T, eal_idx)
+    quarterly_rev = uk_rev + mat_rev + us_rev + eal_rev
+
+    return {
+        "uk_schools": uk_schools,
+        "active_mats": active_mats,
+        "districts": districts,
+        "learners": learners,
+        "uk_rev": uk_rev,
+        "mat_rev": mat_rev,
+        "us_rev": us_rev,
+        "eal_rev": eal_rev,
+        "quarterly_rev": quarterly_rev,
+        "uk_arr": calculate_arr(uk_rev, include_uk_baseline=True),
+        "mat_arr": calculate_arr(mat_rev),
+        "us_arr": calculate_arr(us_rev),
+        "eal_arr": calculate_arr(eal_rev),
+        "total_arr": calculate_arr(quarterly_rev, include_uk_baseline=True),
+    }
+
+
+def run_costs(params: dict, qtrs: list, revenue: dict, stage=_no_stage) -> dict:
+    p, T = {**DEFAULTS, **params}, len(qtrs)
+    quarterly_rev = revenue["quarterly_rev"]
+
+    with stage("calc_payroll"):
+        headcount, payroll = calc_payroll(p, T)
+    with stage("calc_cogs"):
+        out = calc_cogs(p, quarterly_rev)
+    out["gross_profit"] = quarterly_rev - out["cogs"]
+    out["sales_marketing"] = quarterly_rev * _lever(p, "sales_marketing_pct")
+    with stage("calc_fixed_costs"):
+        out["office_rent"], out["other_opex"], out["rd"] = calc_fixed_costs(p, T)
+    with stage("calc_expansion"):
+        out["expansion"] = calc_expansion(
+            p, T,
+            _quarter_index(p, "us_launch_quarter", qtrs),
+            _quarter_index(p, "eal_launch_quarter", qtrs),
+        )
+    out["headcount"], out["payroll"] = headcount, payroll
+    out["operating_cash"] = (out["gross_profit"] - payroll - out["sales_marketing"]
+                             - out["office_rent"] - out["other_opex"] - out["rd"] - out["expansion"])
+    out["cumulative_cash"] = np.cumsum(out["operating_cash"], axis=-1)
+    return out
+
+
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+
+def run_forecast(params: dict, qtrs: list, stage=_no_stage, rng: np.random.Generator = None,
+                 dtype=np.float64) -> dict:
+    """All revenue and cost lines for a scenario (or batch) over `qtrs`.
+
+    `stage(name)` is an optional context‑manager factory wrapped around each
+    calc_* step, for timing (see perf_panel.StageTimer.stage).  Passing an
+    `rng` switches MAT churn from expected (fractional) to sampled whole MATs.
+    The arithmetic is always float64, so `dtype=np.float32` doesn't lower a
+    run's peak memory: it halves the result that is kept, cached or sent
+    (about 7 significant digits – see PRECISIONS and `benchmarks.py --suite
+    precision` for the error this introduces).  Lines are cast one at a time,
+    each float64 line dropped as it goes, so the peak never exceeds float64's.
+    """
+    revenue = run_revenue(params, qtrs, stage, rng)
+    out = {**revenue, **run_costs(params, qtrs, revenue, stage)}
+    del revenue
+    shape = (max(v.shape[0] for v in out.values()), len(qtrs))
+    for k in list(out):                       # pop + re‑insert keeps the key order
+        v = out.pop(k)
+        out[k] = v.astype(dtype, copy=False) if v.shape == shape else np.broadcast_to(v, shape).astype(dtype)
+        del v
+    return out
+
+# ----------------------------------------------------------------------------------
+# Runway & breakeven (reductions over scenario × quarter)
+# ----------------------------------------------------------------------------------
+
+RUNWAY_KEYS = ("first_negative_quarter", "min_cash", "min_cash_quarter", "breakeven_quarter",
+               "runway_months", "cash_out_months")
+
+def _first(mask: np.ndarray) -> np.ndarray:
+    """Index of the first True in each row, -1 where there is none."""
+    return np.where(mask.any(axis=-1), mask.argmax(axis=-1), -1)
+
+def runway(cumulative_cash: np.ndarray, opening_cash=0.0) -> dict:
+    """Runway and breakeven for (K, T) cumulative cash (as run_costs returns it).
+
+    Quarter results are indices into the timeline, -1 for "not within the
+    horizon".  `breakeven_quarter` is the first quarter from which operating
+    cash stays ≥ 0; `runway_months` is the opening balance over the first
+    quarter's monthly burn and `cash_out_months` the months until the
+    forecast balance first goes negative (interpolated within the quarter);
+    both are inf when that never happens.
+    """
+    cum = np.atleast_2d(cumulative_cash)
+    T = cum.shape[-1]
+    opening = np.asarray(opening_cash, dtype=float).reshape(-1, 1)
+    balance = opening + cum
+    operating = np.diff(cum, axis=-1, prepend=0.0)
+    rows = np.arange(balance.shape[0])
+
+    first_negative = _first(balance < 0)
+    min_quarter = balance.argmin(axis=-1)
+    losing = operating < 0
+    last_loss = T - 1 - _first(losing[:, ::-1])
+    breakeven = np.where(~losing.any(axis=-1), 0, np.where(last_loss < T - 1, last_loss + 1, -1))
+
+    burn = -operating[:, 0] / 3
+    runway_months = np.where(burn > 0, np.maximum(opening[:, 0], 0) / np.where(burn > 0, burn, 1), np.inf)
+
+    # months to cash‑out: whole quarters before the crossing, then the share of
+    # the crossing quarter's outflow that the balance before it covers
+    q = np.maximum(first_negative, 0)
+    before = np.where(q > 0, balance[rows, q - 1], opening[:, 0])
+    outflow = np.maximum(before - balance[rows, q], 1e-9)
+    cash_out = 3 * (q + np.clip(before / outflow, 0, 1))
+    return {
+        "first_negative_quarter": first_negative,
+        "min_cash": balance[rows, min_quarter],
+        "min_cash_quarter": min_quarter,
+        "breakeven_quarter": breakeven,
+        "runway_months": runway_months,
+        "cash_out_months": np.where(first_negative >= 0, cash_out, np.inf),
+    }
+
+# ----------------------------------------------------------------------------------
+# MAT churn distribution (one scenario, many sampled churn paths)
+# ----------------------------------------------------------------------------------
+
+MAT_CHURN_LINES = ("active_mats", "mat_rev", "mat_arr")
+
+def _histogram(values: np.ndarray, width: np.ndarray, bins: int) -> np.ndarray:
+    """(T, bins) counts of (n, T) values, bin b of quarter t = [b·w_t, (b+1)·w_t)."""
+    T = values.shape[1]
+    idx = np.clip((values / width).astype(np.int64), 0, bins - 1) + np.arange(T) * bins
+    return np.bincount(idx.ravel(), minlength=T * bins).reshape(T, bins)
+
+def _histogram_quantiles(counts: np.ndarray, width: np.ndarray, q, exact: bool) -> np.ndarray:
+    """(len(q), T) quantiles read off per-quarter histograms."""
+    cum = np.cumsum(counts, axis=1)
+    out = np.empty((len(q), counts.shape[0]))
+    for j, qj in enumerate(q):
+        rank = np.maximum(qj * cum[:, -1], 1)
+        b = (cum < rank[:, None]).sum(axis=1)
+        if exact:
+            out[j] = b * width
+        else:   # interpolate within the bin
+            below = np.where(b > 0, cum[np.arange(len(b)), b - 1], 0)
+            out[j] = (b + (rank - below) / counts[np.arange(len(b)), b]) * width
+    return out
+
+def mat_churn_quantiles(params: dict, qtrs: list, draws: int = 10_000, q=(0.1, 0.5, 0.9),
+                        seed: int = 0, chunk: int = 10_000, bins: int = 4096) -> dict:
+    """Quantiles of active MATs, MAT revenue and MAT ARR under sampled churn.
+
+    Paths are drawn `chunk` at a time and folded into fixed per-quarter
+    histograms, so memory is O(T · bins) whatever `draws` is.  Active MATs
+    are counted exactly while the largest possible count fits in `bins`;
+    revenue and ARR bins span 0 … the no-churn value, so quantiles are within
+    1/bins of that range.
+    """
+    p, T = {**DEFAULTS, **params}, len(qtrs)
+    _, _, rev_hi, mats_hi = calc_mat_revenue({**p, "mat_annual_churn": 0.0}, T)
+    hi = {"active_mats": mats_hi[0], "mat_rev": rev_hi[0], "mat_arr": calculate_arr(rev_hi)[0]}
+    width = {k: np.maximum(v / bins, 1.0) for k, v in hi.items()}
+    width["active_mats"] = np.maximum(np.ceil((mats_hi[0] + 1) / bins), 1.0)
+    counts = {k: np.zeros((T, bins), dtype=np.int64) for k in MAT_CHURN_LINES}
+
+    sizes = [min(chunk, draws - i) for i in range(0, draws, chunk)]
+    for n, ss in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))):
+        _, _, rev, mats = calc_mat_revenue_stochastic(p, T, np.random.default_rng(ss), draws=n)
+        for k, v in (("active_mats", mats), ("mat_rev", rev), ("mat_arr", calculate_arr(rev))):
+            counts[k] += _histogram(v, width[k], bins)
+
+    out = {k: _histogram_quantiles(counts[k], width[k], q, exact=k == "active_mats" and (width[k] == 1).all())
+           for k in MAT_CHURN_LINES}
+    return {"quantiles": tuple(q), "draws": draws, **out}
+
+# ----------------------------------------------------------------------------------
+# Report frames (one scenario of a batch)
+# ----------------------------------------------------------------------------------
+
+def revenue_frame(result: dict, qtrs: list, k: int = 0) -> pd.DataFrame:
+    df = pd.DataFrame({"Quarter": qtrs})
+    for key, label in REVENUE_COLUMNS.items():
+        df[label] = result[key][k]
+    return df
+
+
+def cash_frame(result: dict, qtrs: list, k: int = 0) -> pd.DataFrame:
+    df = pd.DataFrame({"Quarter": qtrs})
+    for key, label in CASH_COLUMNS.items():
+        df[label] = result[key][k]
+    return df
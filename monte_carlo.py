@@ -0,0 +1,308 @@
+"""
+monte_carlo.py
+Monte Carlo over the forecast levers, split across a process pool.
+
+Run with:  python monte_carlo.py --draws 1000000 --workers 8
+
+Draws are cut into fixed‑size chunks.  Each chunk gets its own RNG stream,
+spawned from one SeedSequence, so a run is reproducible and independent of
+how many workers there are or which worker picks up which chunk.  Workers
+write their (chunk, T, lines) slab straight into a shared‑memory buffer of
+shape (draws, T, lines); only the chunk's float64 moments (count, mean, M2,
+min, max per quarter and line) and its quantile sketch (quantile_sketch.py)
+are pickled back and merged as chunks land.
+
+The time axis is the engine's quarterly timeline (num_quarters / --quarters).
+There is no monthly horizon: forecast_engine models quarters throughout, so
+a monthly grid needs a monthly engine first.  Ten years is 40 quarters.
+
+Large sweeps: --dtype float32 stores the paths at half the size, and
+--no-paths keeps none at all, only the on‑the‑fly moments and sketches.
+1M draws × 40 quarters × 18 lines is 5.8 GB as float64, 2.9 GB as float32,
+and under a MB of moments and sketches without paths – P5–P95 bands then
+come from the sketch, in constant memory however many draws are run.
+
+quantile_bands() runs the same chunks in‑process and returns only the
+percentile rows – what the pages' fan charts draw; spread_spec() builds a
+spec of ± fractions around whatever levers a page currently has.
+
+Lever distributions (anything not listed stays at its base value):
+    ("normal", mean, sd)             clipped at 0
+    ("uniform", low, high)
+    ("triangular", low, mode, high)
+    ("choice", [values], [probs])    probs optional – e.g. launch quarters
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from forecast_engine import DEFAULTS, PRECISIONS, run_forecast, runway, timeline
+from quantile_sketch import QuantileSketch
+
+LINES = ("total_arr", "operating_cash", "cumulative_cash")
+
+# a plausible spread around the dataroom defaults, used by the CLI
+EXAMPLE_SPEC = {
+    "hyper_growth_factor": ("triangular", 3.0, 4.0, 5.0),
+    "taper_growth_rate": ("normal", 0.50, 0.10),
+    "mat_conversion_rate": ("uniform", 0.50, 0.80),
+    "mat_annual_churn": ("uniform", 0.10, 0.30),
+    "us_launch_quarter": ("choice", ["Q1 2027", "Q2 2027", "Q3 2027"], [0.5, 0.3, 0.2]),
+    "eal_growth_multiplier": ("triangular", 1.4, 1.75, 2.0),
+}
+
+# ± fractions for spread_spec: how far each revenue lever might plausibly miss
+SPREAD = {
+    "hyper_growth_factor": 0.25,
+    "taper_growth_rate": 0.20,
+    "mat_conversion_rate": 0.20,
+    "mat_annual_churn": 0.50,
+    "districts_per_quarter": 0.40,
+    "eal_growth_multiplier": 0.15,
+}
+
+
+def sample_levers(spec: dict, n: int, rng: np.random.Generator) -> dict:
+    """n draws of every lever in `spec`, as length‑n arrays."""
+    out = {}
+    for lever, (kind, *args) in spec.items():
+        if lever not in DEFAULTS:
+            raise ValueError(f"unknown lever {lever!r}")
+        if kind == "normal":
+            out[lever] = np.maximum(rng.normal(args[0], args[1], n), 0.0)
+        elif kind == "uniform":
+            out[lever] = rng.uniform(args[0], args[1], n)
+        elif kind == "triangular":
+            out[lever] = rng.triangular(args[0], args[1], args[2], n)
+        elif kind == "choice":
+            values = np.asarray(args[0])
+            probs = args[1] if len(args) > 1 else None
+            out[lever] = values[rng.choice(len(values), n, p=probs)]
+        else:
+            raise ValueError(f"unknown distribution {kind!r} for {lever!r}")
+    return out
+
+
+def spread_spec(base: dict, spread: dict = SPREAD) -> dict:
+    """Triangular distributions of ± `spread` around `base`'s own lever values
+    (rates capped at 1; levers at 0 stay fixed)."""
+    spec = {}
+    for lever, f in spread.items():
+        mode = float({**DEFAULTS, **base}[lever])
+        if mode > 0:
+            high = mode * (1 + f)
+            if lever.endswith(("_rate", "_churn")):
+                high = min(high, max(mode, 1.0))
+            spec[lever] = ("triangular", mode * (1 - f), mode, high)
+    return spec
+
+
+def _block(spec: dict, base: dict, qtrs: list, lines: tuple, n: int, seed) -> np.ndarray:
+    """(n, T, lines) results of n draws from `spec` on top of `base`."""
+    params = {**base, **sample_levers(spec, n, np.random.default_rng(seed))}
+    result = run_forecast(params, qtrs)
+    return np.stack([result[line] for line in lines], axis=-1)
+
+
+def chunk_stats(block: np.ndarray) -> dict:
+    """Moments over axis 0 of a (n, T, lines) block, in float64."""
+    mean = block.mean(axis=0)
+    return {"n": len(block), "mean": mean, "m2": ((block - mean) ** 2).sum(axis=0),
+            "min": block.min(axis=0), "max": block.max(axis=0)}
+
+
+def merge_stats(a: dict, b: dict) -> dict:
+    """Moments of two blocks together (Chan et al.'s pairwise update)."""
+    n = a["n"] + b["n"]
+    delta = b["mean"] - a["mean"]
+    return {"n": n, "mean": a["mean"] + delta * (b["n"] / n),
+            "m2": a["m2"] + b["m2"] + delta ** 2 * (a["n"] * b["n"] / n),
+            "min": np.minimum(a["min"], b["min"]), "max": np.maximum(a["max"], b["max"])}
+
+
+class MonteCarloResult:
+    """(draws, T, lines) results in shared memory; close() releases them.
+
+    Use as a context manager, or copy what you need out of `.values` first.
+    `.stats` holds the float64 moments merged on the fly – mean, std, min
+    and max, each (T, lines) – and `.sketch` a (T, lines) QuantileSketch;
+    both are there even when the paths weren't kept (`.values` is None then).
+    """
+
+    def __init__(self, shm, shape: tuple, dtype, quarters: list, lines: tuple,
+                 seconds: float, stats: dict, sketch: QuantileSketch):
+        self._shm = shm
+        self.sketch = sketch
+        self.values = None if shm is None else np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self.quarters = quarters
+        self.lines = tuple(lines)
+        self.seconds = seconds
+        self.stats = {"mean": stats["mean"], "std": np.sqrt(stats["m2"] / stats["n"]),
+                      "min": stats["min"], "max": stats["max"]}
+
+    def line(self, name: str) -> np.ndarray:
+        """(draws, T) view of one line item."""
+        if self.values is None:
+            raise ValueError("paths were not kept (simulate(..., keep_paths=False))")
+        return self.values[:, :, self.lines.index(name)]
+
+    def line_stats(self, name: str) -> dict:
+        """{"mean", "std", "min", "max"} of one line, each (T,), in float64."""
+        j = self.lines.index(name)
+        return {k: v[:, j] for k, v in self.stats.items()}
+
+    def quantiles(self, name: str, q=(0.1, 0.5, 0.9)) -> np.ndarray:
+        """(len(q), T) quantiles of a line across draws – exact from the
+        paths when they were kept, otherwise from the sketch."""
+        if self.values is None:
+            return self.sketch.quantile(q)[..., self.lines.index(name)]
+        return np.quantile(self.line(name), q, axis=0)
+
+    def runway(self, opening_cash=0.0) -> dict:
+        """forecast_engine.runway for every draw (needs the cumulative_cash line)."""
+        return runway(self.line("cumulative_cash"), opening_cash)
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self.values = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# worker state, filled once per process by _init
+_W = {}
+
+
+def _init(shm_name: str, shape: tuple, dtype, spec: dict, base: dict, qtrs: list, lines: tuple,
+          compression: int):
+    shm = out = None
+    if shm_name:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        out = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _W.update(shm=shm, out=out, spec=spec, base=base, qtrs=qtrs, lines=lines, compression=compression)
+
+
+def _run_chunk(start: int, stop: int, seed: np.random.SeedSequence) -> tuple:
+    block = _block(_W["spec"], _W["base"], _W["qtrs"], _W["lines"], stop - start, seed)
+    if _W["out"] is not None:
+        _W["out"][start:stop] = block               # downcasts to the buffer's dtype
+    return chunk_stats(block), QuantileSketch.of(block, _W["compression"])
+
+
+def paths_nbytes(draws: int, num_quarters: int, lines: int, dtype=np.float64) -> int:
+    """Size of the (draws, T, lines) path buffer."""
+    return draws * num_quarters * lines * np.dtype(dtype).itemsize
+
+
+def simulate(spec: dict, draws: int, base: dict = None, num_quarters: int = 13,
+             base_date: str = "2025-10-01", lines=LINES, workers: int = None,
+             chunk: int = 20_000, seed: int = 0, dtype=np.float64,
+             keep_paths: bool = True, compression: int = 200) -> MonteCarloResult:
+    """Run `draws` scenarios sampled from `spec` across a process pool.
+
+    `dtype` is the path buffer's storage type (np.float32 or "float32" to
+    halve it); moments and sketches are always built from the float64
+    results.  `compression` sizes the quantile sketches (see QuantileSketch).
+    """
+    if draws < 1:
+        raise ValueError(f"draws must be at least 1, got {draws}")
+    dtype = PRECISIONS.get(dtype, dtype)
+    base = {**DEFAULTS, **(base or {})}
+    qtrs = timeline(base_date, num_quarters)
+    lines = tuple(lines)
+    shape = (draws, len(qtrs), len(lines))
+    shm = None
+    if keep_paths:
+        shm = shared_memory.SharedMemory(create=True, size=max(paths_nbytes(*shape, dtype), 1))
+
+    bounds = [(i, min(i + chunk, draws)) for i in range(0, draws, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(bounds))
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init,
+            initargs=(None if shm is None else shm.name, shape, dtype, spec, base, qtrs, lines, compression),
+        ) as pool:
+            stats, sketch = None, QuantileSketch(shape[1:], compression)
+            for part, part_sketch in pool.map(_run_chunk, *zip(*bounds), seeds):
+                stats = part if stats is None else merge_stats(stats, part)
+                sketch.merge(part_sketch)
+    except BaseException:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        raise
+    assert stats["n"] == draws
+    return MonteCarloResult(shm, shape, dtype, qtrs, lines, time.perf_counter() - start, stats, sketch)
+
+
+def quantile_bands(spec: dict, draws: int, base: dict, qtrs: list, lines=LINES,
+                   q=(0.1, 0.25, 0.5, 0.75, 0.9), chunk: int = 20_000, seed: int = 0,
+                   compression: int = 200) -> dict:
+    """{line: (len(q), T)} quantiles across `draws` scenarios, run in‑process.
+
+    For pages and other callers that want a few percentile rows rather than
+    a pool: chunks are sketched and dropped as they go, so memory stays at
+    one chunk whatever `draws` is.  Same chunks and seeds as simulate(), so
+    the bands match its sketch for the same arguments.
+    """
+    if draws < 1:
+        raise ValueError(f"draws must be at least 1, got {draws}")
+    base, lines = {**DEFAULTS, **base}, tuple(lines)
+    sketch = QuantileSketch((len(qtrs), len(lines)), compression)
+    sizes = [min(chunk, draws - i) for i in range(0, draws, chunk)]
+    for n, ss in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))):
+        sketch.update(_block(spec, base, qtrs, lines, n, ss))
+    bands = sketch.quantile(q)
+    return {"quantiles": tuple(q), "draws": draws, **{line: bands[..., j] for j, line in enumerate(lines)}}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="stylus Monte Carlo forecast")
+    ap.add_argument("--draws", type=int, default=1_000_000)
+    ap.add_argument("--quarters", type=int, default=13, help="horizon in quarters")
+    ap.add_argument("--workers", type=int, help="processes (default: all cores)")
+    ap.add_argument("--chunk", type=int, default=20_000, help="draws per task / RNG stream")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--opening-cash", type=float, default=0.0, help="£ in the bank at the start")
+    ap.add_argument("--dtype", choices=list(PRECISIONS), default="float64", help="path storage precision")
+    ap.add_argument("--no-paths", action="store_true", help="keep only the on-the-fly moments")
+    args = ap.parse_args(argv)
+
+    keep = not args.no_paths
+    size = paths_nbytes(args.draws, args.quarters, len(LINES), args.dtype) if keep else 0
+    with simulate(EXAMPLE_SPEC, args.draws, num_quarters=args.quarters, workers=args.workers,
+                  chunk=args.chunk, seed=args.seed, dtype=args.dtype, keep_paths=keep) as mc:
+        print(f"{args.draws:,} draws × {len(mc.quarters)} quarters on "
+              f"{args.workers or os.cpu_count()} workers in {mc.seconds:,.2f}s "
+              f"({args.draws / mc.seconds:,.0f} draws/s), paths {size / 2**20:,.1f} MB"
+              + (f" as {args.dtype}" if keep else " (not kept)"))
+        for line in mc.lines:
+            stats = mc.line_stats(line)
+            print(f"  {line:<16} {mc.quarters[-1]}:  mean £{stats['mean'][-1]:,.0f}   "
+                  f"sd £{stats['std'][-1]:,.0f}   range £{stats['min'][-1]:,.0f} – £{stats['max'][-1]:,.0f}")
+            p5, p50, p95 = mc.quantiles(line, (0.05, 0.5, 0.95))[:, -1]
+            print(f"  {'':<16} {'':<7}   P5 £{p5:,.0f}   P50 £{p50:,.0f}   P95 £{p95:,.0f}"
+                  + ("" if keep else "   (sketch)"))
+        if not keep:
+            return
+        rw = mc.runway(args.opening_cash)
+        p10, p50, p90 = np.quantile(rw["min_cash"], (0.1, 0.5, 0.9))
+        print(f"  {'lowest cash':<16} (opening £{args.opening_cash:,.0f}):  P10 £{p10:,.0f}   P50 £{p50:,.0f}   P90 £{p90:,.0f}")
+        print(f"  {'never negative':<16} {(rw['first_negative_quarter'] < 0).mean():.1%} of draws")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+perf_panel.py
+Opt‑in per‑stage timing for the Streamlit pages.
+
+Add ?debug=1 to the page URL to switch it on.  Each stage records wall time,
+peak extra allocation and net allocation (tracemalloc), and the sidebar panel
+keeps a rolling history of recent reruns for the session, plus the shared
+result cache's counters.
+
+tracemalloc is process‑wide, so it only runs while an instrumented rerun
+does: the timer that starts it stops it once its panel is drawn (or when
+the rerun is dropped before that), and a timer that finds it already on
+leaves it alone.  Allocation figures still include whatever other sessions
+were doing at the same moment.
+"""
+
+import contextlib
+import time
+import tracemalloc
+import weakref
+from collections import deque
+
+import pandas as pd
+import streamlit as st
+
+from shared_cache import shared
+
+HISTORY = 50   # reruns kept per session
+
+# token of the timer that started tracemalloc, if one did
+_tracing = {"owner": None}
+
+
+def _stop_tracing(token) -> None:
+    if _tracing["owner"] is token:
+        _tracing["owner"] = None
+        tracemalloc.stop()
+
+
+class StageTimer:
+    """Stages are either `with timer.stage(name):` blocks or `timer.lap(name)`
+    calls, which close the stretch since the previous stage or lap."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.records = []
+        self._token = object()
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing["owner"] = self._token
+            weakref.finalize(self, _stop_tracing, self._token)   # rerun dropped before render()
+        self._origin = self._mark() if enabled else None
+
+    @classmethod
+    def from_page(cls) -> "StageTimer":
+        return cls(enabled=st.query_params.get("debug") == "1")
+
+    def _mark(self) -> tuple:
+        tracemalloc.reset_peak()
+        return time.perf_counter(), tracemalloc.get_traced_memory()[0]
+
+    def _record(self, name: str, start: tuple) -> None:
+        now = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        self.records.append({
+            "stage": name,
+            "ms": (now - start[0]) * 1e3,
+            "peak KiB": max(peak - start[1], 0) / 1024,
+            "net KiB": (current - start[1]) / 1024,
+        })
+        self._origin = self._mark()
+
+    def lap(self, name: str) -> None:
+        if self.enabled:
+            self._record(name, self._origin)
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = self._mark()
+        try:
+            yield
+        finally:
+            self._record(name, start)
+
+    def render(self, page: str, where=None) -> None:
+        """Panel (in the sidebar unless `where` is given, e.g. inside a
+        fragment): this rerun's stages plus the session's history."""
+        if not self.enabled:
+            return
+        _stop_tracing(self._token)
+        if not self.records:
+            return
+        history = st.session_state.setdefault(f"_timings_{page}", deque(maxlen=HISTORY))
+        this_run = pd.DataFrame(self.records).groupby("stage", sort=False).sum()
+        history.append(this_run["ms"].to_dict())
+
+        with (where or st.sidebar).expander("⏱ Stage timings", expanded=where is None):
+            st.dataframe(this_run.round(2), use_container_width=True)
+            st.caption(f"{this_run['ms'].sum():,.1f} ms this rerun · last {len(history)} reruns below")
+            st.line_chart(pd.DataFrame(list(history)).reset_index(drop=True))
+            cache = shared().stats()
+            st.caption(
+                f"Shared cache: {cache['entries']} entries, {cache['bytes'] / 2**20:,.1f} of "
+                f"{cache['budget_bytes'] / 2**20:,.0f} MB · hit rate {cache['hit_rate']:.0%} "
+                f"({cache['hits']:,} / {cache['misses']:,}) · {cache['evictions']:,} evictions"
+            )
@@ -4,137 +4,106 @@ Run with:  streamlit run portfolio_view.py
 No extra libraries needed.
 """
 
-import textwrap
 import pandas as pd
 import streamlit as st
 import streamlit.components.v1 as components
 
+from perf_panel import StageTimer
+from portfolio_data import (
+    CELL,
+    PupilIndex,
+    load_judgements,
+    portfolio_styler,
+    pupil_pivot,
+    reason_cells,
+)
+from shared_cache import shared
+
 # ── CONFIG ────────────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Portfolio View", layout="wide")
 st.title("Portfolio View")
+timer = StageTimer.from_page()   # ?debug=1 → per‑stage timings in the sidebar
 
-DATA_PATH = "dataset.csv"      # rename if needed
+DATA_PATH = "dataset.csv"      # a CSV, a folder of per‑school CSVs, or a glob
 
 # ── LOAD & PREP ───────────────────────────────────────────────────────────────
-@st.cache_data
+# one read‑only copy per process, shared by every session (see shared_cache.py)
 def load_csv(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path, dtype=str)
-    keep = [
-        "Pupil Name",
-        "Judgement (%)",
-        "KS2 Standard",
-        "KS2 Statement",
-        "Purpose",
-        "Criterion",
-        "🤖 REASON",
-        "criteria guidance",
-    ]
-    df = df[keep]
-    df["Judgement_num"] = (
-        df["Judgement (%)"].str.rstrip("%").replace("", pd.NA).astype(float)
-    )
-    return df
+    return shared().get_or_compute(("judgements", path), lambda: load_judgements(path))
 
-df = load_csv(DATA_PATH)
+def load_reasons(path: str) -> pd.Series:
+    return shared().get_or_compute(("reasons", path), lambda: reason_cells(load_csv(path)))
 
-# ── UI ────────────────────────────────────────────────────────────────────────
-pupil = st.selectbox("Select pupil", sorted(df["Pupil Name"].dropna().unique()))
-view  = df[df["Pupil Name"] == pupil].copy()
+def load_index(path: str) -> PupilIndex:
+    return shared().get_or_compute(("pupil_index", path), lambda: PupilIndex(load_csv(path)))
 
-# ── PIVOT (numeric) ───────────────────────────────────────────────────────────
-pivot = (
-    view.pivot_table(
-        index=["KS2 Standard", "KS2 Statement", "Criterion"],
-        columns="Purpose",
-        values="Judgement_num",
-        aggfunc="mean",
-    )
-    .round(0)
-    .sort_index()
-)
-
-# identical‑shape frame of reasons
-reasons = view.pivot_table(
-    index=["KS2 Standard", "KS2 Statement", "Criterion"],
-    columns="Purpose",
-    values="🤖 REASON",
-    aggfunc=lambda s: " | ".join(s.unique()),
-).reindex(pivot.index)
-
-# guidance for each Criterion (for the row‑label tooltip)
-guidance = (
-    view.groupby(["KS2 Standard", "KS2 Statement", "Criterion"])["criteria guidance"]
-    .first()
-)
+df = load_csv(DATA_PATH)
+reasons_all = load_reasons(DATA_PATH)
+index = load_index(DATA_PATH)
+timer.lap("load (cached)")
 
 # ── SMALL HELPERS ─────────────────────────────────────────────────────────────
-def wrap(txt: str, width: int = 28, lines: int = 2) -> str:
-    """Wrap & crop, but keep the full text as a tooltip via <span title="">."""
-    if pd.isna(txt):
-        return ""
-    wrapped = textwrap.fill(txt, width=width)
-    out_lines = wrapped.split("\n")[:lines]
-    display  = "\n".join(out_lines)
-    if len(out_lines) < len(wrapped.split("\n")):
-        display += "…"
-    # embed HTML so the full text shows on hover
-    return f'<span title="{txt}">{display}</span>'
-
-def colour(v: float) -> str:
-    """Red→Yellow→Green smooth gradient for 0‑100."""
-    if pd.isna(v):
-        return ""
-    v = max(0, min(100, v))
-    if v <= 50:              # red‑>yellow
-        f = v / 50
-        r, g, b = 244 + (11 * f), 67 + (168 * f), 54 + (5 * f)
-    else:                    # yellow‑>green
-        f = (v - 50) / 50
-        r, g, b = 255 + (-179 * f), 235 + (-60 * f), 59 + (21 * f)
-    return f"background-color:#{int(r):02x}{int(g):02x}{int(b):02x};"
-
-# ── BUILD DISPLAY FRAME ───────────────────────────────────────────────────────
-# 1) make prettier index with inline tooltips
-pivot.index = pd.MultiIndex.from_tuples(
-    [
-        (wrap(a), wrap(b), wrap(c))   # full text preserved in title attr
-        for a, b, c in pivot.index
-    ],
-    names=["KS2 Standard", "KS2 Statement", "Criterion"]
-)
-
-# 2) collapse index into columns so Styler can attach tooltips easily
-disp = pivot.reset_index()
-disp["Criterion ⓘ"] = disp["Criterion"]          # show criterion as a column
-disp = disp.drop(columns="Criterion").set_index(
-    ["KS2 Standard", "KS2 Statement", "Criterion ⓘ"]
-)
-
-reas = reasons.reset_index()
-reas["Criterion ⓘ"] = disp.index.get_level_values("Criterion ⓘ")
-reas = reas.set_index(
-    ["KS2 Standard", "KS2 Statement", "Criterion ⓘ"]
-)
+def render_grid(pivot: pd.DataFrame, reasons: pd.DataFrame, guidance: pd.Series):
+    """Arrow‑backed grid; reasons stay server‑side and follow the selected cell."""
+    grid = pivot.reset_index()
+    purposes = list(pivot.columns)
+    event = st.dataframe(
+        grid,
+        hide_index=True,
+        height=600,
+        on_select="rerun",
+        selection_mode="single-cell",
+        column_config={
+            **{c: st.column_config.TextColumn(c, width="medium") for c in CELL},
+            **{
+                p: st.column_config.ProgressColumn(
+                    p, min_value=0, max_value=100, format="%.0f%%", color="auto"
+                )
+                for p in purposes
+            },
+        },
+    )
+    if not event.selection.cells:
+        st.caption("Select a cell to see the reasons behind its judgement.")
+        return
+    row, col = event.selection.cells[0]
+    key = tuple(grid.loc[row, CELL])
+    st.markdown(f"**{key[2]}** · {col}")
+    if col in purposes and pd.notna(reasons.at[key, col]):
+        st.write(reasons.at[key, col])
+    if pd.notna(guidance.get(key)):
+        st.caption(guidance[key])
 
-# attach criterion‑level guidance tooltip to the index column itself
-reas["Criterion ⓘ"] = reas.index.get_level_values("Criterion ⓘ").map(
-    lambda x: guidance.get(x.strip("<span title=\"").split("\">")[0], "")
+# ── UI ────────────────────────────────────────────────────────────────────────
+cols = st.columns([2] + [1] * len(index.scope_cols))
+query = cols[0].text_input("Search pupils", placeholder="Start typing a name…")
+scope = {
+    c: col.selectbox(c, index.scope_values(c), index=None, placeholder="Any")
+    for c, col in zip(index.scope_cols, cols[1:])
+}
+pupil = st.selectbox("Select pupil", index.search(query, limit=50, **scope))
+renderer = st.radio(
+    "Renderer", ["Styled table", "Fast grid"], horizontal=True,
+    help="Fast grid streams the numbers as Arrow; click a cell for its reasons.",
 )
+timer.lap("input parsing")
+if pupil is None:
+    st.info("No pupils match that search.")
+    timer.render("portfolio")
+    st.stop()
 
-# ── STYLE ─────────────────────────────────────────────────────────────────────
-styler = (
-    disp.style
-    .applymap(colour)
-    .format("{:.0f}%")
-    .set_tooltips(reas)            # cell reasons + row‑label guidance
-    .set_table_styles([            # keep left margin narrow & wrapped
-        {"selector":"th",
-         "props":[("max-width","180px"),("white-space","pre-wrap")]}
-    ])
-    .hide(axis="index", level=0)   # hide top‑level index header row
-    .format(escape=False)          # allow our inline HTML tooltips
-)
+# ── PIVOT ─────────────────────────────────────────────────────────────────────
+with timer.stage("pivot"):
+    pivot, reasons, guidance = pupil_pivot(df, reasons_all, pupil)
 
 # ── RENDER ────────────────────────────────────────────────────────────────────
-html = styler.to_html()
-components.html(html, height=600, scrolling=True)
+if renderer == "Fast grid":
+    with timer.stage("grid"):
+        render_grid(pivot, reasons, guidance)
+else:
+    with timer.stage("Styler.to_html"):
+        html = portfolio_styler(pivot, reasons, guidance).to_html()
+    with timer.stage("components.html"):
+        components.html(html, height=600, scrolling=True)
+
+timer.render("portfolio")
@@ -12,7 +12,11 @@ import numpy as np
 import pandas as pd
 import streamlit as st
 
-CSV_PATH = "dataset.csv"   # <- update if needed
+from perf_panel import StageTimer
+from portfolio_data import PupilIndex, load_portfolio
+from shared_cache import shared
+
+CSV_PATH = "dataset.csv"   # <- a CSV, a folder of per‑school CSVs, or a glob
 PAGE_TITLE = "Portfolio View"
 TRAFFIC = {  # RGB hex
     "green": "#63be7b",
@@ -22,9 +26,13 @@ TRAFFIC = {  # RGB hex
 
 
 # ---------- helpers ---------- #
-@st.cache_data
+# one read‑only copy per process, shared by every session (see shared_cache.py)
 def load_data(path: str) -> pd.DataFrame:
-    return pd.read_csv(path)
+    return shared().get_or_compute(("portfolio", path), lambda: load_portfolio(path))
+
+
+def load_index(path: str) -> PupilIndex:
+    return shared().get_or_compute(("portfolio_index", path), lambda: PupilIndex(load_data(path)))
 
 
 def wrap_crop(s: str, *, width: int = 34, max_lines: int = 2) -> str:
@@ -51,14 +59,60 @@ def traffic_colour(val) -> str:
     return f"background-color:{TRAFFIC['yellow']};color:black"
 
 
+def render_grid(pivot: pd.DataFrame, reason: pd.DataFrame) -> None:
+    """Arrow‑backed grid; reasons stay server‑side and follow the selected cell."""
+    grid = pivot.reset_index()
+    purposes = list(pivot.columns)
+    for p in purposes:
+        grid[p] = pd.to_numeric(grid[p].str.rstrip("%"), errors="coerce")
+    event = st.dataframe(
+        grid,
+        hide_index=True,
+        height=600,
+        on_select="rerun",
+        selection_mode="single-cell",
+        column_config={
+            p: st.column_config.ProgressColumn(
+                p, min_value=0, max_value=100, format="%.0f%%", color="auto"
+            )
+            for p in purposes
+        },
+    )
+    if not event.selection.cells:
+        st.caption("Select a cell to see the reason behind its judgement.")
+        return
+    row, col = event.selection.cells[0]
+    key = tuple(grid.loc[row, list(pivot.index.names)])
+    if col in reason.columns and reason.at[key, col]:
+        st.write(f"**{col}** · {reason.at[key, col]}")
+
+
 # ---------- app ---------- #
 st.set_page_config(page_title=PAGE_TITLE, layout="wide")
 st.title(PAGE_TITLE)
+timer = StageTimer.from_page()   # ?debug=1 → per‑stage timings in the sidebar
 
 df = load_data(CSV_PATH)
-
-# pupil picker
-pupil = st.selectbox("Pupil Name", sorted(df["Pupil Name"].dropna().unique()))
+index = load_index(CSV_PATH)
+timer.lap("load (cached)")
+
+# pupil picker: type to narrow, only the top matches reach the browser
+cols = st.columns([2] + [1] * len(index.scope_cols))
+query = cols[0].text_input("Search pupils", placeholder="Start typing a name…")
+scope = {
+    c: col.selectbox(c, index.scope_values(c), index=None, placeholder="Any")
+    for c, col in zip(index.scope_cols, cols[1:])
+}
+pupil = st.selectbox("Pupil Name", index.search(query, limit=50, **scope))
+renderer = st.radio(
+    "Renderer", ["Styled table", "Fast grid"], horizontal=True,
+    help="Fast grid streams the numbers as Arrow; click a cell for its reason.",
+)
+timer.lap("input parsing")
+if pupil is None:
+    st.info("No pupils match that search.")
+    timer.render("portfolio")
+    st.stop()
 p_df = df.loc[df["Pupil Name"] == pupil].copy()
 
 # tidy labels for display
@@ -72,6 +126,7 @@ pivot = (
         columns="Purpose",
         values="Judgement (%)",
         aggfunc="first",
+        observed=True,
     )
     .astype("string")
     .replace("nan", np.nan)
@@ -84,7 +139,11 @@ reason = (
         columns="Purpose",
         values="🤖 REASON",
         aggfunc="first",
+        observed=True,
     )
+    # pivot_table drops cells whose reasons are all missing; keep the grid's shape
+    .reindex(index=pivot.index, columns=pivot.columns)
+    .astype("string")
     .fillna("")
 )
 
@@ -96,6 +155,13 @@ guidance_lookup = (
     .set_index(["KS2 Standard", "KS2 Statement", "Criterion"])["criteria guidance"]
     .to_dict()
 )
+timer.lap("pivot")
+
+if renderer == "Fast grid":
+    with timer.stage("grid"):
+        render_grid(pivot, reason)
+    timer.render("portfolio")
+    st.stop()
 
 # replace index with HTML span that carries guidance tooltip
 pivot_reset = pivot.reset_index()
@@ -105,15 +171,20 @@ pivot_reset["Criterion"] = pivot_reset.apply(
 )
 pivot_reset.set_index(["KS2 Standard", "KS2 Statement", "Criterion"], inplace=True)
 pivot = pivot_reset
+reason.index = pivot.index     # same rows, so the tooltips still line up
+timer.lap("formatting")
 
 # style table
 styler = (
     pivot.style.format(na_rep="")
-    .applymap(traffic_colour)
+    .map(traffic_colour)
     .set_tooltips(reason)   # cell‑level tooltips
 )
 
 # show
+with timer.stage("Styler.to_html"):
+    html = styler.to_html(escape=False)
 st.markdown(
-    styler.to_html(escape=False), unsafe_allow_html=True
+    html, unsafe_allow_html=True
 )
+timer.render("portfolio")
@@ -0,0 +1,294 @@
+"""
+portfolio_data.py
+Streamlit‑free data helpers shared by the Portfolio View pages.
+"""
+
+import glob
+import importlib.util
+import os
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+SCOPES = ["School", "Class"]   # optional columns the pupil search can filter on
+CELL = ["KS2 Standard", "KS2 Statement", "Criterion"]
+LABELS = [                      # repeated text → one shared categorical per column
+    "Pupil Name",
+    "KS2 Standard",
+    "KS2 Statement",
+    "Purpose",
+    "Criterion",
+    "🤖 REASON",
+    "criteria guidance",
+    *SCOPES,
+]
+# pyarrow ships with streamlit, parses multi‑threaded and drops the GIL
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+
+
+# ── LOADING ───────────────────────────────────────────────────────────────────
+def expand_sources(source: str) -> list:
+    """A CSV path, a directory of CSVs or a glob → sorted list of files."""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, "*.csv"))
+    elif glob.has_magic(source):
+        paths = glob.glob(source)
+    else:
+        paths = [source]
+    if not paths:
+        raise FileNotFoundError(f"no CSV files match {source!r}")
+    return sorted(paths)
+
+
+def _read_school(path: str, dtype, tag: bool) -> pd.DataFrame:
+    df = pd.read_csv(path, dtype=dtype, engine=CSV_ENGINE)
+    if tag:
+        school = Path(path).stem
+        df["School"] = df["School"].fillna(school) if "School" in df else school
+    for col in LABELS:
+        if col in df:
+            cat = df[col].astype("category").cat
+            df[col] = cat.rename_categories(cat.categories.astype(str))
+    return df
+
+
+def load_portfolio(source: str, dtype=None, workers: int | None = None) -> pd.DataFrame:
+    """Read one export per school concurrently and stack them.
+
+    When more than one file is read, each row is tagged with its source
+    school (the file stem, unless the export carries its own "School"
+    column); a single export keeps only the School column it has, if any,
+    so the pages don't offer a one‑value School filter.  Label columns come back as
+    categoricals whose categories are the union over every file, so codes
+    mean the same thing whichever school a row came from.
+    """
+    paths = expand_sources(source)
+    workers = workers or min(32, len(paths))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(lambda p: _read_school(p, dtype, len(paths) > 1), paths))
+    if len(frames) == 1:
+        return frames[0]
+
+    cats = [c for c in LABELS if any(c in f for f in frames)]
+    out = pd.concat([f.drop(columns=cats, errors="ignore") for f in frames],
+                    ignore_index=True)
+    none = pd.Index([], dtype=object).astype(str)
+    for col in cats:
+        parts = [
+            f[col] if col in f else pd.Categorical.from_codes([-1] * len(f), none)
+            for f in frames
+        ]
+        out[col] = union_categoricals(parts, sort_categories=True)
+    return out
+
+
+def load_judgements(source: str) -> pd.DataFrame:
+    """The Portfolio View columns plus a numeric `Judgement_num`."""
+    df = load_portfolio(source, dtype=str)      # labels arrive as categoricals
+    keep = [
+        "Pupil Name",
+        "Judgement (%)",
+        "KS2 Standard",
+        "KS2 Statement",
+        "Purpose",
+        "Criterion",
+        "🤖 REASON",
+        "criteria guidance",
+    ]
+    df = df[keep + [c for c in SCOPES if c in df.columns]]
+    df["Judgement_num"] = (
+        df["Judgement (%)"].str.rstrip("%").replace("", pd.NA).astype(float)
+    )
+    return df
+
+
+def reason_cells(df: pd.DataFrame) -> pd.Series:
+    """Every pupil's " | "-joined reasons per (cell, Purpose), built once."""
+    keys = ["Pupil Name", *CELL, "Purpose"]
+    cells = (
+        df[keys]
+        .assign(code=df["🤖 REASON"].cat.codes)
+        .dropna(subset=keys)
+        .query("code >= 0")
+        .drop_duplicates()             # == s.unique(), first-seen order kept
+    )
+    cells["slot"] = cells.groupby(keys, sort=False, observed=True).cumcount()
+    codes = cells.set_index([*keys, "slot"])["code"].unstack("slot", fill_value=-1)
+
+    # one text column per re-mark slot; code -1 lands on the trailing ""
+    labels = np.append(df["🤖 REASON"].cat.categories.to_numpy(dtype=object), "")
+    text = labels[codes.to_numpy()]
+    joined = text[:, 0]
+    for k in range(1, text.shape[1]):
+        joined = joined + np.where(text[:, k] == "", "", " | ") + text[:, k]
+    return pd.Series(joined, index=codes.index, name="🤖 REASON").sort_index()
+
+
+# ── PIVOT ─────────────────────────────────────────────────────────────────────
+def pupil_pivot(df: pd.DataFrame, reasons_all: pd.Series, pupil: str):
+    """(numeric pivot, same‑shape reasons, criterion guidance) for one pupil."""
+    view = df[df["Pupil Name"] == pupil]
+    pivot = (
+        view.pivot_table(
+            index=CELL,
+            columns="Purpose",
+            values="Judgement_num",
+            aggfunc="mean",
+            observed=True,
+        )
+        .round(0)
+        .sort_index()
+    )
+
+    # identical‑shape frame of reasons (pre‑joined at load time)
+    if pupil in reasons_all.index:
+        reasons = reasons_all.loc[pupil].unstack("Purpose")
+    else:
+        reasons = pd.DataFrame(index=pivot.index, columns=pivot.columns)
+    reasons = reasons.reindex(index=pivot.index, columns=pivot.columns)
+
+    # guidance for each Criterion (for the row‑label tooltip)
+    guidance = view.groupby(CELL, observed=True)["criteria guidance"].first()
+    return pivot, reasons, guidance
+
+
+# ── STYLE ─────────────────────────────────────────────────────────────────────
+def wrap(txt: str, width: int = 28, lines: int = 2) -> str:
+    """Wrap & crop, but keep the full text as a tooltip via <span title="">."""
+    if pd.isna(txt):
+        return ""
+    wrapped = textwrap.fill(txt, width=width)
+    out_lines = wrapped.split("\n")[:lines]
+    display  = "\n".join(out_lines)
+    if len(out_lines) < len(wrapped.split("\n")):
+        display += "…"
+    # embed HTML so the full text shows on hover
+    return f'<span title="{txt}">{display}</span>'
+
+
+def colour(v: float) -> str:
+    """Red→Yellow→Green smooth gradient for 0‑100."""
+    if pd.isna(v):
+        return ""
+    v = max(0, min(100, v))
+    if v <= 50:              # red‑>yellow
+        f = v / 50
+        r, g, b = 244 + (11 * f), 67 + (168 * f), 54 + (5 * f)
+    else:                    # yellow‑>green
+        f = (v - 50) / 50
+        r, g, b = 255 + (-179 * f), 235 + (-60 * f), 59 + (21 * f)
+    return f"background-color:#{int(r):02x}{int(g):02x}{int(b):02x};"
+
+
+def portfolio_styler(pivot: pd.DataFrame, reasons: pd.DataFrame, guidance: pd.Series):
+    """Colour‑scaled Styler with reason tooltips and wrapped row labels."""
+    # 1) make prettier index with inline tooltips
+    pivot = pivot.copy()
+    pivot.index = pd.MultiIndex.from_tuples(
+        [
+            (wrap(a), wrap(b), wrap(c))   # full text preserved in title attr
+            for a, b, c in pivot.index
+        ],
+        names=CELL,
+    )
+
+    # 2) collapse index into columns so Styler can attach tooltips easily
+    disp = pivot.reset_index()
+    disp["Criterion ⓘ"] = disp["Criterion"]          # show criterion as a column
+    disp = disp.drop(columns="Criterion").set_index(
+        ["KS2 Standard", "KS2 Statement", "Criterion ⓘ"]
+    )
+
+    reas = reasons.reset_index()
+    reas["Criterion ⓘ"] = disp.index.get_level_values("Criterion ⓘ")
+    reas = reas.set_index(
+        ["KS2 Standard", "KS2 Statement", "Criterion ⓘ"]
+    )
+
+    # attach criterion‑level guidance tooltip to the index column itself
+    reas["Criterion ⓘ"] = reas.index.get_level_values("Criterion ⓘ").map(
+        lambda x: guidance.get(x.strip("<span title=\"").split("\">")[0], "")
+    )
+
+    return (
+        disp.style
+        .map(colour)
+        .format("{:.0f}%")
+        .set_tooltips(reas)            # cell reasons + row‑label guidance
+        .set_table_styles([            # keep left margin narrow & wrapped
+            {"selector":"th",
+             "props":[("max-width","180px"),("white-space","pre-wrap")]}
+        ])
+        .hide(axis="index", level=0)   # hide top‑level index header row
+        .format(escape=False)          # allow our inline HTML tooltips
+    )
+
+
+# ── PUPIL SEARCH ──────────────────────────────────────────────────────────────
+class PupilIndex:
+    """Sorted prefix index over pupil names.
+
+    Every word start of a name is a key ("amy", "amy jones" → "jones"), so a
+    typed prefix matches first names and surnames alike.  Lookups are two
+    binary searches over one sorted array plus an optional scope mask; an
+    empty prefix lists every name in full‑name order instead.
+    """
+
+    def __init__(self, df: pd.DataFrame, name_col: str = "Pupil Name"):
+        self.scope_cols = [c for c in SCOPES if c in df.columns]
+        rows = df[[name_col, *self.scope_cols]].dropna(subset=[name_col])
+        rows = rows.drop_duplicates().reset_index(drop=True)
+
+        names = rows[name_col].astype(str)
+        words = names.str.casefold().str.split()
+        starts = words.map(lambda w: [" ".join(w[i:]) for i in range(len(w))])
+        keys = starts.explode().dropna()
+        rowid = keys.index.to_numpy()
+
+        order = np.argsort(keys.to_numpy(dtype=str), kind="stable")
+        self._keys = keys.to_numpy(dtype=str)[order]
+        self._rows = rowid[order]
+        self._names = names.to_numpy(dtype=object)
+        self._by_name = np.argsort(names.str.casefold().to_numpy(dtype=str), kind="stable")
+        self._scopes = {c: rows[c].to_numpy(dtype=object) for c in self.scope_cols}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def scope_values(self, col: str) -> list:
+        """Sorted distinct values of a scope column (empty if absent)."""
+        if col not in self._scopes:
+            return []
+        return sorted(pd.unique(pd.Series(self._scopes[col]).dropna()))
+
+    def search(self, prefix: str = "", limit: int = 50, **scope) -> list:
+        """Top `limit` names (alphabetical by matched word) for `prefix`, or
+        by full name when nothing has been typed yet.
+
+        Keyword arguments filter on scope columns, e.g. ``School="Oakfield"``;
+        ``None`` means "any".
+        """
+        p = " ".join(prefix.casefold().split())
+        if p:
+            lo = np.searchsorted(self._keys, p, side="left")
+            hi = np.searchsorted(self._keys, p + "\U0010ffff", side="left")
+            rows = self._rows[lo:hi]
+        else:                          # every word start would mix first names and surnames
+            rows = self._by_name
+
+        for col, val in scope.items():
+            if val is not None and col in self._scopes:
+                rows = rows[self._scopes[col][rows] == val]
+
+        out, seen = [], set()
+        for name in self._names[rows]:
+            if name not in seen:
+                seen.add(name)
+                out.append(name)
+                if len(out) == limit:
+                    break
+        return out
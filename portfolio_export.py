@@ -0,0 +1,163 @@
+"""
+portfolio_export.py — print‑ready Portfolio View grids for every pupil
+Run with:  python portfolio_export.py dataset.csv --out reports/
+           python portfolio_export.py "exports/*.csv" --school Oakfield --format pdf
+
+Same pivot, colour scale and tooltips as portfolioView1.py, no Streamlit.
+One report per (school, pupil), named school_pupil (a -2, -3 … suffix when
+two names slugify alike), so same‑named pupils never share or overwrite a
+file; rows without a School are exported under "No school".  Pupils are rendered across a process pool; each report is written as
+soon as it is ready and progress is printed as reports/s.
+PDF output needs WeasyPrint (pip install weasyprint).
+"""
+
+import argparse
+import html
+import importlib.util
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from portfolio_data import load_judgements, portfolio_styler, pupil_pivot, reason_cells
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+  body  {{ font-family: sans-serif; font-size: 11px; margin: 1.5em; }}
+  table {{ border-collapse: collapse; }}
+  td, th {{ border: 1px solid #ddd; padding: 4px 6px; }}
+  @page {{ size: A4 landscape; margin: 12mm; }}
+</style></head>
+<body><h2>{title}</h2>
+{table}
+</body></html>
+"""
+
+NO_SCHOOL = "No school"
+
+# worker state, filled once per process by _init:
+# school → (rows, reasons, {pupil: row positions})
+_SCHOOLS = {}
+
+
+def _init(schools: dict) -> None:
+    _SCHOOLS.update(schools)
+
+
+def _by_school(df: pd.DataFrame) -> dict:
+    """{school: (rows, pre‑joined reasons, {pupil: row positions})}; a single
+    None entry without a School column.  Reasons are joined per school so
+    same‑named pupils in different schools keep their own, and each school is
+    split by pupil once so a report only pivots its own pupil's rows."""
+    groups = [(None, df)] if "School" not in df else df.groupby("School", observed=True)
+    return {
+        s: (g, reason_cells(g), g.groupby("Pupil Name", observed=True).indices)
+        for s, g in groups
+    }
+
+
+def _slug(name: str, fallback: str = "pupil") -> str:
+    return re.sub(r"[^\w-]+", "_", name).strip("_") or fallback
+
+
+def _filenames(keys: list, fmt: str) -> list:
+    """A distinct file name per (school, pupil); clashes get -2, -3 …
+    (compared case‑insensitively, for case‑insensitive file systems)."""
+    taken, out = set(), []
+    for school, pupil in keys:
+        stem = _slug(pupil) if school is None else f"{_slug(school, 'school')}_{_slug(pupil)}"
+        name, n = stem, 1
+        while name.casefold() in taken:
+            n += 1
+            name = f"{stem}-{n}"
+        taken.add(name.casefold())
+        out.append(f"{name}.{fmt}")
+    return out
+
+
+def _render(jobs: list, out_dir: str, fmt: str) -> tuple:
+    """Write one report per (school, pupil, file name); returns (reports, bytes)
+    for the chunk."""
+    if fmt == "pdf":
+        from weasyprint import HTML
+    done = size = 0
+    for school, pupil, filename in jobs:
+        rows, reasons, positions = _SCHOOLS[school]
+        pivot, reasons, guidance = pupil_pivot(rows.iloc[positions[pupil]], reasons, pupil)
+        title = pupil if school is None else f"{pupil} ({school})"
+        page = PAGE.format(
+            title=f"Portfolio View — {html.escape(title)}",
+            table=portfolio_styler(pivot, reasons, guidance).to_html(),
+        )
+        path = os.path.join(out_dir, filename)
+        if fmt == "pdf":
+            HTML(string=page).write_pdf(path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(page)
+        done += 1
+        size += os.path.getsize(path)
+    return done, size
+
+
+def export(source, out_dir, fmt="html", school=None, workers=None, chunk=25):
+    df = load_judgements(source)
+    if "School" in df and df["School"].isna().any():
+        missing = df.loc[df["School"].isna(), "Pupil Name"].nunique()
+        print(f"{missing:,} pupils have rows without a School; exporting them under {NO_SCHOOL!r}",
+              file=sys.stderr)
+        df["School"] = df["School"].astype("string").fillna(NO_SCHOOL)
+    if school is not None:
+        if "School" not in df:
+            raise ValueError("--school needs several exports or a School column")
+        df = df[df["School"] == school]
+    schools = _by_school(df)
+    keys = sorted((s, p) for s, (_, _, positions) in schools.items() for p in positions)
+    pupils = [(s, p, f) for (s, p), f in zip(keys, _filenames(keys, fmt))]
+    os.makedirs(out_dir, exist_ok=True)
+
+    batches = [pupils[i:i + chunk] for i in range(0, len(pupils), chunk)]
+    start = time.perf_counter()
+    done = size = 0
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init, initargs=(schools,)
+    ) as pool:
+        jobs = [pool.submit(_render, b, out_dir, fmt) for b in batches]
+        for job in as_completed(jobs):
+            n, b = job.result()
+            done, size = done + n, size + b
+            rate = done / (time.perf_counter() - start)
+            print(f"\r{done:,}/{len(pupils):,} reports  {rate:,.1f}/s", end="", flush=True)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"\n{done:,} {fmt.upper()} reports, {size / 1e6:,.1f} MB in {elapsed:,.1f}s "
+        f"({done / elapsed if elapsed else 0:,.1f} reports/s) → {out_dir}"
+    )
+    return done
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    ap.add_argument("source", help="a CSV, a folder of per‑school CSVs, or a glob")
+    ap.add_argument("--out", default="reports", help="output folder (default: reports)")
+    ap.add_argument("--format", choices=["html", "pdf"], default="html")
+    ap.add_argument("--school", help="only export pupils from this school")
+    ap.add_argument("--workers", type=int, help="processes (default: all cores)")
+    ap.add_argument("--chunk", type=int, default=25, help="pupils per task")
+    args = ap.parse_args(argv)
+
+    if args.format == "pdf" and importlib.util.find_spec("weasyprint") is None:
+        sys.exit("PDF export needs WeasyPrint: pip install weasyprint")
+    try:
+        export(args.source, args.out, args.format, args.school, args.workers, args.chunk)
+    except ValueError as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
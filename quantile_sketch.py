@@ -0,0 +1,113 @@
+"""
+quantile_sketch.py
+Mergeable streaming quantile sketches for a whole grid of cells at once.
+
+A t‑digest‑style merging digest: each cell keeps at most about
+compression / 2 weighted centroids, small in the tails and wide in the
+middle (the k1 scale function), so P5 / P95 stay accurate while memory stays
+constant however many values stream through.  Every cell of, say, a
+(quarters, lines) grid is updated with array operations – one sort per
+update, no Python loop over cells.  Two sketches merge by compressing their
+centroids together, so Monte Carlo workers sketch their own chunks and the
+parent only merges a few KB per chunk.
+
+    sketch = QuantileSketch((T, lines))
+    for block in chunks:                  # each (n, T, lines)
+        sketch.update(block)
+    p5, p50, p95 = sketch.quantile((0.05, 0.5, 0.95))
+"""
+
+import numpy as np
+
+
+class QuantileSketch:
+    def __init__(self, shape=(), compression: int = 200):
+        self.shape = tuple(shape)
+        self.compression = int(compression)
+        self.slots = self.compression // 2 + 1           # centroids kept per cell, at most
+        cells = int(np.prod(self.shape, dtype=int))
+        self.means = np.zeros((cells, 0))
+        self.weights = np.zeros((cells, 0))
+        self.min = np.full(cells, np.inf)
+        self.max = np.full(cells, -np.inf)
+        self.count = 0
+
+    @classmethod
+    def of(cls, values, compression: int = 200) -> "QuantileSketch":
+        """Sketch of (n, *shape) values."""
+        values = np.asarray(values, dtype=float)
+        return cls(values.shape[1:], compression).update(values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.means.nbytes + self.weights.nbytes + self.min.nbytes + self.max.nbytes
+
+    def update(self, values) -> "QuantileSketch":
+        """Add n observations of every cell; `values` is (n, *shape)."""
+        values = np.asarray(values, dtype=float)
+        if values.shape[1:] != self.shape:
+            raise ValueError(f"values of shape {values.shape} don't fit a sketch of cells {self.shape}")
+        x = values.reshape(len(values), -1).T              # (cells, n)
+        if not x.size:
+            return self
+        # fresh values all weigh 1, so once sorted every cell shares the same
+        # group boundaries: one sort and one reduceat, then merge centroids
+        x = np.sort(x, axis=1)
+        n = x.shape[1]
+        group = self._group((np.arange(n) + 0.5) / n)
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+        sizes = np.diff(np.r_[starts, n]).astype(float)
+        chunk = QuantileSketch(self.shape, self.compression)
+        chunk.means = np.add.reduceat(x, starts, axis=1) / sizes
+        chunk.weights = np.broadcast_to(sizes, chunk.means.shape).copy()
+        chunk.min, chunk.max, chunk.count = x[:, 0], x[:, -1], n
+        if not self.count:
+            self.means, self.weights, self.min, self.max, self.count = (
+                chunk.means, chunk.weights, chunk.min, chunk.max, chunk.count)
+            return self
+        return self.merge(chunk)
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Fold `other` (same cells and compression) into this sketch."""
+        if (other.shape, other.compression) != (self.shape, self.compression):
+            raise ValueError("can only merge sketches with the same cells and compression")
+        if not other.count:
+            return self
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.count += other.count
+        self._compress(np.concatenate([self.means, other.means], axis=1),
+                       np.concatenate([self.weights, other.weights], axis=1))
+        return self
+
+    def _group(self, mid: np.ndarray) -> np.ndarray:
+        """Slot of each centroid from its cumulative‑weight midpoint: centroids
+        in the same unit of k(q) = δ/2π · asin(2q − 1) are pooled."""
+        k = self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * mid - 1, -1, 1))
+        return np.clip(np.floor(k + self.compression / 4), 0, self.slots - 1).astype(np.intp)
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, axis=1, kind="stable")
+        x = np.take_along_axis(means, order, axis=1)
+        w = np.take_along_axis(weights, order, axis=1)
+        group = self._group((np.cumsum(w, axis=1) - w / 2) / self.count)
+
+        cells = len(x)
+        index = (group + np.arange(cells)[:, None] * self.slots).ravel()
+        size = cells * self.slots
+        total = np.bincount(index, weights=w.ravel(), minlength=size).reshape(cells, self.slots)
+        moment = np.bincount(index, weights=(w * x).ravel(), minlength=size).reshape(cells, self.slots)
+        self.weights = total
+        self.means = np.divide(moment, total, out=np.zeros_like(moment), where=total > 0)
+
+    def quantile(self, q) -> np.ndarray:
+        """(len(q), *shape) quantiles, or *shape for a scalar q; NaN while empty."""
+        q = np.asarray(q, dtype=float)
+        out = np.full((q.size, len(self.means)), np.nan)
+        if self.count:
+            for c, (x, w) in enumerate(zip(self.means, self.weights)):
+                x, w = x[w > 0], w[w > 0]
+                centre = np.cumsum(w) - w / 2            # each centroid sits mid‑way through its weight
+                out[:, c] = np.interp(q.ravel() * self.count, np.r_[0.0, centre, self.count],
+                                      np.r_[self.min[c], x, self.max[c]])
+        return out.reshape(q.shape + self.shape)
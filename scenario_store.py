@@ -0,0 +1,114 @@
+"""
+scenario_store.py
+Named forecast scenarios in SQLite, computed results cached on disk.
+
+Scenarios are parameter dicts saved under a name ("Board deck – Sep").
+Results are content‑addressed: the key is a hash of the parameters, the
+timeline and forecast_engine.ENGINE_VERSION, the value an .npz of the
+engine's (K, T) arrays.  Reopening or sharing a scenario is then a file read,
+and the cache survives restarts.
+Given a shared_cache.SharedCache, hot results are served from memory first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from forecast_engine import ENGINE_VERSION
+
+STORE_DIR = os.environ.get("STYLUS_STORE", ".stylus")
+
+
+def _jsonable(v):
+    if isinstance(v, np.ndarray):
+        return v.tolist()
+    if isinstance(v, np.generic):
+        return v.item()
+    raise TypeError(f"cannot store {type(v).__name__} in a scenario")
+
+
+def result_key(params: dict, qtrs: list, kind: str = "forecast") -> str:
+    """Stable hash of everything a result depends on, engine version included."""
+    blob = json.dumps(
+        {"engine": ENGINE_VERSION, "kind": kind, "params": params, "quarters": list(qtrs)},
+        sort_keys=True, default=_jsonable, separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class ScenarioStore:
+    def __init__(self, root: str = STORE_DIR, memory=None):
+        self.root = root
+        self.memory = memory
+        self.results_dir = os.path.join(root, "results")
+        os.makedirs(self.results_dir, exist_ok=True)
+        self._db = os.path.join(root, "scenarios.db")
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS scenarios ("
+                " name TEXT PRIMARY KEY, params TEXT NOT NULL, saved_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db, timeout=10)
+
+    # ── named scenarios ──────────────────────────────────────────────────────
+    def names(self) -> list:
+        with self._connect() as db:
+            return [r[0] for r in db.execute("SELECT name FROM scenarios ORDER BY name")]
+
+    def save(self, name: str, params: dict) -> None:
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO scenarios VALUES (?, ?, ?)",
+                (name, json.dumps(params, sort_keys=True, default=_jsonable), time.time()),
+            )
+
+    def load(self, name: str) -> dict:
+        with self._connect() as db:
+            row = db.execute("SELECT params FROM scenarios WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return json.loads(row[0])
+
+    def delete(self, name: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM scenarios WHERE name = ?", (name,))
+
+    # ── result cache ─────────────────────────────────────────────────────────
+    def _path(self, key: str) -> str:
+        return os.path.join(self.results_dir, f"{key}.npz")
+
+    def get_result(self, key: str):
+        """Cached arrays for `key`, or None."""
+        try:
+            with np.load(self._path(key)) as z:
+                return {k: z[k] for k in z.files}
+        except FileNotFoundError:
+            return None
+
+    def put_result(self, key: str, result: dict) -> None:
+        tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **result)
+        os.replace(tmp, self._path(key))       # readers never see half a file
+
+    def _load_or_compute(self, key: str, params: dict, qtrs: list, compute) -> dict:
+        result = self.get_result(key)
+        if result is None:
+            result = compute(params, qtrs)
+            self.put_result(key, result)
+        return result
+
+    def cached(self, params: dict, qtrs: list, compute, kind: str = "forecast") -> dict:
+        """compute(params, qtrs) through the memory (if any) and disk caches."""
+        key = result_key(params, qtrs, kind)
+        if self.memory is None:
+            return self._load_or_compute(key, params, qtrs, compute)
+        return self.memory.get_or_compute(
+            ("result", key), lambda: self._load_or_compute(key, params, qtrs, compute)
+        )
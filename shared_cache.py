@@ -0,0 +1,133 @@
+"""
+shared_cache.py
+One in‑memory LRU cache per server process, shared by every session.
+
+Streamlit sessions (and the API threads) look results up here before
+computing them, so 30 viewers of the default scenario share one copy of its
+arrays instead of holding 30.  The cache is bounded by a byte budget –
+STYLUS_CACHE_MB, default 256 – and evicts least‑recently‑used entries.
+
+Values are shared, so treat them as read‑only: NumPy arrays are frozen
+(writeable=False) on the way in.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CACHE_MB = float(os.environ.get("STYLUS_CACHE_MB", 256))
+
+
+def sizeof(obj) -> int:
+    """Approximate resident bytes of a cached value."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(sizeof(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(sizeof(v) for v in obj)
+    if hasattr(obj, "__dict__"):
+        return sizeof(vars(obj))
+    return sys.getsizeof(obj)
+
+
+def _freeze(obj):
+    if isinstance(obj, np.ndarray):
+        obj.flags.writeable = False
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            _freeze(v)
+    return obj
+
+
+class SharedCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self._items = OrderedDict()          # key → (value, nbytes), oldest first
+        self._lock = threading.Lock()
+        self._computing = {}                 # key → Lock, so a miss is computed once
+        self.hits = self.misses = self.evictions = self.oversize = 0
+        self.bytes = 0
+
+    def get(self, key):
+        """Cached value or None (counts a hit or a miss)."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, nbytes: int = None):
+        nbytes = sizeof(value) if nbytes is None else nbytes
+        _freeze(value)
+        with self._lock:
+            if nbytes > self.max_bytes:
+                self.oversize += 1           # would evict everything; don't keep it
+                return value
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._items[key] = (value, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                _, (_, size) = self._items.popitem(last=False)
+                self.bytes -= size
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Cached value for `key`, else compute() once – concurrent callers wait."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            gate = self._computing.setdefault(key, threading.Lock())
+        with gate:
+            with self._lock:
+                item = self._items.get(key)
+                if item is not None:             # another session got there first
+                    self.hits, self.misses = self.hits + 1, self.misses - 1
+                    return item[0]
+            try:
+                return self.put(key, compute())
+            finally:
+                with self._lock:
+                    self._computing.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self.bytes,
+                "budget_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "oversize": self.oversize,
+            }
+
+
+_shared = SharedCache(CACHE_MB * 2**20)
+
+
+def shared() -> SharedCache:
+    """The process‑wide cache."""
+    return _shared
@@ -7,11 +7,20 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 
+from forecast_engine import PRICING, REVENUE_LEVERS, load_preset, run_forecast, run_revenue
+from scenario_store import result_key
+from shared_cache import shared
+
 st.set_page_config(page_title="Stylus Forecast Model", layout="wide")
 
 # ─────── NAV ───────
 page = st.sidebar.radio("Choose view", ["Revenue", "Cash-flow"], index=0)
 
+# default levers & timeline for this model (presets/app.json)
+preset   = load_preset("app")
+defaults = preset["params"]
+pricing  = defaults.get("pricing", PRICING)
+
 # ─────── REVENUE INPUTS ───────
 if page == "Revenue":
     st.sidebar.header("Growth assumptions")
@@ -23,181 +32,125 @@ else:  # page == Cash-flow
 # shared revenue sliders (appear in Revenue; hidden in expander on Cash-flow)
 with (st.sidebar if page == "Revenue" else st.sidebar.expander("Revenue knobs", expanded=False)):
     # UK
-    start_uk        = st.number_input("Starting UK schools (Q3 ’25)", 1, 2_000, 25)
-    uk_growth_fast  = st.slider("Hyper-growth factor (× over first 2 yrs)", 1.0, 10.0, 3.0, .5)
-    uk_growth_taper = st.slider("Annual growth after taper (-%)", 0, 100, 20, 5) / 100
+    start_uk        = st.number_input("Starting UK schools (Q3 ’25)", 1, 2_000, defaults["starting_uk_schools"])
+    uk_growth_fast  = st.slider("Hyper-growth factor (× over first 2 yrs)", 1.0, 10.0, defaults["hyper_growth_factor"], .5)
+    uk_growth_taper = st.slider("Annual growth after taper (-%)", 0, 100, round(defaults["taper_growth_rate"] * 100), 5) / 100
 
     # MATs
-    trials_q       = st.number_input("MAT trials each quarter", 1, 100, 20)
-    conv_rate      = st.slider("MAT conversion rate", 0.0, 1.0, .70, .05)
-    mat_multiplier = st.number_input("Schools per MAT", 1, 30, 10)
+    trials_q       = st.number_input("MAT trials each quarter", 1, 100, defaults["mat_trials_per_quarter"])
+    conv_rate      = st.slider("MAT conversion rate", 0.0, 1.0, defaults["mat_conversion_rate"], .05)
+    mat_multiplier = st.number_input("Schools per MAT", 1, 30, defaults["schools_per_mat"])
 
     # US
-    dist_start_q   = st.selectbox("US launch quarter", ["2027Q1", "2027Q2", "2027Q3"], 0)
-    dist_add_q     = st.number_input("US districts added / quarter", 1, 50, 15)
+    dist_start_q   = st.selectbox("US launch quarter", ["2027Q1", "2027Q2", "2027Q3"],
+                                  ["Q1 2027", "Q2 2027", "Q3 2027"].index(defaults["us_launch_quarter"]))
+    dist_add_q     = st.number_input("US districts added / quarter", 1, 50, defaults["districts_per_quarter"])
 
     # EAL
-    eal_start_q        = st.selectbox("EAL launch quarter", ["2028Q1", "2028Q2", "2028Q3"], 0)
-    eal_start_learners = st.number_input("EAL learners at launch (m)", .1, 20.0, 1.0, .1) * 1_000_000
-    eal_q_mult         = st.slider("EAL learner growth each quarter (×)", 1.0, 4.0, 2.0, .25)
+    eal_start_q        = st.selectbox("EAL launch quarter", ["2028Q1", "2028Q2", "2028Q3"],
+                                      ["Q1 2028", "Q2 2028", "Q3 2028"].index(defaults["eal_launch_quarter"]))
+    eal_start_learners = st.number_input("EAL learners at launch (m)", .1, 20.0, defaults["initial_eal_learners"] / 1_000_000, .1) * 1_000_000
+    eal_q_mult         = st.slider("EAL learner growth each quarter (×)", 1.0, 4.0, defaults["eal_growth_multiplier"], .25)
 
     # Pricing (annual)
-    school_price_y1 = st.number_input("School price Y1 (£k)", 1, 50, 5) * 1_000
-    school_price_y2 = st.number_input("School price Y2 (£k)", 1, 50, 10) * 1_000
-    school_price_y3 = st.number_input("School price Y3+ (£k)", 1, 50, 15) * 1_000
-    dist_price_y1   = st.number_input("District price Y1 (£k)", 10, 500, 100) * 1_000
-    dist_price_y2   = st.number_input("District price Y2+ (£k)", 10, 500, 150) * 1_000
-    eal_price_yr    = 30  # fixed
+    school_price_y1 = st.number_input("School price Y1 (£k)", 1, 50, round(pricing["uk_school"]["price"][0] / 1_000)) * 1_000
+    school_price_y2 = st.number_input("School price Y2 (£k)", 1, 50, round(pricing["uk_school"]["price"][1] / 1_000)) * 1_000
+    school_price_y3 = st.number_input("School price Y3+ (£k)", 1, 50, round(pricing["uk_school"]["price"][2] / 1_000)) * 1_000
+    dist_price_y1   = st.number_input("District price Y1 (£k)", 10, 500, round(pricing["us_district"]["price"][0] / 1_000)) * 1_000
+    dist_price_y2   = st.number_input("District price Y2+ (£k)", 10, 500, round(pricing["us_district"]["price"][1] / 1_000)) * 1_000
 
 # ─────── COST INPUTS ───────
+# the cost widgets only exist on Cash-flow; re-assigning their keys every run
+# keeps their values (instead of Streamlit dropping them) while Revenue is up.
+# widget key → (engine lever, lever units per widget unit: £k → £, % → fraction)
+COST_WIDGETS = {
+    "c_hires": ("quarterly_hires", 1), "c_salary": ("avg_new_hire_salary", 1_000),
+    "c_salary_infl": ("salary_inflation", .01), "c_sm": ("sales_marketing_pct", .01),
+    "c_office": ("office_rent_monthly", 1_000), "c_opex": ("other_opex_monthly", 1_000),
+    "c_opex_inf": ("operational_inflation", .01), "c_rnd": ("rd_quarterly", 1_000),
+    "c_cogs1": ("api_cost_year1", .01), "c_cogs2": ("api_cost_year2", .01), "c_cogs3": ("api_cost_year3", .01),
+    "c_us": ("us_launch_cost", 1_000), "c_eal": ("eal_launch_cost", 1_000),
+}
+for k, (lever, scale) in COST_WIDGETS.items():
+    st.session_state[k] = st.session_state.get(k, round(defaults[lever] / scale))
+
 if page == "Cash-flow":
     st.sidebar.header("Cost levers")
 
-    hires_per_q   = st.slider("New FT hires / quarter (from 2026Q1)", 0, 10, 2)
-    salary_new    = st.number_input("Avg salary new hire (£k)", 40, 200, 80) * 1_000
-    salary_infl   = st.slider("Salary inflation / year (%)", 0, 20, 4) / 100
+    st.slider("New FT hires / quarter (from 2026Q1)", 0, 10, key="c_hires")
+    st.number_input("Avg salary new hire (£k)", 40, 200, key="c_salary")
+    st.slider("Salary inflation / year (%)", 0, 20, key="c_salary_infl")
 
-    sm_pct_rev    = st.slider("Sales & marketing (% of revenue)", 0, 100, 12) / 100
+    st.slider("Sales & marketing (% of revenue)", 0, 100, key="c_sm")
 
-    office_rent_m = st.number_input("Office rent (£k / m)", 1, 100, 5) * 1_000
-    other_opex_m  = st.number_input("Other OpEx base (£k / m)", 1, 200, 10) * 1_000
-    opex_inf      = st.slider("OpEx inflation / year (%)", 0, 20, 5) / 100
-    rnd_q         = st.number_input("R&D spend / quarter (£k)", 0, 1_000, 150) * 1_000
+    st.number_input("Office rent (£k / m)", 1, 100, key="c_office")
+    st.number_input("Other OpEx base (£k / m)", 1, 200, key="c_opex")
+    st.slider("OpEx inflation / year (%)", 0, 20, key="c_opex_inf")
+    st.number_input("R&D spend / quarter (£k)", 0, 1_000, key="c_rnd")
 
-    cogs_y1 = st.slider("COGS % Year 1", 0, 100, 25) / 100
-    cogs_y2 = st.slider("COGS % Year 2", 0, 100, 20) / 100
-    cogs_y3 = st.slider("COGS % Year 3+", 0, 100, 15) / 100
+    st.slider("COGS % Year 1", 0, 100, key="c_cogs1")
+    st.slider("COGS % Year 2", 0, 100, key="c_cogs2")
+    st.slider("COGS % Year 3+", 0, 100, key="c_cogs3")
 
-    us_launch_cost  = st.number_input("US launch one-off (£k)", 0, 5_000, 500) * 1_000
-    eal_launch_cost = st.number_input("EAL launch one-off (£k)", 0, 5_000, 250) * 1_000
-else:
-    # placeholders so maths below doesn’t explode
-    hires_per_q = salary_new = salary_infl = sm_pct_rev = 0
-    office_rent_m = other_opex_m = opex_inf = rnd_q = 0
-    cogs_y1 = cogs_y2 = cogs_y3 = 0
-    us_launch_cost = eal_launch_cost = 0
+    st.number_input("US launch one-off (£k)", 0, 5_000, key="c_us")
+    st.number_input("EAL launch one-off (£k)", 0, 5_000, key="c_eal")
 
 # ─────── TIME GRID ───────
-periods = pd.period_range("2025Q3", periods=14, freq="Q")
-labels  = periods.astype(str)
-for q in (dist_start_q, eal_start_q):
-    while q not in labels:
-        periods = periods.append(periods[-1] + 1)
-        labels  = periods.astype(str)
-
-def pad(seq, n): return (seq + [0]*n)[:n]
-
-# ─────── REVENUE ENGINE ───────
-def uk_counts():
-    counts = []
-    for i in range(len(labels)):
-        if i < 8:
-            val = start_uk * (uk_growth_fast ** (i/4))
-        else:
-            val = counts[-1] * (1 + uk_growth_taper/4)
-        counts.append(round(val))
-    return counts
-
-uk = uk_counts()
-
-ann_price = {2025: school_price_y1,
-             2026: school_price_y2,
-             2027: school_price_y2,
-             2028: school_price_y3}
-school_price_q = [ann_price.get(p.year, school_price_y3)/4 for p in periods]
-uk_rev = [c*p for c,p in zip(uk, school_price_q)]
-
-trials = [trials_q*2] + [trials_q]*(len(labels)-1)
-mat_conv = [0]*len(labels)
-for i in range(2, len(labels)):
-    mat_conv[i] = round(trials[i-2]*conv_rate)
-mat_cum = pd.Series(mat_conv).cumsum()
-mat_price_q = [ann_price.get(p.year, school_price_y3)*mat_multiplier/4 for p in periods]
-mat_rev = [c*p for c,p in zip(mat_cum, mat_price_q)]
-
-idx_us   = labels.index(dist_start_q)
-dist_add = [0]*len(labels)
-for i in range(idx_us, len(labels)):
-    dist_add[i] = dist_add_q if i > idx_us else 1
-dist_cum = pd.Series(dist_add).cumsum()
-dist_price_q = [(dist_price_y1/4 if p.year == 2027 else
-                 dist_price_y2/4 if p.year >= 2028 else 0) for p in periods]
-dist_rev = [c*p for c,p in zip(dist_cum, dist_price_q)]
-
-idx_eal  = labels.index(eal_start_q)
-eal_learn = [0]*len(labels)
-n = eal_start_learners
-for i in range(idx_eal, len(labels)):
-    eal_learn[i] = n
-    n *= eal_q_mult
-eal_rev = [n * (eal_price_yr/4) for n in eal_learn]
+quarters = preset["quarters"]
+labels   = pd.period_range(preset["timeline"]["base_date"], periods=len(quarters), freq="Q").astype(str)
+
+def engine_quarter(label): return f"Q{label[-1]} {label[:4]}"      # "2027Q1" → "Q1 2027"
+
+# ─────── SHARED ENGINE ───────
+# one run of forecast_engine per distinct set of inputs, shared by every session
+params = {
+    **defaults,
+    "starting_uk_schools": start_uk, "hyper_growth_factor": uk_growth_fast,
+    "taper_growth_rate": uk_growth_taper, "mat_trials_per_quarter": trials_q,
+    "mat_conversion_rate": conv_rate, "schools_per_mat": mat_multiplier,
+    "us_launch_quarter": engine_quarter(dist_start_q), "districts_per_quarter": dist_add_q,
+    "eal_launch_quarter": engine_quarter(eal_start_q), "initial_eal_learners": eal_start_learners,
+    "eal_growth_multiplier": eal_q_mult,
+    "pricing": {
+        **pricing,
+        "uk_school": {**pricing["uk_school"], "price": [school_price_y1, school_price_y2, school_price_y3]},
+        "mat_school": {**pricing["mat_school"], "price": [school_price_y1, school_price_y2, school_price_y3]},
+        "us_district": {**pricing["us_district"], "price": [dist_price_y1, dist_price_y2]},
+    },
+    **{lever: st.session_state[k] * scale for k, (lever, scale) in COST_WIDGETS.items()},
+}
+# the Revenue view runs only the revenue lines, keyed on the revenue levers alone
+if page == "Cash-flow":
+    result = shared().get_or_compute(("result", result_key(params, quarters)), lambda: run_forecast(params, quarters))
+else:
+    rev_params = {k: params[k] for k in (*REVENUE_LEVERS, "pricing") if k in params}
+    result = shared().get_or_compute(("result", result_key(rev_params, quarters, kind="revenue")),
+                                     lambda: run_revenue(rev_params, quarters))
+forecast = {k: v[0] for k, v in result.items()}
 
 revenue_df = pd.DataFrame({
-    "UK Schools": uk_rev,
-    "MATs":       mat_rev,
-    "US Dist":    dist_rev,
-    "EAL":        eal_rev
+    "UK Schools": forecast["uk_rev"],
+    "MATs":       forecast["mat_rev"],
+    "US Dist":    forecast["us_rev"],
+    "EAL":        forecast["eal_rev"]
 }, index=labels)
 revenue_df["Total"] = revenue_df.sum(axis=1)
 
-# ─────── CASH-FLOW ENGINE ───────
 if page == "Cash-flow":
-    # Head-count & payroll
-    ft_head = []
-    ft_total = 3
-    for i, lbl in enumerate(labels):
-        if lbl == "2025Q4":
-            ft_total += 4
-        if i >= 2:
-            ft_total += hires_per_q
-        ft_head.append(ft_total)
-
-    payroll_q = []
-    founder_block = [100_000, 100_000, 90_000, 90_000]
-    heads_so_far = 0
-    for q_idx, head in enumerate(ft_head):
-        yr = q_idx // 4
-        infl = (1 + salary_infl) ** yr
-        new = max(head - len(founder_block), 0)
-        base_cost = sum(founder_block[:min(head, len(founder_block))]) * infl
-        extra_cost = new * salary_new * infl
-        payroll_q.append((base_cost + extra_cost) / 4 * 1.15)
-
-    # Variable S&M
-    sm_cost = revenue_df["Total"] * sm_pct_rev
-
-    # Overheads
-    infl_mult = [(1 + opex_inf) ** (p.year - 2025) for p in periods]
-    office_q = [office_rent_m * 3 * m for m in infl_mult]
-    other_q  = [other_opex_m * 3 * m for m in infl_mult]
-
-    # One-off expansions
-    expansion = [0]*len(labels)
-    expansion[idx_us]  += us_launch_cost
-    expansion[idx_eal] += eal_launch_cost
-
-    # COGS
-    cogs_pct = [cogs_y1 if p.year == 2025 else
-                cogs_y2 if p.year == 2026 else
-                cogs_y3 for p in periods]
-    cogs = revenue_df["Total"] * cogs_pct
-
     cash_df = pd.DataFrame({
-        "Revenue":      revenue_df["Total"],
-        "COGS":         cogs,
-        "Gross Profit": revenue_df["Total"] - cogs,
-        "Payroll":      payroll_q,
-        "Sales & Mktg": sm_cost,
-        "Office":       office_q,
-        "Other OpEx":   other_q,
-        "R&D":          rnd_q,
-        "Expansion":    expansion
+        "Revenue":        forecast["quarterly_rev"],
+        "COGS":           forecast["cogs"],
+        "Gross Profit":   forecast["gross_profit"],
+        "Payroll":        forecast["payroll"],
+        "Sales & Mktg":   forecast["sales_marketing"],
+        "Office":         forecast["office_rent"],
+        "Other OpEx":     forecast["other_opex"],
+        "R&D":            forecast["rd"],
+        "Expansion":      forecast["expansion"],
+        "Operating Cash": forecast["operating_cash"],
+        "Cum Cash":       forecast["cumulative_cash"],
     }, index=labels)
 
-    cash_df["Operating Cash"] = cash_df["Gross Profit"] - cash_df[[
-        "Payroll","Sales & Mktg","Office","Other OpEx","R&D","Expansion"]].sum(axis=1)
-    cash_df["Cum Cash"] = cash_df["Operating Cash"].cumsum()
-
 # ─────── UI ───────
 st.title("📈 stylus – interactive financial model")
 
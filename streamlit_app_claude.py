@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import numpy as np
-from datetime import datetime
+
+from forecast_engine import REVENUE_LEVERS, load_preset, run_forecast, run_revenue
+from scenario_store import result_key
+from shared_cache import shared
 
 # Page configuration
 st.set_page_config(page_title="stylus | Financial Forecast", layout="wide")
@@ -12,45 +14,14 @@ st.title("**stylus** | Financial Forecast")
 st.caption("Three-year forecast with two-quarter run-in period (Q3 2025 - Q4 2028)")
 
 # Navigation
-view = st.sidebar.radio("Select View", ["Revenue", "Cash-flow"], index=0 if st.session_state.view == "Revenue" else 1)
-st.session_state.view = view
-
-# Initialize default values for all parameters
-starting_uk_schools = 25
-hyper_growth_factor = 3.0
-taper_growth_rate = 0.20
-mat_trials_per_quarter = 10  # Changed from 20
-mat_conversion_rate = 0.70
-schools_per_mat = 10
-mat_annual_churn = 0.20  # Changed from 0.10
-us_launch_quarter = "Q1 2027"
-districts_per_quarter = 5  # Changed from 15
-eal_launch_quarter = "Q1 2028"
-initial_eal_learners = 0.10 * 1_000_000  # Changed from 1.0 million
-eal_growth_multiplier = 1.30  # Changed from 2.0
-
-# Default cost parameters
-initial_employees = 3
-q4_2025_hires = 4
-quarterly_hires = 2
-avg_new_hire_salary = 80000
-salary_inflation = 0.04
-sales_marketing_pct = 0.12
-# COGS breakdown
-api_cost_year1 = 0.15
-api_cost_year2 = 0.10
-api_cost_year3 = 0.05
-infrastructure_pct = 0.03
-support_pct = 0.02
-payment_processing_pct = 0.025
-other_variable_pct = 0.02
-# Fixed costs
-office_rent_monthly = 5000
-other_opex_monthly = 10000
-operational_inflation = 0.05
-rd_quarterly = 150000
-us_launch_cost = 500000
-eal_launch_cost = 250000
+view = st.sidebar.radio("Select View", ["Revenue", "Cash-flow"], key="view")
+
+# Default values for all parameters: the June 13 model (presets/jun13.json)
+preset = load_preset("jun13")
+defaults = preset["params"]
+
+# every lever with a sidebar input below overwrites its preset value
+params = dict(defaults)
 
 # Sidebar inputs - Revenue parameters
 if view == "Revenue":
@@ -61,487 +32,197 @@ else:
 
 with revenue_params:
     st.subheader("UK Schools")
-    starting_uk_schools = st.number_input("Starting UK schools (Q3 2025)", value=25, min_value=1, step=5, key="uk_schools")
-    hyper_growth_factor = st.number_input("Hyper-growth factor (first 2 years)", value=3.0, min_value=1.0, max_value=5.0, step=0.05, format="%.2f", key="growth_factor")
-    taper_growth_rate = st.number_input("Annual growth rate after 2 years (%)", value=20, min_value=0, max_value=100, step=5, key="taper_rate") / 100
+    params["starting_uk_schools"] = st.number_input("Starting UK schools (Q3 2025)", value=defaults["starting_uk_schools"], min_value=1, step=5, key="uk_schools")
+    params["hyper_growth_factor"] = st.number_input("Hyper-growth factor (first 2 years)", value=defaults["hyper_growth_factor"], min_value=1.0, max_value=5.0, step=0.05, format="%.2f", key="growth_factor")
+    params["taper_growth_rate"] = st.number_input("Annual growth rate after 2 years (%)", value=round(defaults["taper_growth_rate"] * 100), min_value=0, max_value=100, step=5, key="taper_rate") / 100
     
     st.subheader("MATs")
-    mat_trials_per_quarter = st.number_input("MAT trials per quarter", value=10, min_value=0, step=5, key="mat_trials")
-    mat_conversion_rate = st.number_input("MAT conversion rate (%)", value=70, min_value=0, max_value=100, step=1, key="mat_conv") / 100
-    schools_per_mat = st.number_input("Schools per MAT", value=10, min_value=1, step=5, key="schools_mat")
-    mat_annual_churn = st.number_input("MAT annual churn rate (%)", value=20, min_value=0, max_value=50, step=1, key="mat_churn") / 100
+    params["mat_trials_per_quarter"] = st.number_input("MAT trials per quarter", value=defaults["mat_trials_per_quarter"], min_value=0, step=5, key="mat_trials")
+    params["mat_conversion_rate"] = st.number_input("MAT conversion rate (%)", value=round(defaults["mat_conversion_rate"] * 100), min_value=0, max_value=100, step=1, key="mat_conv") / 100
+    params["schools_per_mat"] = st.number_input("Schools per MAT", value=defaults["schools_per_mat"], min_value=1, step=5, key="schools_mat")
+    params["mat_annual_churn"] = st.number_input("MAT annual churn rate (%)", value=round(defaults["mat_annual_churn"] * 100), min_value=0, max_value=50, step=1, key="mat_churn") / 100
     
     st.subheader("US Districts")
     us_launch_options = ["Q1 2027", "Q2 2027", "Q3 2027"]
-    us_launch_quarter = st.selectbox("US launch quarter", us_launch_options, index=0, key="us_launch")
-    districts_per_quarter = st.number_input("New districts per quarter (after launch)", value=5, min_value=0, step=1, key="districts_q")
+    params["us_launch_quarter"] = st.selectbox("US launch quarter", us_launch_options, index=us_launch_options.index(defaults["us_launch_quarter"]), key="us_launch")
+    params["districts_per_quarter"] = st.number_input("New districts per quarter (after launch)", value=defaults["districts_per_quarter"], min_value=0, step=1, key="districts_q")
     
     st.subheader("EAL")
     eal_launch_options = ["Q1 2028", "Q2 2028", "Q3 2028"]
-    eal_launch_quarter = st.selectbox("EAL launch quarter", eal_launch_options, index=0, key="eal_launch")
-    initial_eal_learners = st.number_input("Initial EAL learners (millions)", value=0.10, min_value=0.01, step=0.01, format="%.2f", key="eal_learners") * 1_000_000
-    eal_growth_multiplier = st.number_input("EAL quarterly growth multiplier", value=1.30, min_value=1.0, step=0.05, format="%.2f", key="eal_growth")
+    params["eal_launch_quarter"] = st.selectbox("EAL launch quarter", eal_launch_options, index=eal_launch_options.index(defaults["eal_launch_quarter"]), key="eal_launch")
+    params["initial_eal_learners"] = st.number_input("Initial EAL learners (millions)", value=defaults["initial_eal_learners"] / 1_000_000, min_value=0.01, step=0.01, format="%.2f", key="eal_learners") * 1_000_000
+    params["eal_growth_multiplier"] = st.number_input("EAL quarterly growth multiplier", value=defaults["eal_growth_multiplier"], min_value=1.0, step=0.05, format="%.2f", key="eal_growth")
 
 # Cost parameters in expandable sections
 with st.sidebar.expander("Headcount", expanded=False):
-    initial_employees = st.number_input("Initial employees", value=3, min_value=1, step=1, key="init_emp")
-    q4_2025_hires = st.number_input("Q4 2025 hires", value=4, min_value=0, step=1, key="q4_hires")
-    quarterly_hires = st.number_input("Quarterly hires from Q1 2026", value=2, min_value=0, step=1, key="q_hires")
-    avg_new_hire_salary = st.number_input("Average new hire salary (£k)", value=80, min_value=0, step=10, key="avg_salary") * 1000
-    salary_inflation = st.number_input("Annual salary inflation (%)", value=4, min_value=0, max_value=20, step=1, key="sal_infl") / 100
+    params["initial_employees"] = st.number_input("Initial employees", value=defaults["initial_employees"], min_value=1, step=1, key="init_emp")
+    params["q4_2025_hires"] = st.number_input("Q4 2025 hires", value=defaults["q4_2025_hires"], min_value=0, step=1, key="q4_hires")
+    params["quarterly_hires"] = st.number_input("Quarterly hires from Q1 2026", value=defaults["quarterly_hires"], min_value=0, step=1, key="q_hires")
+    params["avg_new_hire_salary"] = st.number_input("Average new hire salary (£k)", value=defaults["avg_new_hire_salary"] // 1000, min_value=0, step=10, key="avg_salary") * 1000
+    params["salary_inflation"] = st.number_input("Annual salary inflation (%)", value=round(defaults["salary_inflation"] * 100), min_value=0, max_value=20, step=1, key="sal_infl") / 100
 
 with st.sidebar.expander("Variable Costs", expanded=False):
-    sales_marketing_pct = st.number_input("Sales & Marketing (% of revenue)", value=12, min_value=0, max_value=50, step=1, key="sales_mkt") / 100
+    params["sales_marketing_pct"] = st.number_input("Sales & Marketing (% of revenue)", value=round(defaults["sales_marketing_pct"] * 100), min_value=0, max_value=50, step=1, key="sales_mkt") / 100
 
 with st.sidebar.expander("COGS Breakdown", expanded=False):
     st.markdown("##### API/AI Costs (% of revenue)")
-    api_cost_year1 = st.number_input("Year 1", value=15, min_value=0, max_value=50, step=1, key="api_y1") / 100
-    api_cost_year2 = st.number_input("Year 2", value=10, min_value=0, max_value=50, step=1, key="api_y2") / 100
-    api_cost_year3 = st.number_input("Year 3+", value=5, min_value=0, max_value=50, step=1, key="api_y3") / 100
+    params["api_cost_year1"] = st.number_input("Year 1", value=round(defaults["api_cost_year1"] * 100), min_value=0, max_value=50, step=1, key="api_y1") / 100
+    params["api_cost_year2"] = st.number_input("Year 2", value=round(defaults["api_cost_year2"] * 100), min_value=0, max_value=50, step=1, key="api_y2") / 100
+    params["api_cost_year3"] = st.number_input("Year 3+", value=round(defaults["api_cost_year3"] * 100), min_value=0, max_value=50, step=1, key="api_y3") / 100
     
     st.markdown("##### Other Variable Costs (% of revenue)")
-    infrastructure_pct = st.number_input("Infrastructure/Hosting", value=3, min_value=0, max_value=20, step=1, key="infra") / 100
-    support_pct = st.number_input("Customer Support", value=2, min_value=0, max_value=20, step=1, key="support") / 100
-    payment_processing_pct = st.number_input("Payment Processing", value=2.5, min_value=0.0, max_value=10.0, step=0.5, format="%.2f", key="payment") / 100
-    other_variable_pct = st.number_input("Other Variable", value=2, min_value=0, max_value=20, step=1, key="other_var") / 100
+    params["infrastructure_pct"] = st.number_input("Infrastructure/Hosting", value=round(defaults["infrastructure_pct"] * 100), min_value=0, max_value=20, step=1, key="infra") / 100
+    params["support_pct"] = st.number_input("Customer Support", value=round(defaults["support_pct"] * 100), min_value=0, max_value=20, step=1, key="support") / 100
+    params["payment_processing_pct"] = st.number_input("Payment Processing", value=defaults["payment_processing_pct"] * 100, min_value=0.0, max_value=10.0, step=0.5, format="%.2f", key="payment") / 100
+    params["other_variable_pct"] = st.number_input("Other Variable", value=round(defaults["other_variable_pct"] * 100), min_value=0, max_value=20, step=1, key="other_var") / 100
 
 with st.sidebar.expander("Fixed Costs", expanded=False):
-    office_rent_monthly = st.number_input("Office rent per month (£k)", value=5, min_value=0, step=1, key="office") * 1000
-    other_opex_monthly = st.number_input("Other OpEx per month (£k)", value=10, min_value=0, step=1, key="opex") * 1000
-    operational_inflation = st.number_input("Annual operational inflation (%)", value=5, min_value=0, max_value=20, step=1, key="op_infl") / 100
-    rd_quarterly = st.number_input("R&D per quarter (£k)", value=150, min_value=0, step=10, key="rd") * 1000
+    params["office_rent_monthly"] = st.number_input("Office rent per month (£k)", value=defaults["office_rent_monthly"] // 1000, min_value=0, step=1, key="office") * 1000
+    params["other_opex_monthly"] = st.number_input("Other OpEx per month (£k)", value=defaults["other_opex_monthly"] // 1000, min_value=0, step=1, key="opex") * 1000
+    params["operational_inflation"] = st.number_input("Annual operational inflation (%)", value=round(defaults["operational_inflation"] * 100), min_value=0, max_value=20, step=1, key="op_infl") / 100
+    params["rd_quarterly"] = st.number_input("R&D per quarter (£k)", value=defaults["rd_quarterly"] // 1000, min_value=0, step=10, key="rd") * 1000
 
 with st.sidebar.expander("Expansion Costs", expanded=False):
-    us_launch_cost = st.number_input("US launch cost (£k)", value=500, min_value=0, step=50, key="us_cost") * 1000
-    eal_launch_cost = st.number_input("EAL launch cost (£k)", value=250, min_value=0, step=50, key="eal_cost") * 1000
-
-# Helper functions
-def quarter_to_date(year_quarter):
-    # Handle format "Q1 2027"
-    parts = year_quarter.split(" ")
-    quarter = int(parts[0][1])  # Extract number from "Q1"
-    year = int(parts[1])
-    quarter_start_month = (quarter - 1) * 3 + 1
-    return pd.Timestamp(f"{year}-{quarter_start_month:02d}-01")
-
-def date_to_quarter(date):
-    return f"Q{(date.month - 1) // 3 + 1} {date.year}"
-
-def get_quarter_index(base_date, target_date):
-    return (target_date.year - base_date.year) * 4 + (target_date.quarter - base_date.quarter)
-
-# Create timeline - Q3 2025 to Q4 2028 (14 quarters total)
-base_date = pd.Timestamp("2025-07-01")  # Q3 2025
-us_launch_date = quarter_to_date(us_launch_quarter)
-eal_launch_date = quarter_to_date(eal_launch_quarter)
-
-# Fixed to 14 quarters (Q3 2025 to Q4 2028)
-num_quarters = 14
-
-# Generate quarters
-quarters = []
-for i in range(num_quarters):
-    date = base_date + pd.DateOffset(months=i*3)
-    quarters.append(date_to_quarter(date))
-
-# Calculate UK Schools revenue
-def calculate_uk_schools(quarters, starting_schools, hyper_growth_factor, taper_growth_rate):
-    schools = []
-    for i, q in enumerate(quarters):
-        if i < 8:  # Hyper-growth phase (first 2 years)
-            target = starting_schools * (hyper_growth_factor ** (i / 4))
-            schools.append(int(target))
-        else:  # Taper phase
-            quarterly_growth = (1 + taper_growth_rate) ** 0.25
-            prev_schools = schools[-1]
-            schools.append(int(prev_schools * quarterly_growth))
-    
-    # Calculate revenue based on pricing tiers
-    revenue = []
-    for i, school_count in enumerate(schools):
-        year = i // 4 + 1
-        if year == 1:
-            annual_price = 5000
-        elif year == 2:
-            annual_price = 10000
-        else:
-            annual_price = 15000
-        quarterly_revenue = (school_count * annual_price) / 4
-        revenue.append(quarterly_revenue)
-    
-    return schools, revenue
-
-# Calculate MAT revenue
-def calculate_mat_revenue(quarters, trials_per_q, conversion_rate, schools_per_mat, annual_churn):
-    mat_trials = []
-    mat_conversions = []
-    mat_cohorts = []  # Track when each cohort of MATs converted
-    mat_revenue = []
-    active_mats = []  # Track total active MATs per quarter
-    
-    # Convert annual churn to quarterly
-    quarterly_churn = 1 - (1 - annual_churn) ** 0.25
-    
-    for i, q in enumerate(quarters):
-        # Apply churn to existing cohorts at the beginning of each quarter (except the first)
-        if i > 0:
-            for cohort in mat_cohorts:
-                cohort['current_mats'] *= (1 - quarterly_churn)
-        
-        # Constant trials per quarter
-        mat_trials.append(trials_per_q)
-        
-        # Conversions - 2 quarter lag
-        if i < 2:
-            new_conversions = 0
-        else:
-            new_conversions = int(mat_trials[i-2] * conversion_rate)
-        mat_conversions.append(new_conversions)
-        
-        # Add new cohort if there are conversions
-        if new_conversions > 0:
-            mat_cohorts.append({
-                'quarter_converted': i,
-                'initial_mats': new_conversions,
-                'current_mats': new_conversions
-            })
-        
-        # Calculate revenue and count active MATs
-        quarterly_revenue = 0
-        total_active_mats = 0
-        
-        for cohort in mat_cohorts:
-            total_active_mats += cohort['current_mats']
-            
-            # Calculate revenue for this cohort based on their tenure
-            quarters_since_conversion = i - cohort['quarter_converted']
-            year_of_service = quarters_since_conversion // 4 + 1
-            
-            if year_of_service == 1:
-                annual_price = 5000
-            elif year_of_service == 2:
-                annual_price = 10000
-            else:
-                annual_price = 15000
-            
-            # Revenue for this cohort
-            cohort_revenue = (cohort['current_mats'] * schools_per_mat * annual_price) / 4
-            quarterly_revenue += cohort_revenue
-        
-        mat_revenue.append(quarterly_revenue)
-        active_mats.append(int(total_active_mats))
-    
-    return mat_trials, mat_conversions, mat_revenue, active_mats
-
-# Calculate US Districts revenue
-def calculate_us_revenue(quarters, launch_quarter, districts_per_q):
-    us_revenue = []
-    us_districts = []
-    us_districts_by_cohort = []  # Track when each cohort of districts started
-    launch_idx = quarters.index(launch_quarter)
-    
-    for i, q in enumerate(quarters):
-        if i < launch_idx:
-            us_districts.append(0)
-            us_revenue.append(0)
-        elif i == launch_idx:
-            us_districts.append(1)
-            us_districts_by_cohort.append({'quarter_started': i, 'districts': 1})
-            # Year 1 pricing
-            us_revenue.append(100000 / 4)  # Quarterly revenue
-        else:
-            # Add new districts
-            new_districts = districts_per_q
-            us_districts.append(us_districts[-1] + new_districts)
-            us_districts_by_cohort.append({'quarter_started': i, 'districts': new_districts})
-            
-            # Calculate revenue for each cohort based on their tenure
-            quarterly_revenue = 0
-            for cohort in us_districts_by_cohort:
-                quarters_since_start = i - cohort['quarter_started']
-                if quarters_since_start < 4:  # Year 1
-                    quarterly_revenue += cohort['districts'] * 100000 / 4
-                else:  # Year 2+
-                    quarterly_revenue += cohort['districts'] * 150000 / 4
-            
-            us_revenue.append(quarterly_revenue)
-    
-    return us_districts, us_revenue
+    params["us_launch_cost"] = st.number_input("US launch cost (£k)", value=defaults["us_launch_cost"] // 1000, min_value=0, step=50, key="us_cost") * 1000
+    params["eal_launch_cost"] = st.number_input("EAL launch cost (£k)", value=defaults["eal_launch_cost"] // 1000, min_value=0, step=50, key="eal_cost") * 1000
 
-# Calculate EAL revenue
-def calculate_eal_revenue(quarters, launch_quarter, initial_learners, growth_multiplier):
-    eal_revenue = []
-    eal_learners = []
-    
-    try:
-        launch_idx = quarters.index(launch_quarter)
-    except ValueError:
-        # Launch is beyond our forecast period
-        return [0] * len(quarters), [0] * len(quarters)
-    
-    for i, q in enumerate(quarters):
-        if i < launch_idx:
-            eal_learners.append(0)
-            eal_revenue.append(0)
-        else:
-            quarters_since_launch = i - launch_idx
-            learners = initial_learners * (growth_multiplier ** quarters_since_launch)
-            eal_learners.append(int(learners))
-            
-            # £30 per learner per year
-            quarterly_revenue = (learners * 30) / 4
-            eal_revenue.append(quarterly_revenue)
-    
-    return eal_learners, eal_revenue
 
-# Calculate all revenue streams
-uk_schools, uk_revenue = calculate_uk_schools(quarters, starting_uk_schools, hyper_growth_factor, taper_growth_rate)
-mat_trials, mat_conversions, mat_revenue, active_mats = calculate_mat_revenue(quarters, mat_trials_per_quarter, mat_conversion_rate, schools_per_mat, mat_annual_churn)
-us_districts, us_revenue = calculate_us_revenue(quarters, us_launch_quarter, districts_per_quarter)
-eal_learners, eal_revenue = calculate_eal_revenue(quarters, eal_launch_quarter, initial_eal_learners, eal_growth_multiplier)
+# Timeline - Q3 2025 to Q4 2028 (14 quarters total)
+quarters = preset["quarters"]
+
+# Run the shared forecast engine. Results are cached per process, so switching
+# views, or another session with the same inputs, costs nothing.  The Revenue
+# view runs only the revenue lines, keyed on the revenue levers alone.
+if view == "Cash-flow":
+    result = shared().get_or_compute(("result", result_key(params, quarters)), lambda: run_forecast(params, quarters))
+else:
+    rev_params = {k: params[k] for k in (*REVENUE_LEVERS, "pricing") if k in params}
+    result = shared().get_or_compute(("result", result_key(rev_params, quarters, kind="revenue")),
+                                     lambda: run_revenue(rev_params, quarters))
+forecast = {k: v[0] for k, v in result.items()}
 
-# Calculate total quarterly revenue (not ARR) for cost calculations
-total_quarterly_revenue = [uk + mat + us + eal for uk, mat, us, eal in zip(uk_revenue, mat_revenue, us_revenue, eal_revenue)]
+uk_schools, active_mats, us_districts, eal_learners = (
+    forecast[k].astype(int).tolist() for k in ("uk_schools", "active_mats", "districts", "learners")
+)
+# Total quarterly revenue (not ARR) for cost calculations
+total_quarterly_revenue = forecast["quarterly_rev"]
 
-# Create revenue dataframe with ARR for display
+# Create revenue dataframe with ARR (quarterly revenue × 4) for display
 revenue_df = pd.DataFrame({
     'Quarter': quarters,
-    'UK Schools': [rev * 4 for rev in uk_revenue],  # Convert to ARR
-    'MATs': [rev * 4 for rev in mat_revenue],
-    'US Districts': [rev * 4 for rev in us_revenue],
-    'EAL': [rev * 4 for rev in eal_revenue],
+    'UK Schools': forecast["uk_rev"] * 4,
+    'MATs': forecast["mat_rev"] * 4,
+    'US Districts': forecast["us_rev"] * 4,
+    'EAL': forecast["eal_rev"] * 4,
 })
 revenue_df['Total'] = revenue_df['UK Schools'] + revenue_df['MATs'] + revenue_df['US Districts'] + revenue_df['EAL']
 
+# Cash-flow dataframe (only needed, and only built, for the Cash-flow view)
+def cashflow_frame():
+    return pd.DataFrame({
+        'Quarter': quarters,
+        'ARR': total_quarterly_revenue * 4,  # Display as ARR
+        'Quarterly Revenue': total_quarterly_revenue,  # Actual quarterly revenue
+        'API/AI Costs': forecast["api"],
+        'Infrastructure': forecast["infra"],
+        'Customer Support': forecast["support"],
+        'Payment Processing': forecast["payment"],
+        'Other Variable': forecast["other_var"],
+        'Total COGS': forecast["cogs"],
+        'Gross Profit': forecast["gross_profit"],
+        'Payroll': forecast["payroll"],
+        'Sales & Marketing': forecast["sales_marketing"],
+        'Office Rent': forecast["office_rent"],
+        'Other OpEx': forecast["other_opex"],
+        'R&D': forecast["rd"],
+        'Expansion Costs': forecast["expansion"],
+        'Operating Cash': forecast["operating_cash"],
+        'Cumulative Cash': forecast["cumulative_cash"]
+    })
+
+
 # Display Revenue Section
-st.header("Revenue Forecast (ARR)")
-
-# Add key metrics
-col1, col2, col3, col4 = st.columns(4)
-with col1:
-    st.metric("UK Schools (Latest)", f"{uk_schools[-1]:,}")
-with col2:
-    # Show active MATs accounting for churn
-    st.metric("Active MATs", f"{active_mats[-1]:,}")
-with col3:
-    st.metric("US Districts (Latest)", f"{us_districts[-1]:,}")
-with col4:
-    st.metric("EAL Learners (Latest)", f"{eal_learners[-1]:,}")
-
-# Format and display revenue table
-revenue_display = revenue_df.copy()
-for col in ['UK Schools', 'MATs', 'US Districts', 'EAL', 'Total']:
-    revenue_display[col] = revenue_display[col].apply(lambda x: f"£{x:,.0f}")
-
-st.dataframe(revenue_display, use_container_width=True)
-
-# Create stacked area chart
-# Prepare data for stacked area chart
-revenue_long = pd.melt(revenue_df, id_vars=['Quarter'], 
-                      value_vars=['UK Schools', 'MATs', 'US Districts', 'EAL'],
-                      var_name='Revenue Stream', value_name='ARR')
-
-# Define the order for stacking (bottom to top)
-stream_order = ['UK Schools', 'MATs', 'US Districts', 'EAL']
-
-chart = alt.Chart(revenue_long).mark_area(
-    opacity=0.8
-).encode(
-    x=alt.X('Quarter:O', 
-            sort=quarters,
-            axis=alt.Axis(labelAngle=-45, title='Quarter')),
-    y=alt.Y('ARR:Q', 
-            axis=alt.Axis(format=',.0f', title='Annual Recurring Revenue (£)'),
-            stack='zero'),
-    color=alt.Color('Revenue Stream:N',
-                   scale=alt.Scale(
-                       domain=stream_order,
-                       range=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
-                   ),
-                   legend=alt.Legend(orient='top', title=None)),
-    tooltip=[
-        alt.Tooltip('Quarter:N'),
-        alt.Tooltip('Revenue Stream:N'),
-        alt.Tooltip('ARR:Q', format=',.0f', title='ARR (£)')
-    ]
-).properties(
-    width=800,
-    height=400,
-    title='Annual Recurring Revenue by Segment (Stacked)'
-)
+if view == "Revenue":
+    st.header("Revenue Forecast (ARR)")
+
+    # Add key metrics
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("UK Schools (Latest)", f"{uk_schools[-1]:,}")
+    with col2:
+        # Show active MATs accounting for churn
+        st.metric("Active MATs", f"{active_mats[-1]:,}")
+    with col3:
+        st.metric("US Districts (Latest)", f"{us_districts[-1]:,}")
+    with col4:
+        st.metric("EAL Learners (Latest)", f"{eal_learners[-1]:,}")
+
+    # Format and display revenue table
+    revenue_display = revenue_df.copy()
+    for col in ['UK Schools', 'MATs', 'US Districts', 'EAL', 'Total']:
+        revenue_display[col] = revenue_display[col].apply(lambda x: f"£{x:,.0f}")
 
-st.altair_chart(chart, use_container_width=True)
+    st.dataframe(revenue_display, use_container_width=True)
 
-# Add visual separator
-st.write("")
-st.write("---")
-st.write("")
+    # Create stacked area chart
+    # Prepare data for stacked area chart
+    revenue_long = pd.melt(revenue_df, id_vars=['Quarter'], 
+                          value_vars=['UK Schools', 'MATs', 'US Districts', 'EAL'],
+                          var_name='Revenue Stream', value_name='ARR')
+
+    # Define the order for stacking (bottom to top)
+    stream_order = ['UK Schools', 'MATs', 'US Districts', 'EAL']
+
+    chart = alt.Chart(revenue_long).mark_area(
+        opacity=0.8
+    ).encode(
+        x=alt.X('Quarter:O', 
+                sort=quarters,
+                axis=alt.Axis(labelAngle=-45, title='Quarter')),
+        y=alt.Y('ARR:Q', 
+                axis=alt.Axis(format=',.0f', title='Annual Recurring Revenue (£)'),
+                stack='zero'),
+        color=alt.Color('Revenue Stream:N',
+                       scale=alt.Scale(
+                           domain=stream_order,
+                           range=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
+                       ),
+                       legend=alt.Legend(orient='top', title=None)),
+        tooltip=[
+            alt.Tooltip('Quarter:N'),
+            alt.Tooltip('Revenue Stream:N'),
+            alt.Tooltip('ARR:Q', format=',.0f', title='ARR (£)')
+        ]
+    ).properties(
+        width=800,
+        height=400,
+        title='Annual Recurring Revenue by Segment (Stacked)'
+    )
+
+    st.altair_chart(chart, use_container_width=True)
 
 # Display Cash-flow Section
-st.header("Cash-flow Analysis")
-st.caption("ARR (Annual Recurring Revenue) is shown for reference. All costs and cash calculations are based on actual quarterly revenue.")
+if view == "Cash-flow":
+    st.header("Cash-flow Analysis")
+    st.caption("ARR (Annual Recurring Revenue) is shown for reference. All costs and cash calculations are based on actual quarterly revenue.")
 
-# Calculate costs
-# Known salaries for first 4 employees
-known_salaries = [100000, 100000, 90000, 90000]
-    
-    # Calculate headcount and payroll
-    headcount = []
-    payroll = []
-    
-    for i, q in enumerate(quarters):
-        if i == 0:  # Q3 2025
-            headcount.append(initial_employees)
-            # First 3 known salaries
-            base_salaries = sum(known_salaries[:initial_employees])
-        elif i == 1:  # Q4 2025
-            headcount.append(initial_employees + q4_2025_hires)
-            # All 4 known salaries + additional at average
-            if initial_employees + q4_2025_hires <= 4:
-                base_salaries = sum(known_salaries[:initial_employees + q4_2025_hires])
-            else:
-                base_salaries = sum(known_salaries) + (initial_employees + q4_2025_hires - 4) * avg_new_hire_salary
-        else:  # Q1 2026 onwards
-            prev_headcount = headcount[-1]
-            headcount.append(prev_headcount + quarterly_hires)
-            
-            # Calculate base salaries
-            if prev_headcount <= 4:
-                base_salaries = sum(known_salaries[:prev_headcount]) + quarterly_hires * avg_new_hire_salary
-            else:
-                base_salaries = sum(known_salaries) + (prev_headcount - 4 + quarterly_hires) * avg_new_hire_salary
-        
-        # Apply salary inflation
-        years_elapsed = i / 4
-        inflation_multiplier = (1 + salary_inflation) ** years_elapsed
-        
-        # Quarterly payroll with NI and pension (15%)
-        quarterly_payroll = (base_salaries * inflation_multiplier * 1.15) / 4
-        payroll.append(quarterly_payroll)
-    
-    # Calculate COGS with detailed breakdown
-    cogs = []
-    api_costs = []
-    infrastructure_costs = []
-    support_costs = []
-    payment_costs = []
-    other_variable_costs = []
-    
-    for i, rev in enumerate(total_quarterly_revenue):
-        year = i // 4 + 1
-        
-        # API costs (decreasing over time)
-        if year == 1:
-            api_rate = api_cost_year1
-        elif year == 2:
-            api_rate = api_cost_year2
-        else:
-            api_rate = api_cost_year3
-        
-        api_cost = rev * api_rate
-        api_costs.append(api_cost)
-        
-        # Other variable costs (constant % of revenue)
-        infra_cost = rev * infrastructure_pct
-        infrastructure_costs.append(infra_cost)
-        
-        support_cost = rev * support_pct
-        support_costs.append(support_cost)
-        
-        payment_cost = rev * payment_processing_pct
-        payment_costs.append(payment_cost)
-        
-        other_cost = rev * other_variable_pct
-        other_variable_costs.append(other_cost)
-        
-        # Total COGS
-        total_cogs = api_cost + infra_cost + support_cost + payment_cost + other_cost
-        cogs.append(total_cogs)
-    
-    # Calculate gross profit
-    gross_profit = [rev - cog for rev, cog in zip(total_quarterly_revenue, cogs)]
-    
-    # Calculate other costs
-    sales_marketing = [rev * sales_marketing_pct for rev in total_quarterly_revenue]
-    
-    # Fixed costs with inflation
-    office_rent = []
-    other_opex = []
-    rd_costs = []
-    
-    for i in range(len(quarters)):
-        years_elapsed = i / 4
-        inflation_multiplier = (1 + operational_inflation) ** years_elapsed
-        
-        # Quarterly costs (3 months)
-        office_rent.append(office_rent_monthly * 3 * inflation_multiplier)
-        other_opex.append(other_opex_monthly * 3 * inflation_multiplier)
-        rd_costs.append(rd_quarterly)
-    
-    # Expansion costs
-    expansion_costs = []
-    us_launch_idx = quarters.index(us_launch_quarter)
-    eal_launch_idx = quarters.index(eal_launch_quarter)
-    
-    for i in range(len(quarters)):
-        cost = 0
-        if i == us_launch_idx:
-            cost += us_launch_cost
-        if i == eal_launch_idx:
-            cost += eal_launch_cost
-        expansion_costs.append(cost)
-    
-    # Calculate operating cash
-    operating_cash = []
-    cumulative_cash = []
-    
-    for i in range(len(quarters)):
-        op_cash = (gross_profit[i] - payroll[i] - sales_marketing[i] - 
-                  office_rent[i] - other_opex[i] - rd_costs[i] - expansion_costs[i])
-        operating_cash.append(op_cash)
-        
-        if i == 0:
-            cumulative_cash.append(op_cash)
-        else:
-            cumulative_cash.append(cumulative_cash[-1] + op_cash)
-    
-    # Add key metrics (now that all calculations are done)
+    cashflow_df = cashflow_frame()
+
+    # Add key metrics
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         latest_arr = revenue_df['Total'].iloc[-1]
         st.metric("Latest ARR", f"£{latest_arr:,.0f}")
     with col2:
-        latest_gross_margin = (gross_profit[-1] / total_quarterly_revenue[-1] * 100) if total_quarterly_revenue[-1] > 0 else 0
+        latest_gross_margin = (cashflow_df['Gross Profit'].iloc[-1] / total_quarterly_revenue[-1] * 100) if total_quarterly_revenue[-1] > 0 else 0
         st.metric("Gross Margin", f"{latest_gross_margin:.1f}%")
     with col3:
-        latest_burn = operating_cash[-1]
+        latest_burn = cashflow_df['Operating Cash'].iloc[-1]
         st.metric("Quarterly Burn/Profit", f"£{latest_burn:,.0f}")
     with col4:
-        latest_cash = cumulative_cash[-1]
+        latest_cash = cashflow_df['Cumulative Cash'].iloc[-1]
         st.metric("Cash Position", f"£{latest_cash:,.0f}")
-    
-    # Create cash-flow dataframe
-    cashflow_df = pd.DataFrame({
-        'Quarter': quarters,
-        'ARR': [rev * 4 for rev in total_quarterly_revenue],  # Display as ARR
-        'Quarterly Revenue': total_quarterly_revenue,  # Actual quarterly revenue
-        'API/AI Costs': api_costs,
-        'Infrastructure': infrastructure_costs,
-        'Customer Support': support_costs,
-        'Payment Processing': payment_costs,
-        'Other Variable': other_variable_costs,
-        'Total COGS': cogs,
-        'Gross Profit': gross_profit,
-        'Payroll': payroll,
-        'Sales & Marketing': sales_marketing,
-        'Office Rent': office_rent,
-        'Other OpEx': other_opex,
-        'R&D': rd_costs,
-        'Expansion Costs': expansion_costs,
-        'Operating Cash': operating_cash,
-        'Cumulative Cash': cumulative_cash
-    })
-    
+
     # Format and display cash-flow table
     cashflow_display = cashflow_df.copy()
     for col in cashflow_display.columns[1:]:
@@ -571,6 +252,6 @@ known_salaries = [100000, 100000, 90000, 90000]
         title='Cumulative Cash Position'
     )
     
-st.altair_chart(cash_chart, use_container_width=True)
+    st.altair_chart(cash_chart, use_container_width=True)
 
-st.caption(f"All figures shown are quarterly except ARR. COGS breakdown: API costs decrease from {int(api_cost_year1*100)}% to {int(api_cost_year3*100)}% over 3 years, while other costs remain constant as % of revenue.")
+    st.caption(f"All figures shown are quarterly except ARR. COGS breakdown: API costs decrease from {int(params['api_cost_year1']*100)}% to {int(params['api_cost_year3']*100)}% over 3 years, while other costs remain constant as % of revenue.")
@@ -1,14 +1,156 @@
+import os
+
 import streamlit as st
 import pandas as pd
-import altair as alt
-import numpy as np
-from datetime import datetime
+
+from forecast_engine import (
+    COST_LEVERS, ON_COST, REVENUE_COLUMNS, UK_PRICING_MODES, align_plans, cash_frame, headcount_plan,
+    levers_plan, load_preset, mat_churn_quantiles, revenue_frame, run_costs, run_forecast, run_revenue,
+    runway, stack_params,
+)
+from perf_panel import StageTimer
+from scenario_store import ScenarioStore, result_key
+from shared_cache import shared
 
 # ----------------------------------------------------------------------------------
 # Page configuration
 # ----------------------------------------------------------------------------------
 st.set_page_config(page_title="stylus | Financial Forecast", layout="wide")
 
+# ?debug=1 → per‑stage timings in the sidebar
+timer = StageTimer.from_page()
+
+# Cold start: STYLUS_COLD_START=1 (or ?cold=1) opens the page with the charts
+# folded away. Altair is only imported, and a chart only built, once its
+# expander is open – first paint is then just the levers, metrics and tables.
+COLD_START = os.environ.get("STYLUS_COLD_START") == "1" or st.query_params.get("cold") == "1"
+
+def chart_panel(label: str, key: str):
+    return st.expander(label, expanded=not COLD_START, key=key, on_change="rerun")
+
+# Vega‑Lite specs are built from the Altair templates below once per session,
+# so a rerun skips building the Altair chart and its to_dict().  Streamlit has
+# no data‑only update: every rerun still sends the cached spec (~1 KB a chart)
+# along with the rows, which are kept to the columns the chart draws.
+def show_chart(name: str, data: pd.DataFrame):
+    specs = st.session_state.setdefault("_chart_specs", {})
+    if name not in specs:
+        spec = CHART_TEMPLATES[name](quarters).to_dict()
+        # drop Altair's empty placeholder data so every view draws the rows passed in
+        spec.pop("datasets", None)
+        for view in (spec, *spec.get("layer", ())):
+            view.pop("data", None)
+        specs[name] = spec
+    st.vega_lite_chart(data, specs[name], use_container_width=True)
+
+# opening or closing a chart reruns only that chart; `fan(draws)`, if given,
+# returns the percentile bands for the chart's fan version behind a toggle
+@st.fragment
+def chart_section(label: str, key: str, data: pd.DataFrame, fan=None):
+    panel = chart_panel(label, key)
+    with panel:
+        if not panel.open:
+            return
+        if fan and st.toggle("Uncertainty fan (P10–P90, P25–P75)", key=f"{key}_fan"):
+            draws = st.select_slider("Simulated scenarios", FAN_DRAWS, value=FAN_DRAWS[1], key=f"{key}_draws",
+                                     format_func="{:,}".format)
+            show_chart(f"{key}_fan", fan(draws))
+            st.caption(f"Median line and bands across {draws:,} scenarios drawn around the levers above "
+                       "(growth, conversion, churn, districts and EAL growth each ± a plausible miss).")
+        else:
+            show_chart(key, data)
+
+# ----------------------------------------------------------------------------------
+# Chart templates – data‑free specs (Altair imported on first use)
+# ----------------------------------------------------------------------------------
+ARR_STREAMS = ["UK Schools", "MATs", "US Districts", "EAL"]
+
+def arr_chart(quarters: list):
+    import altair as alt
+
+    # wide revenue rows in; folded to one row per stream in the browser
+    return alt.Chart().transform_fold(ARR_STREAMS, as_=["Stream", "ARR"]).mark_area(opacity=0.8).encode(
+        x=alt.X("Quarter:O", sort=quarters, axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y("ARR:Q", stack="zero", axis=alt.Axis(format=",.0f", title="Annual Recurring Revenue (£)")),
+        color=alt.Color("Stream:N", scale=alt.Scale(domain=ARR_STREAMS, range=["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"])),
+        tooltip=[alt.Tooltip("Quarter:N"), alt.Tooltip("Stream:N"), alt.Tooltip("ARR:Q", format=",.0f", title="ARR (£)")],
+    ).properties(width=800, height=400, title="ARR by Segment (stacked)")
+
+def cash_chart(quarters: list):
+    import altair as alt
+
+    return alt.Chart().mark_area(line={"color": "darkblue"}, color="lightblue", opacity=0.7).encode(
+        x=alt.X("Quarter:O", sort=quarters, axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y("Cumulative Cash:Q", axis=alt.Axis(format=",.0f", title="Cumulative Cash (£)"), scale=alt.Scale(zero=False)),
+        tooltip=[alt.Tooltip("Quarter:N"), alt.Tooltip("Cumulative Cash:Q", format=",.0f", title="Cash (£)")],
+    ).properties(width=800, height=400, title="Cumulative Cash Position")
+
+def fan_chart(quarters: list, title: str, y_title: str, colors: dict):
+    import altair as alt
+
+    base = alt.Chart().encode(
+        x=alt.X("Quarter:O", sort=quarters, axis=alt.Axis(labelAngle=-45)),
+        color=alt.Color("Line:N", title=None, legend=None if len(colors) == 1 else alt.Legend(),
+                        scale=alt.Scale(domain=list(colors), range=list(colors.values()))),
+    )
+    outer = base.mark_area(opacity=0.15).encode(
+        y=alt.Y("P10:Q", axis=alt.Axis(format=",.0f", title=y_title), scale=alt.Scale(zero=False)), y2="P90:Q")
+    inner = base.mark_area(opacity=0.35).encode(y="P25:Q", y2="P75:Q")
+    median = base.mark_line().encode(
+        y="P50:Q",
+        tooltip=[alt.Tooltip("Quarter:N"), alt.Tooltip("Line:N", title="Line")]
+                + [alt.Tooltip(f"{p}:Q", format=",.0f") for p in ("P10", "P25", "P50", "P75", "P90")],
+    )
+    return alt.layer(outer, inner, median).properties(width=800, height=400, title=title)
+
+def arr_fan_chart(quarters: list):
+    colors = dict(zip(ARR_STREAMS, ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"]))
+    return fan_chart(quarters, "ARR by Segment – P10–P90 and P25–P75", "Annual Recurring Revenue (£)", colors)
+
+def cash_fan_chart(quarters: list):
+    return fan_chart(quarters, "Cumulative Cash Position – P10–P90 and P25–P75", "Cumulative Cash (£)",
+                     {"Cumulative Cash": "darkblue"})
+
+CHART_TEMPLATES = {
+    "arr_chart": arr_chart,
+    "arr_chart_fan": arr_fan_chart,
+    "cash_chart": cash_chart,
+    "cash_chart_fan": cash_fan_chart,
+}
+
+def compare_chart(overlay: pd.DataFrame, quarters: list, names: list):
+    import altair as alt
+
+    return alt.Chart(overlay).mark_line(point=True).encode(
+        x=alt.X("Quarter:O", sort=quarters, axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y("£:Q", axis=alt.Axis(format=",.0f", title="£")),
+        color=alt.Color("Scenario:N", sort=names),
+        strokeDash=alt.StrokeDash("Line:N", sort=["ARR", "Cumulative Cash"]),
+        tooltip=[alt.Tooltip("Scenario:N"), alt.Tooltip("Line:N"), alt.Tooltip("Quarter:N"), alt.Tooltip("£:Q", format=",.0f")],
+    ).properties(width=800, height=400, title="ARR and Cumulative Cash by scenario")
+
+# ----------------------------------------------------------------------------------
+# Percentile bands for the fan charts – only these rows reach the browser
+# ----------------------------------------------------------------------------------
+FAN_DRAWS = [5_000, 20_000, 100_000]
+FAN_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+def fan_bands(params: dict, lines: dict, draws: int) -> pd.DataFrame:
+    """Long frame of Quarter, Line, P10 … P90 for `lines` ({key: label});
+    the simulation is sketched chunk by chunk and shared across sessions."""
+    def compute():
+        from monte_carlo import quantile_bands, spread_spec
+
+        bands = quantile_bands(spread_spec(params), draws, params, quarters, lines=list(lines), q=FAN_QUANTILES)
+        return pd.concat([
+            pd.DataFrame({"Quarter": quarters, "Line": label,
+                          **{f"P{round(q * 100)}": bands[key][i] for i, q in enumerate(FAN_QUANTILES)}})
+            for key, label in lines.items()
+        ], ignore_index=True)
+
+    kind = f"fan:{draws}:{','.join(lines)}"
+    return shared().get_or_compute(("fan", result_key(params, quarters, kind=kind)), compute)
+
 # ----------------------------------------------------------------------------------
 # Title & lead‑in
 # ----------------------------------------------------------------------------------
@@ -16,400 +158,304 @@ st.title("**stylus** | Financial Forecast")
 st.caption("Three‑year forecast with a one‑quarter run‑in (Q4 2025 – Q4 2028)")
 
 # ----------------------------------------------------------------------------------
-# Default parameters
+# Default parameters (presets/dataroom.json; a loaded scenario overrides them)
 # ----------------------------------------------------------------------------------
-# Revenue defaults
-defaults = {
-    "starting_uk_schools": 25,
-    "hyper_growth_factor": 4.0,
-    "taper_growth_rate": 0.50,
-    "mat_trials_per_quarter": 20,
-    "mat_conversion_rate": 0.70,
-    "schools_per_mat": 10,
-    "mat_annual_churn": 0.20,
-    "us_launch_quarter": "Q1 2027",
-    "districts_per_quarter": 5,
-    "eal_launch_quarter": "Q1 2028",
-    "initial_eal_learners": 0.03 * 1_000_000,
-    "eal_growth_multiplier": 1.75,
-    # Cost defaults
-    "initial_employees": 3,
-    "q4_2025_hires": 3,
-    "quarterly_hires": 1,
-    "avg_new_hire_salary": 80_000,
-    "salary_inflation": 0.04,
-    "sales_marketing_pct": 0.15,
-    "api_cost_year1": 0.20,
-    "api_cost_year2": 0.15,
-    "api_cost_year3": 0.10,
-    "infrastructure_pct": 0.02,
-    "support_pct": 0.05,
-    "payment_processing_pct": 0.02,
-    "other_variable_pct": 0.00,
-    "office_rent_monthly": 10_000,
-    "other_opex_monthly": 10_000,
-    "operational_inflation": 0.15,
-    "rd_quarterly": 100_000,
-    "us_launch_cost": 250_000,
-    "eal_launch_cost": 750_000,
-}
+preset = load_preset("dataroom")
+defaults = dict(preset["params"])
+
+# results are shared across sessions in memory (budgeted LRU), then on disk
+@st.cache_resource
+def get_store() -> ScenarioStore:
+    return ScenarioStore(memory=shared())
+
+store = get_store()
 
 # ----------------------------------------------------------------------------------
 # Sidebar: tweakables – collapsible, shut by default
 # ----------------------------------------------------------------------------------
 st.sidebar.header("Adjust the levers (optional)")
 
+# Saved scenarios
+scenario_box = st.sidebar.expander("Scenarios", expanded=False)
+with scenario_box:
+    scenario = st.selectbox("Open scenario", ["(defaults)"] + store.names())
+    if scenario != "(defaults)":
+        defaults.update(store.load(scenario))
+
 # Revenue parameters
+rev_params = {}
 with st.sidebar.expander("Revenue Parameters", expanded=False):
     st.subheader("UK Schools")
-    starting_uk_schools = st.number_input("Starting UK schools (Q3 2025)", value=defaults["starting_uk_schools"], min_value=1, step=5)
-    hyper_growth_factor = st.number_input("Hyper‑growth factor (first 2 years)", value=defaults["hyper_growth_factor"], min_value=1.0, max_value=5.0, step=0.05, format="%.2f")
-    taper_growth_rate = st.number_input("Annual growth after 2 years (%)", value=int(defaults["taper_growth_rate"]*100), min_value=0, max_value=100, step=5) / 100.0
+    rev_params["starting_uk_schools"] = st.number_input("Starting UK schools (Q3 2025)", value=defaults["starting_uk_schools"], min_value=1, step=5)
+    rev_params["hyper_growth_factor"] = st.number_input("Hyper‑growth factor (first 2 years)", value=defaults["hyper_growth_factor"], min_value=1.0, max_value=5.0, step=0.05, format="%.2f")
+    rev_params["taper_growth_rate"] = st.number_input("Annual growth after 2 years (%)", value=round(defaults["taper_growth_rate"]*100), min_value=0, max_value=100, step=5) / 100.0
+    rev_params["uk_pricing_mode"] = st.selectbox("UK pricing tiers", UK_PRICING_MODES, index=UK_PRICING_MODES.index(defaults["uk_pricing_mode"]), format_func={"vintage": "By each school's tenure", "model_year": "By model year (whole base)"}.get)
 
     st.subheader("MATs")
-    mat_trials_per_quarter = st.number_input("MAT trials per quarter", value=defaults["mat_trials_per_quarter"], min_value=0, step=5)
-    mat_conversion_rate = st.number_input("MAT conversion rate (%)", value=int(defaults["mat_conversion_rate"]*100), min_value=0, max_value=100, step=1) / 100.0
-    schools_per_mat = st.number_input("Schools per MAT", value=defaults["schools_per_mat"], min_value=1, step=1)
-    mat_annual_churn = st.number_input("MAT annual churn (%)", value=int(defaults["mat_annual_churn"]*100), min_value=0, max_value=50, step=1) / 100.0
+    rev_params["mat_trials_per_quarter"] = st.number_input("MAT trials per quarter", value=defaults["mat_trials_per_quarter"], min_value=0, step=5)
+    rev_params["mat_conversion_rate"] = st.number_input("MAT conversion rate (%)", value=round(defaults["mat_conversion_rate"]*100), min_value=0, max_value=100, step=1) / 100.0
+    rev_params["schools_per_mat"] = st.number_input("Schools per MAT", value=defaults["schools_per_mat"], min_value=1, step=1)
+    rev_params["mat_annual_churn"] = st.number_input("MAT annual churn (%)", value=round(defaults["mat_annual_churn"]*100), min_value=0, max_value=50, step=1) / 100.0
 
     st.subheader("US Districts")
-    us_launch_quarter = st.selectbox("US launch quarter", ["Q1 2027", "Q2 2027", "Q3 2027"], index=["Q1 2027", "Q2 2027", "Q3 2027"].index(defaults["us_launch_quarter"]))
-    districts_per_quarter = st.number_input("New districts per quarter", value=defaults["districts_per_quarter"], min_value=0, step=1)
+    rev_params["us_launch_quarter"] = st.selectbox("US launch quarter", ["Q1 2027", "Q2 2027", "Q3 2027"], index=["Q1 2027", "Q2 2027", "Q3 2027"].index(defaults["us_launch_quarter"]))
+    rev_params["districts_per_quarter"] = st.number_input("New districts per quarter", value=defaults["districts_per_quarter"], min_value=0, step=1)
 
     st.subheader("EAL")
-    eal_launch_quarter = st.selectbox("EAL launch quarter", ["Q1 2028", "Q2 2028", "Q3 2028"], index=["Q1 2028", "Q2 2028", "Q3 2028"].index(defaults["eal_launch_quarter"]))
-    initial_eal_learners = st.number_input("Initial EAL learners (millions)", value=defaults["initial_eal_learners"] / 1_000_000, min_value=0.01, step=0.01, format="%.2f") * 1_000_000
-    eal_growth_multiplier = st.number_input("EAL quarterly growth multiplier", value=defaults["eal_growth_multiplier"], min_value=1.0, step=0.05, format="%.2f")
-
-# Headcount
-with st.sidebar.expander("Headcount", expanded=False):
-    initial_employees = st.number_input("Initial employees", value=defaults["initial_employees"], min_value=1, step=1)
-    q4_2025_hires = st.number_input("Q4 2025 hires", value=defaults["q4_2025_hires"], min_value=0, step=1)
-    quarterly_hires = st.number_input("Quarterly hires from Q1 2026", value=defaults["quarterly_hires"], min_value=0, step=1)
-    avg_new_hire_salary = st.number_input("Average new‑hire salary (£k)", value=defaults["avg_new_hire_salary"]//1000, min_value=0, step=10) * 1_000
-    salary_inflation = st.number_input("Annual salary inflation (%)", value=int(defaults["salary_inflation"]*100), min_value=0, max_value=20, step=1) / 100.0
-
-# Variable costs
-with st.sidebar.expander("Variable Costs", expanded=False):
-    sales_marketing_pct = st.number_input("Sales & Marketing (as % of revenue)", value=int(defaults["sales_marketing_pct"]*100), min_value=0, max_value=50, step=1) / 100.0
-
-# COGS
-with st.sidebar.expander("COGS Breakdown", expanded=False):
-    st.markdown("**API / AI costs (% of revenue)**")
-    api_cost_year1 = st.number_input("Year 1", value=int(defaults["api_cost_year1"]*100), min_value=0, max_value=50, step=1) / 100.0
-    api_cost_year2 = st.number_input("Year 2", value=int(defaults["api_cost_year2"]*100), min_value=0, max_value=50, step=1) / 100.0
-    api_cost_year3 = st.number_input("Year 3+", value=int(defaults["api_cost_year3"]*100), min_value=0, max_value=50, step=1) / 100.0
-
-    st.markdown("**Other variable costs (% of revenue)**")
-    infrastructure_pct = st.number_input("Infrastructure / Hosting", value=int(defaults["infrastructure_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
-    support_pct = st.number_input("Customer Support", value=int(defaults["support_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
-    payment_processing_pct = st.number_input("Payment Processing", value=defaults["payment_processing_pct"]*100, min_value=0.0, max_value=10.0, step=0.5, format="%.2f") / 100.0
-    other_variable_pct = st.number_input("Other Variable", value=int(defaults["other_variable_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
-
-# Fixed costs
-with st.sidebar.expander("Fixed Costs", expanded=False):
-    office_rent_monthly = st.number_input("Office rent per month (£k)", value=defaults["office_rent_monthly"]//1000, min_value=0, step=1) * 1_000
-    other_opex_monthly = st.number_input("Other OpEx per month (£k)", value=defaults["other_opex_monthly"]//1000, min_value=0, step=1) * 1_000
-    operational_inflation = st.number_input("Operational inflation (% p.a.)", value=int(defaults["operational_inflation"]*100), min_value=0, max_value=20, step=1) / 100.0
-    rd_quarterly = st.number_input("R&D spend per quarter (£k)", value=defaults["rd_quarterly"]//1000, min_value=0, step=10) * 1_000
-
-# Expansion costs
-with st.sidebar.expander("Expansion Costs", expanded=False):
-    us_launch_cost = st.number_input("US launch cost (£k)", value=defaults["us_launch_cost"]//1000, min_value=0, step=50) * 1_000
-    eal_launch_cost = st.number_input("EAL launch cost (£k)", value=defaults["eal_launch_cost"]//1000, min_value=0, step=50) * 1_000
+    rev_params["eal_launch_quarter"] = st.selectbox("EAL launch quarter", ["Q1 2028", "Q2 2028", "Q3 2028"], index=["Q1 2028", "Q2 2028", "Q3 2028"].index(defaults["eal_launch_quarter"]))
+    rev_params["initial_eal_learners"] = st.number_input("Initial EAL learners (millions)", value=defaults["initial_eal_learners"] / 1_000_000, min_value=0.01, step=0.01, format="%.2f") * 1_000_000
+    rev_params["eal_growth_multiplier"] = st.number_input("EAL quarterly growth multiplier", value=defaults["eal_growth_multiplier"], min_value=1.0, step=0.05, format="%.2f")
 
-# ----------------------------------------------------------------------------------
-# Helper functions
-# ----------------------------------------------------------------------------------
+# Cost levers live in the cash‑flow section (a fragment) so that changing one
+# reruns only that section; their latest values are kept for saving.
+cost_params = st.session_state.get("cost_levers", {k: defaults[k] for k in COST_LEVERS})
 
-def quarter_to_date(qstr: str) -> pd.Timestamp:
-    q, year = qstr.split()
-    month = (int(q[1]) - 1) * 3 + 1
-    return pd.Timestamp(f"{year}-{month:02d}-01")
+with scenario_box:
+    scenario_name = st.text_input("Save current levers as", placeholder="e.g. Board deck")
+    if st.button("Save scenario", disabled=not scenario_name):
+        store.save(scenario_name, {**rev_params, **cost_params})
+        st.toast(f"Saved “{scenario_name}”")
 
-def date_to_quarter(date: pd.Timestamp) -> str:
-    return f"Q{((date.month - 1)//3) + 1} {date.year}"
+timer.lap("input parsing")
 
 # ----------------------------------------------------------------------------------
-# Timeline (fixed 13 quarters: Q4 2025 – Q4 2028)
+# Timeline (fixed 13 quarters: Q4 2025 – Q4 2028) & revenue
 # ----------------------------------------------------------------------------------
-base_date = pd.Timestamp("2025-10-01")
-num_quarters = 13
-quarters = [date_to_quarter(base_date + pd.DateOffset(months=3*i)) for i in range(num_quarters)]
+quarters = preset["quarters"]
+
+# identical levers → identical hash → read from disk instead of recomputing
+revenue = store.cached(rev_params, quarters, lambda p, q: run_revenue(p, q, stage=timer.stage), kind="revenue")
+timer.lap("scenario cache")
 
 # ----------------------------------------------------------------------------------
-# Revenue calculations
+# Revenue section – looks like a report
 # ----------------------------------------------------------------------------------
-
-def calc_uk_schools(qtrs):
-    schools, revenue = [], []
-    for i in range(len(qtrs)):
-        if i < 8:  # hyper‑growth for 2 years
-            count = starting_uk_schools * (hyper_growth_factor ** (i/4))
-        else:
-            growth_q = (1 + taper_growth_rate) ** 0.25
-            count = schools[-1] * growth_q
-        schools.append(int(count))
-
-        # pricing tiers by year of service
-        year = i//4 + 1
-        annual_price = 5_000 if year == 1 else 10_000 if year == 2 else 15_000
-        revenue.append((count * annual_price)/4)
-    return schools, revenue
-
-
-def calc_mat_revenue(qtrs):
-    trials, conversions, revenue, active = [], [], [], []
-    cohorts = []
-    churn_q = 1 - (1 - mat_annual_churn) ** 0.25
-
-    for i in range(len(qtrs)):
-        # churn existing
-        for cohort in cohorts:
-            cohort["current"] *= (1 - churn_q)
-
-        trials.append(mat_trials_per_quarter)
-        new_conv = 0 if i < 2 else int(trials[i-2] * mat_conversion_rate)
-        conversions.append(new_conv)
-        if new_conv:
-            cohorts.append({"q": i, "initial": new_conv, "current": new_conv})
-
-        rev_q = 0
-        active_mats = 0
-        for cohort in cohorts:
-            active_mats += cohort["current"]
-            yrs = (i - cohort["q"])//4 + 1
-            price = 5_000 if yrs == 1 else 10_000 if yrs == 2 else 15_000
-            rev_q += (cohort["current"] * schools_per_mat * price)/4
-        revenue.append(rev_q)
-        active.append(int(active_mats))
-    return trials, conversions, revenue, active
-
-
-def calc_us_revenue(qtrs):
-    districts, revenue = [], []
-    cohorts = []
-    launch_idx = qtrs.index(us_launch_quarter)
-
-    for i in range(len(qtrs)):
-        if i < launch_idx:
-            districts.append(0)
-            revenue.append(0)
-            continue
-        if i == launch_idx:
-            districts.append(1)
-            cohorts.append({"q": i, "districts": 1})
-        else:
-            districts.append(districts[-1] + districts_per_quarter)
-            cohorts.append({"q": i, "districts": districts_per_quarter})
-
-        rev_q = 0
-        for cohort in cohorts:
-            yrs = (i - cohort["q"])//4
-            price = 100_000 if yrs == 0 else 150_000
-            rev_q += (cohort["districts"] * price)/4
-        revenue.append(rev_q)
-    return districts, revenue
-
-
-def calc_eal_revenue(qtrs):
-    learners, revenue = [], []
-    try:
-        launch_idx = qtrs.index(eal_launch_quarter)
-    except ValueError:
-        return [0]*len(qtrs), [0]*len(qtrs)
-
-    for i in range(len(qtrs)):
-        if i < launch_idx:
-            learners.append(0)
-            revenue.append(0)
-            continue
-        quarters_since = i - launch_idx
-        lrn = initial_eal_learners * (eal_growth_multiplier ** quarters_since)
-        learners.append(int(lrn))
-        revenue.append((lrn * 30)/4)
-    return learners, revenue
-
-# run calculations
-uk_schools, uk_rev = calc_uk_schools(quarters)
-mat_trials, mat_conversions, mat_rev, active_mats = calc_mat_revenue(quarters)
-districts, us_rev = calc_us_revenue(quarters)
-learners, eal_rev = calc_eal_revenue(quarters)
-
-quarterly_rev = [sum(x) for x in zip(uk_rev, mat_rev, us_rev, eal_rev)]
-
-# Calculate ARR as rolling 4-quarter sum
-def calculate_arr(quarterly_values, include_uk_baseline=False):
-    arr = []
-    q3_2025_revenue = 50_000 if include_uk_baseline else 0
-    
-    for i in range(len(quarterly_values)):
-        if i < 3:
-            # For first 3 quarters, include Q3 2025 baseline + available quarters
-            arr.append(q3_2025_revenue + sum(quarterly_values[:i+1]))
-        else:
-            # From Q4 onwards, use actual trailing 4 quarters
-            arr.append(sum(quarterly_values[i-3:i+1]))
-    return arr
-
-uk_arr = calculate_arr(uk_rev, include_uk_baseline=True)
-mat_arr = calculate_arr(mat_rev)
-us_arr = calculate_arr(us_rev)
-eal_arr = calculate_arr(eal_rev)
-total_arr = calculate_arr(quarterly_rev, include_uk_baseline=True)
-
-revenue_df = pd.DataFrame({
-    "Quarter": quarters,
-    "UK Schools": uk_arr,
-    "MATs": mat_arr,
-    "US Districts": us_arr,
-    "EAL": eal_arr,
-})
-revenue_df["Total"] = total_arr
+@st.fragment
+def revenue_section(revenue: dict):
+    uk_schools, active_mats, districts, learners = (
+        revenue[k][0].astype(int) for k in ("uk_schools", "active_mats", "districts", "learners")
+    )
+    revenue_df = revenue_frame(revenue, quarters)
+    timer.lap("DataFrame construction")
+
+    st.header("Revenue Forecast (ARR)")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("UK Schools (by 2029)", f"{uk_schools[-1]:,}")
+    col2.metric("Active MATs (by 2029)", f"{active_mats[-1]:,}")
+    col3.metric("US Districts (by 2029)", f"{districts[-1]:,}")
+    col4.metric("EAL learners (by 2029)", f"{learners[-1]:,}")
+
+    formatted_rev = revenue_df.copy()
+    for c in ["UK Schools", "MATs", "US Districts", "EAL", "Total"]:
+        formatted_rev[c] = formatted_rev[c].apply(lambda v: f"£{v:,.0f}")
+    timer.lap("formatting")
+
+    st.dataframe(formatted_rev, use_container_width=True)
+    timer.lap("table send")
+
+    arr_lines = {k: v for k, v in REVENUE_COLUMNS.items() if k != "total_arr"}
+    chart_section("ARR by segment chart", "arr_chart", revenue_df[["Quarter", *ARR_STREAMS]],
+                  fan=lambda draws: fan_bands(rev_params, arr_lines, draws))
+    timer.lap("chart send")
+
+    mat_churn_section()
+    timer.lap("MAT churn quantiles")
+
+# sampled (whole‑MAT) churn around the expected figures above; quantiles only
+@st.fragment
+def mat_churn_section():
+    panel = st.expander("MAT churn uncertainty", expanded=False, key="mat_churn", on_change="rerun")
+    with panel:
+        if not panel.open:
+            return
+        dist = shared().get_or_compute(
+            ("mat_churn", result_key(rev_params, quarters, kind="mat_churn")),
+            lambda: mat_churn_quantiles(rev_params, quarters, draws=10_000),
+        )
+        p10, p50, p90 = dist["active_mats"]
+        a10, a50, a90 = dist["mat_arr"]
+        st.dataframe(pd.DataFrame({
+            "Quarter": quarters,
+            "Active MATs P10": p10.astype(int),
+            "P50": p50.astype(int),
+            "P90": p90.astype(int),
+            "MAT ARR P10": [f"£{v:,.0f}" for v in a10],
+            "MAT ARR P50": [f"£{v:,.0f}" for v in a50],
+            "MAT ARR P90": [f"£{v:,.0f}" for v in a90],
+        }), use_container_width=True, hide_index=True)
+        st.caption(f"{dist['draws']:,} sampled churn paths: each quarter every MAT cohort loses a "
+                   "binomial number of whole MATs at the churn rate above.")
+
+revenue_section(revenue)
 
 # ----------------------------------------------------------------------------------
-# Revenue section – looks like a report
+# Cash‑flow section (immediately below) – reruns on its own when a cost lever moves
 # ----------------------------------------------------------------------------------
-st.header("Revenue Forecast (ARR)")
+@st.fragment
+def cash_section(revenue: dict):
+    # fragment reruns skip the page's timer, so the section keeps its own
+    section_timer = StageTimer.from_page()
+
+    st.divider()
+    st.header("Cash‑flow Analysis")
+    st.caption("ARR shown for reference; all costs and cash figures are quarterly.")
+
+    lever = {}
+    with st.expander("Cost levers", expanded=False):
+        headcount_tab, variable_tab, cogs_tab, fixed_tab, expansion_tab = st.tabs(
+            ["Headcount", "Variable Costs", "COGS Breakdown", "Fixed Costs", "Expansion Costs"]
+        )
+        with headcount_tab:
+            lever["initial_employees"] = st.number_input("Initial employees", value=defaults["initial_employees"], min_value=1, step=1)
+            lever["q4_2025_hires"] = st.number_input("Q4 2025 hires", value=defaults["q4_2025_hires"], min_value=0, step=1)
+            lever["quarterly_hires"] = st.number_input("Quarterly hires from Q1 2026", value=defaults["quarterly_hires"], min_value=0, step=1)
+            lever["avg_new_hire_salary"] = st.number_input("Average new‑hire salary (£k)", value=defaults["avg_new_hire_salary"]//1000, min_value=0, step=10) * 1_000
+            lever["salary_inflation"] = st.number_input("Annual salary inflation (%)", value=round(defaults["salary_inflation"]*100), min_value=0, max_value=20, step=1) / 100.0
+
+            # a role table instead of the hiring levers above (seeded from them)
+            if st.toggle("Plan hires by role", value="headcount_plan" in defaults):
+                seed = (pd.DataFrame(defaults["headcount_plan"]) if "headcount_plan" in defaults
+                        else levers_plan(defaults, len(quarters)))
+                seed["start"] = [quarters[min(max(int(s), 0), len(quarters) - 1)] for s in seed["start"]]
+                roles = st.data_editor(
+                    seed, key="headcount_plan_editor", num_rows="dynamic", hide_index=True, use_container_width=True,
+                    column_config={
+                        "role": st.column_config.TextColumn("Role"),
+                        "start": st.column_config.SelectboxColumn("Starts", options=quarters, required=True),
+                        "salary": st.column_config.NumberColumn("Salary (£)", min_value=0, step=1_000, format="%d", required=True),
+                        "on_cost": st.column_config.NumberColumn("On‑cost ×", min_value=1.0, step=0.01, format="%.2f", default=ON_COST),
+                        "count": st.column_config.NumberColumn("People", min_value=0, step=1, default=1),
+                    },
+                ).dropna(subset=["start", "salary"])
+                lever["headcount_plan"] = headcount_plan(roles.assign(start=roles["start"].map(quarters.index)))
+                st.caption("The role table replaces the hiring levers above; salaries are at today's prices.")
+
+        with variable_tab:
+            lever["sales_marketing_pct"] = st.number_input("Sales & Marketing (as % of revenue)", value=round(defaults["sales_marketing_pct"]*100), min_value=0, max_value=50, step=1) / 100.0
+
+        with cogs_tab:
+            st.markdown("**API / AI costs (% of revenue)**")
+            lever["api_cost_year1"] = st.number_input("Year 1", value=round(defaults["api_cost_year1"]*100), min_value=0, max_value=50, step=1) / 100.0
+            lever["api_cost_year2"] = st.number_input("Year 2", value=round(defaults["api_cost_year2"]*100), min_value=0, max_value=50, step=1) / 100.0
+            lever["api_cost_year3"] = st.number_input("Year 3+", value=round(defaults["api_cost_year3"]*100), min_value=0, max_value=50, step=1) / 100.0
+
+            st.markdown("**Other variable costs (% of revenue)**")
+            lever["infrastructure_pct"] = st.number_input("Infrastructure / Hosting", value=round(defaults["infrastructure_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
+            lever["support_pct"] = st.number_input("Customer Support", value=round(defaults["support_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
+            lever["payment_processing_pct"] = st.number_input("Payment Processing", value=defaults["payment_processing_pct"]*100, min_value=0.0, max_value=10.0, step=0.5, format="%.2f") / 100.0
+            lever["other_variable_pct"] = st.number_input("Other Variable", value=round(defaults["other_variable_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
+
+        with fixed_tab:
+            lever["office_rent_monthly"] = st.number_input("Office rent per month (£k)", value=defaults["office_rent_monthly"]//1000, min_value=0, step=1) * 1_000
+            lever["other_opex_monthly"] = st.number_input("Other OpEx per month (£k)", value=defaults["other_opex_monthly"]//1000, min_value=0, step=1) * 1_000
+            lever["operational_inflation"] = st.number_input("Operational inflation (% p.a.)", value=round(defaults["operational_inflation"]*100), min_value=0, max_value=20, step=1) / 100.0
+            lever["rd_quarterly"] = st.number_input("R&D spend per quarter (£k)", value=defaults["rd_quarterly"]//1000, min_value=0, step=10) * 1_000
+
+        with expansion_tab:
+            lever["us_launch_cost"] = st.number_input("US launch cost (£k)", value=defaults["us_launch_cost"]//1000, min_value=0, step=50) * 1_000
+            lever["eal_launch_cost"] = st.number_input("EAL launch cost (£k)", value=defaults["eal_launch_cost"]//1000, min_value=0, step=50) * 1_000
+    st.session_state["cost_levers"] = lever
+    params = {**rev_params, **lever}
+    section_timer.lap("input parsing")
+
+    costs = store.cached(
+        params, quarters, lambda p, q: run_costs(p, q, revenue, stage=section_timer.stage), kind="costs"
+    )
+    forecast = {**revenue, **costs}
+    section_timer.lap("scenario cache")
+
+    quarterly_rev = forecast["quarterly_rev"][0]
+    gross_profit = forecast["gross_profit"][0]
+    operating_cash = forecast["operating_cash"][0]
+    cumulative_cash = forecast["cumulative_cash"][0]
+
+    # Key cash metrics
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("ARR (by 2029)", f"£{forecast['total_arr'][0][-1]:,.0f}")
+    margin = (gross_profit[-1]/quarterly_rev[-1])*100 if quarterly_rev[-1] else 0
+    c2.metric("Gross margin (by 2029)", f"{margin:.1f}%")
+    c3.metric("Quarterly burn / profit (by 2029)", f"£{operating_cash[-1]:,.0f}")
+    c4.metric("Cash position (by 2029)", f"£{cumulative_cash[-1]:,.0f}")
+
+    # Runway & breakeven, from an opening balance
+    opening_cash = st.number_input("Opening cash (£k)", value=0, min_value=0, step=100, key="opening_cash") * 1_000
+    rw = {k: v[0] for k, v in runway(forecast["cumulative_cash"], opening_cash).items()}
+    def quarter_of(i):
+        return quarters[i] if i >= 0 else f"Not by {quarters[-1]}"
+    r1, r2, r3, r4 = st.columns(4)
+    r1.metric("First cash‑negative quarter", quarter_of(rw["first_negative_quarter"]))
+    r2.metric(f"Lowest cash ({quarters[rw['min_cash_quarter']]})", f"£{rw['min_cash']:,.0f}")
+    r3.metric("Breakeven quarter", quarter_of(rw["breakeven_quarter"]))
+    if rw["runway_months"] == float("inf"):
+        r4.metric("Runway at current burn", "Not burning")
+    elif not opening_cash:     # 0 months of nothing says nothing: ask for a balance instead
+        r4.metric("Runway at current burn", "—", help="Enter the opening cash above to see how long it lasts.")
+    else:
+        r4.metric("Runway at current burn", f"{rw['runway_months']:,.1f} months")
+    section_timer.lap("runway")
 
-col1, col2, col3, col4 = st.columns(4)
-col1.metric("UK Schools (by 2029)", f"{uk_schools[-1]:,}")
-col2.metric("Active MATs (by 2029)", f"{active_mats[-1]:,}")
-col3.metric("US Districts (by 2029)", f"{districts[-1]:,}")
-col4.metric("EAL learners (by 2029)", f"{learners[-1]:,}")
+    cash_df = cash_frame(forecast, quarters)
+    section_timer.lap("DataFrame construction")
 
-formatted_rev = revenue_df.copy()
-for c in ["UK Schools", "MATs", "US Districts", "EAL", "Total"]:
-    formatted_rev[c] = formatted_rev[c].apply(lambda v: f"£{v:,.0f}")
+    formatted_cash = cash_df.copy()
+    for col in formatted_cash.columns[1:]:
+        formatted_cash[col] = formatted_cash[col].apply(lambda v: f"£{v:,.0f}")
+    section_timer.lap("formatting")
 
-st.dataframe(formatted_rev, use_container_width=True)
+    st.dataframe(formatted_cash, use_container_width=True)
+    section_timer.lap("table send")
 
-# Fix: Exclude "Total" column when melting the dataframe
-rev_long = pd.melt(revenue_df[["Quarter", "UK Schools", "MATs", "US Districts", "EAL"]], 
-                   id_vars=["Quarter"], var_name="Stream", value_name="ARR")
-order = ["UK Schools", "MATs", "US Districts", "EAL"]
-chart = alt.Chart(rev_long).mark_area(opacity=0.8).encode(
-    x=alt.X("Quarter:O", sort=quarters, axis=alt.Axis(labelAngle=-45)),
-    y=alt.Y("ARR:Q", stack="zero", axis=alt.Axis(format=",.0f", title="Annual Recurring Revenue (£)")),
-    color=alt.Color("Stream:N", scale=alt.Scale(domain=order, range=["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"])),
-    tooltip=[alt.Tooltip("Quarter:N"), alt.Tooltip("Stream:N"), alt.Tooltip("ARR:Q", format=",.0f", title="ARR (£)")],
-).properties(width=800, height=400, title="ARR by Segment (stacked)")
+    chart_section("Cumulative cash chart", "cash_chart", cash_df[["Quarter", "Cumulative Cash"]],
+                  fan=lambda draws: fan_bands(params, {"cumulative_cash": "Cumulative Cash"}, draws))
+    section_timer.lap("chart send")
 
-st.altair_chart(chart, use_container_width=True)
+    st.caption(f"API costs decline from {int(lever['api_cost_year1']*100)} % to {int(lever['api_cost_year3']*100)} % of revenue over three years; other variable‑cost ratios remain constant.")
+
+    # the comparison's "Current levers" include the cost levers, so it lives here
+    scenario_comparison(params)
+    section_timer.lap("scenario comparison")
+    section_timer.render("dataroom-cash", where=st)
 
 # ----------------------------------------------------------------------------------
-# Cash‑flow section (immediately below)
+# Scenario comparison – saved scenarios evaluated as one batch
 # ----------------------------------------------------------------------------------
-st.divider()
-st.header("Cash‑flow Analysis")
-st.caption("ARR shown for reference; all costs and cash figures are quarterly.")
-
-# Headcount & payroll
-known_salaries = [100_000, 100_000, 90_000, 90_000]
-headcount, payroll = [], []
-for i in range(len(quarters)):
-    if i == 0:
-        hc = initial_employees
-    elif i == 1:
-        hc = headcount[-1] + q4_2025_hires
-    else:
-        hc = headcount[-1] + quarterly_hires
-    headcount.append(hc)
-
-    # salary base
-    if hc <= 4:
-        base = sum(known_salaries[:hc])
-    else:
-        base = sum(known_salaries) + (hc - 4) * avg_new_hire_salary
-    infl = (1 + salary_inflation) ** (i/4)
-    payroll.append((base * infl * 1.15)/4)  # NI + pension assumed 15 %
-
-# COGS components
-api_costs, infra_costs, support_costs, payment_costs, other_var_costs, cogs = [], [], [], [], [], []
-for i, rev in enumerate(quarterly_rev):
-    yr = i//4 + 1
-    api_rate = api_cost_year1 if yr == 1 else api_cost_year2 if yr == 2 else api_cost_year3
-    api = rev * api_rate
-    infra = rev * infrastructure_pct
-    sup = rev * support_pct
-    pay = rev * payment_processing_pct
-    oth = rev * other_variable_pct
-    total = api + infra + sup + pay + oth
-
-    api_costs.append(api)
-    infra_costs.append(infra)
-    support_costs.append(sup)
-    payment_costs.append(pay)
-    other_var_costs.append(oth)
-    cogs.append(total)
-
-# Gross profit
-gross_profit = [r - c for r, c in zip(quarterly_rev, cogs)]
-
-# Variable S&M
-sales_marketing = [r * sales_marketing_pct for r in quarterly_rev]
-
-# Fixed costs (inflated)
-office_rent, other_opex, rd_costs = [], [], []
-for i in range(len(quarters)):
-    infl = (1 + operational_inflation) ** (i/4)
-    office_rent.append(office_rent_monthly * 3 * infl)
-    other_opex.append(other_opex_monthly * 3 * infl)
-    rd_costs.append(rd_quarterly)
-
-# Expansion costs
-expansion_costs = [0]*len(quarters)
-expansion_costs[quarters.index(us_launch_quarter)] += us_launch_cost
-expansion_costs[quarters.index(eal_launch_quarter)] += eal_launch_cost
-
-# Operating cash & cumulative
-operating_cash, cumulative_cash = [], []
-for i in range(len(quarters)):
-    op = gross_profit[i] - payroll[i] - sales_marketing[i] - office_rent[i] - other_opex[i] - rd_costs[i] - expansion_costs[i]
-    operating_cash.append(op)
-    cumulative_cash.append(op if i == 0 else cumulative_cash[-1] + op)
-
-# Key cash metrics
-c1, c2, c3, c4 = st.columns(4)
-c1.metric("ARR (by 2029)", f"£{revenue_df['Total'].iloc[-1]:,.0f}")
-margin = (gross_profit[-1]/quarterly_rev[-1])*100 if quarterly_rev[-1] else 0
-c2.metric("Gross margin (by 2029)", f"{margin:.1f}%")
-c3.metric("Quarterly burn / profit (by 2029)", f"£{operating_cash[-1]:,.0f}")
-c4.metric("Cash position (by 2029)", f"£{cumulative_cash[-1]:,.0f}")
-
-cash_df = pd.DataFrame({
-    "Quarter": quarters,
-    "ARR": total_arr,
-    "Quarterly Revenue": quarterly_rev,
-    "API / AI": api_costs,
-    "Infrastructure": infra_costs,
-    "Support": support_costs,
-    "Payment Processing": payment_costs,
-    "Other Variable": other_var_costs,
-    "Total COGS": cogs,
-    "Gross Profit": gross_profit,
-    "Payroll": payroll,
-    "Sales & Marketing": sales_marketing,
-    "Office Rent": office_rent,
-    "Other OpEx": other_opex,
-    "R&D": rd_costs,
-    "Expansion": expansion_costs,
-    "Operating Cash": operating_cash,
-    "Cumulative Cash": cumulative_cash,
-})
-
-formatted_cash = cash_df.copy()
-for col in formatted_cash.columns[1:]:
-    formatted_cash[col] = formatted_cash[col].apply(lambda v: f"£{v:,.0f}")
-
-st.dataframe(formatted_cash, use_container_width=True)
-
-cash_chart = alt.Chart(cash_df).mark_area(line={"color": "darkblue"}, color="lightblue", opacity=0.7).encode(
-    x=alt.X("Quarter:O", sort=quarters, axis=alt.Axis(labelAngle=-45)),
-    y=alt.Y("Cumulative Cash:Q", axis=alt.Axis(format=",.0f", title="Cumulative Cash (£)"), scale=alt.Scale(zero=False)),
-    tooltip=[alt.Tooltip("Quarter:N"), alt.Tooltip("Cumulative Cash:Q", format=",.0f", title="Cash (£)")],
-).properties(width=800, height=400, title="Cumulative Cash Position")
-
-st.altair_chart(cash_chart, use_container_width=True)
-
-st.caption(f"API costs decline from {int(api_cost_year1*100)} % to {int(api_cost_year3*100)} % of revenue over three years; other variable‑cost ratios remain constant.")
+def scenario_comparison(params: dict):
+    st.divider()
+    st.header("Scenario comparison")
+
+    compare = st.multiselect("Saved scenarios to overlay", store.names(), placeholder="Pick one or more…")
+    if not compare:
+        return
+    scenarios = {"Current levers": params}
+    scenarios.update({name: {**preset["params"], **store.load(name)} for name in compare})
+    names = list(scenarios)
+    batch = store.cached(stack_params(align_plans(list(scenarios.values()), len(quarters))), quarters, run_forecast)
+
+    overlay = pd.concat([
+        pd.DataFrame({
+            "Quarter": quarters,
+            "Scenario": name,
+            "ARR": batch["total_arr"][k],
+            "Cumulative Cash": batch["cumulative_cash"][k],
+        })
+        for k, name in enumerate(names)
+    ]).melt(id_vars=["Quarter", "Scenario"], var_name="Line", value_name="£")
+
+    st.altair_chart(compare_chart(overlay, quarters, names), use_container_width=True)
+
+    baseline = st.selectbox("Baseline for deltas", names)
+    b = names.index(baseline)
+    summary = pd.DataFrame({
+        "ARR (by 2029)": batch["total_arr"][:, -1],
+        "Cash position (by 2029)": batch["cumulative_cash"][:, -1],
+        "Lowest cash position": batch["cumulative_cash"].min(axis=1),
+    }, index=pd.Index(names, name="Scenario"))
+    for col in list(summary.columns):
+        summary[f"Δ {col}"] = summary[col] - summary[col].iloc[b]
+    st.dataframe(summary.map(lambda v: f"£{v:,.0f}"), use_container_width=True)
+
+cash_section(revenue)
+timer.lap("cash section")
+
+timer.render("dataroom")
@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import numpy as np
-from datetime import datetime
+
+from forecast_engine import load_preset, run_forecast
+from scenario_store import result_key
+from shared_cache import shared
 
 # ----------------------------------------------------------------------------------
 # Page configuration
@@ -18,41 +20,12 @@ st.caption("Three‑year forecast with two‑quarter run‑in (Q3 2025 – Q
 # ----------------------------------------------------------------------------------
 # Default parameters
 # ----------------------------------------------------------------------------------
-# Revenue defaults
-defaults = {
-    "starting_uk_schools": 25,
-    "hyper_growth_factor": 3.0,
-    "taper_growth_rate": 0.20,
-    "mat_trials_per_quarter": 10,
-    "mat_conversion_rate": 0.70,
-    "schools_per_mat": 10,
-    "mat_annual_churn": 0.20,
-    "us_launch_quarter": "Q1 2027",
-    "districts_per_quarter": 5,
-    "eal_launch_quarter": "Q1 2028",
-    "initial_eal_learners": 0.10 * 1_000_000,
-    "eal_growth_multiplier": 1.30,
-    # Cost defaults
-    "initial_employees": 3,
-    "q4_2025_hires": 4,
-    "quarterly_hires": 2,
-    "avg_new_hire_salary": 80_000,
-    "salary_inflation": 0.04,
-    "sales_marketing_pct": 0.12,
-    "api_cost_year1": 0.15,
-    "api_cost_year2": 0.10,
-    "api_cost_year3": 0.05,
-    "infrastructure_pct": 0.03,
-    "support_pct": 0.02,
-    "payment_processing_pct": 0.025,
-    "other_variable_pct": 0.02,
-    "office_rent_monthly": 5_000,
-    "other_opex_monthly": 10_000,
-    "operational_inflation": 0.05,
-    "rd_quarterly": 150_000,
-    "us_launch_cost": 500_000,
-    "eal_launch_cost": 250_000,
-}
+# the June 13 model's levers and timeline (presets/jun13.json)
+preset = load_preset("jun13")
+defaults = preset["params"]
+
+# every lever with a sidebar input below overwrites its preset value
+params = dict(defaults)
 
 # ----------------------------------------------------------------------------------
 # Sidebar: tweakables – collapsible, shut by default
@@ -62,181 +35,75 @@ st.sidebar.header("Adjust the levers (optional)")
 # Revenue parameters
 with st.sidebar.expander("Revenue Parameters", expanded=False):
     st.subheader("UK Schools")
-    starting_uk_schools = st.number_input("Starting UK schools (Q3 2025)", value=defaults["starting_uk_schools"], min_value=1, step=5)
-    hyper_growth_factor = st.number_input("Hyper‑growth factor (first 2 years)", value=defaults["hyper_growth_factor"], min_value=1.0, max_value=5.0, step=0.05, format="%.2f")
-    taper_growth_rate = st.number_input("Annual growth after 2 years (%)", value=int(defaults["taper_growth_rate"]*100), min_value=0, max_value=100, step=5) / 100.0
+    params["starting_uk_schools"] = st.number_input("Starting UK schools (Q3 2025)", value=defaults["starting_uk_schools"], min_value=1, step=5)
+    params["hyper_growth_factor"] = st.number_input("Hyper‑growth factor (first 2 years)", value=defaults["hyper_growth_factor"], min_value=1.0, max_value=5.0, step=0.05, format="%.2f")
+    params["taper_growth_rate"] = st.number_input("Annual growth after 2 years (%)", value=int(defaults["taper_growth_rate"]*100), min_value=0, max_value=100, step=5) / 100.0
 
     st.subheader("MATs")
-    mat_trials_per_quarter = st.number_input("MAT trials per quarter", value=defaults["mat_trials_per_quarter"], min_value=0, step=5)
-    mat_conversion_rate = st.number_input("MAT conversion rate (%)", value=int(defaults["mat_conversion_rate"]*100), min_value=0, max_value=100, step=1) / 100.0
-    schools_per_mat = st.number_input("Schools per MAT", value=defaults["schools_per_mat"], min_value=1, step=1)
-    mat_annual_churn = st.number_input("MAT annual churn (%)", value=int(defaults["mat_annual_churn"]*100), min_value=0, max_value=50, step=1) / 100.0
+    params["mat_trials_per_quarter"] = st.number_input("MAT trials per quarter", value=defaults["mat_trials_per_quarter"], min_value=0, step=5)
+    params["mat_conversion_rate"] = st.number_input("MAT conversion rate (%)", value=int(defaults["mat_conversion_rate"]*100), min_value=0, max_value=100, step=1) / 100.0
+    params["schools_per_mat"] = st.number_input("Schools per MAT", value=defaults["schools_per_mat"], min_value=1, step=1)
+    params["mat_annual_churn"] = st.number_input("MAT annual churn (%)", value=int(defaults["mat_annual_churn"]*100), min_value=0, max_value=50, step=1) / 100.0
 
     st.subheader("US Districts")
-    us_launch_quarter = st.selectbox("US launch quarter", ["Q1 2027", "Q2 2027", "Q3 2027"], index=["Q1 2027", "Q2 2027", "Q3 2027"].index(defaults["us_launch_quarter"]))
-    districts_per_quarter = st.number_input("New districts per quarter", value=defaults["districts_per_quarter"], min_value=0, step=1)
+    params["us_launch_quarter"] = st.selectbox("US launch quarter", ["Q1 2027", "Q2 2027", "Q3 2027"], index=["Q1 2027", "Q2 2027", "Q3 2027"].index(defaults["us_launch_quarter"]))
+    params["districts_per_quarter"] = st.number_input("New districts per quarter", value=defaults["districts_per_quarter"], min_value=0, step=1)
 
     st.subheader("EAL")
-    eal_launch_quarter = st.selectbox("EAL launch quarter", ["Q1 2028", "Q2 2028", "Q3 2028"], index=["Q1 2028", "Q2 2028", "Q3 2028"].index(defaults["eal_launch_quarter"]))
-    initial_eal_learners = st.number_input("Initial EAL learners (millions)", value=defaults["initial_eal_learners"] / 1_000_000, min_value=0.01, step=0.01, format="%.2f") * 1_000_000
-    eal_growth_multiplier = st.number_input("EAL quarterly growth multiplier", value=defaults["eal_growth_multiplier"], min_value=1.0, step=0.05, format="%.2f")
+    params["eal_launch_quarter"] = st.selectbox("EAL launch quarter", ["Q1 2028", "Q2 2028", "Q3 2028"], index=["Q1 2028", "Q2 2028", "Q3 2028"].index(defaults["eal_launch_quarter"]))
+    params["initial_eal_learners"] = st.number_input("Initial EAL learners (millions)", value=defaults["initial_eal_learners"] / 1_000_000, min_value=0.01, step=0.01, format="%.2f") * 1_000_000
+    params["eal_growth_multiplier"] = st.number_input("EAL quarterly growth multiplier", value=defaults["eal_growth_multiplier"], min_value=1.0, step=0.05, format="%.2f")
 
 # Headcount
 with st.sidebar.expander("Headcount", expanded=False):
-    initial_employees = st.number_input("Initial employees", value=defaults["initial_employees"], min_value=1, step=1)
-    q4_2025_hires = st.number_input("Q4 2025 hires", value=defaults["q4_2025_hires"], min_value=0, step=1)
-    quarterly_hires = st.number_input("Quarterly hires from Q1 2026", value=defaults["quarterly_hires"], min_value=0, step=1)
-    avg_new_hire_salary = st.number_input("Average new‑hire salary (£k)", value=defaults["avg_new_hire_salary"]//1000, min_value=0, step=10) * 1_000
-    salary_inflation = st.number_input("Annual salary inflation (%)", value=int(defaults["salary_inflation"]*100), min_value=0, max_value=20, step=1) / 100.0
+    params["initial_employees"] = st.number_input("Initial employees", value=defaults["initial_employees"], min_value=1, step=1)
+    params["q4_2025_hires"] = st.number_input("Q4 2025 hires", value=defaults["q4_2025_hires"], min_value=0, step=1)
+    params["quarterly_hires"] = st.number_input("Quarterly hires from Q1 2026", value=defaults["quarterly_hires"], min_value=0, step=1)
+    params["avg_new_hire_salary"] = st.number_input("Average new‑hire salary (£k)", value=defaults["avg_new_hire_salary"]//1000, min_value=0, step=10) * 1_000
+    params["salary_inflation"] = st.number_input("Annual salary inflation (%)", value=int(defaults["salary_inflation"]*100), min_value=0, max_value=20, step=1) / 100.0
 
 # Variable costs
 with st.sidebar.expander("Variable Costs", expanded=False):
-    sales_marketing_pct = st.number_input("Sales & Marketing (as % of revenue)", value=int(defaults["sales_marketing_pct"]*100), min_value=0, max_value=50, step=1) / 100.0
+    params["sales_marketing_pct"] = st.number_input("Sales & Marketing (as % of revenue)", value=int(defaults["sales_marketing_pct"]*100), min_value=0, max_value=50, step=1) / 100.0
 
 # COGS
 with st.sidebar.expander("COGS Breakdown", expanded=False):
     st.markdown("**API / AI costs (% of revenue)**")
-    api_cost_year1 = st.number_input("Year 1", value=int(defaults["api_cost_year1"]*100), min_value=0, max_value=50, step=1) / 100.0
-    api_cost_year2 = st.number_input("Year 2", value=int(defaults["api_cost_year2"]*100), min_value=0, max_value=50, step=1) / 100.0
-    api_cost_year3 = st.number_input("Year 3+", value=int(defaults["api_cost_year3"]*100), min_value=0, max_value=50, step=1) / 100.0
+    params["api_cost_year1"] = st.number_input("Year 1", value=int(defaults["api_cost_year1"]*100), min_value=0, max_value=50, step=1) / 100.0
+    params["api_cost_year2"] = st.number_input("Year 2", value=int(defaults["api_cost_year2"]*100), min_value=0, max_value=50, step=1) / 100.0
+    params["api_cost_year3"] = st.number_input("Year 3+", value=int(defaults["api_cost_year3"]*100), min_value=0, max_value=50, step=1) / 100.0
 
     st.markdown("**Other variable costs (% of revenue)**")
-    infrastructure_pct = st.number_input("Infrastructure / Hosting", value=int(defaults["infrastructure_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
-    support_pct = st.number_input("Customer Support", value=int(defaults["support_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
-    payment_processing_pct = st.number_input("Payment Processing", value=defaults["payment_processing_pct"]*100, min_value=0.0, max_value=10.0, step=0.5, format="%.2f") / 100.0
-    other_variable_pct = st.number_input("Other Variable", value=int(defaults["other_variable_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
+    params["infrastructure_pct"] = st.number_input("Infrastructure / Hosting", value=int(defaults["infrastructure_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
+    params["support_pct"] = st.number_input("Customer Support", value=int(defaults["support_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
+    params["payment_processing_pct"] = st.number_input("Payment Processing", value=defaults["payment_processing_pct"]*100, min_value=0.0, max_value=10.0, step=0.5, format="%.2f") / 100.0
+    params["other_variable_pct"] = st.number_input("Other Variable", value=int(defaults["other_variable_pct"]*100), min_value=0, max_value=20, step=1) / 100.0
 
 # Fixed costs
 with st.sidebar.expander("Fixed Costs", expanded=False):
-    office_rent_monthly = st.number_input("Office rent per month (£k)", value=defaults["office_rent_monthly"]//1000, min_value=0, step=1) * 1_000
-    other_opex_monthly = st.number_input("Other OpEx per month (£k)", value=defaults["other_opex_monthly"]//1000, min_value=0, step=1) * 1_000
-    operational_inflation = st.number_input("Operational inflation (% p.a.)", value=int(defaults["operational_inflation"]*100), min_value=0, max_value=20, step=1) / 100.0
-    rd_quarterly = st.number_input("R&D spend per quarter (£k)", value=defaults["rd_quarterly"]//1000, min_value=0, step=10) * 1_000
+    params["office_rent_monthly"] = st.number_input("Office rent per month (£k)", value=defaults["office_rent_monthly"]//1000, min_value=0, step=1) * 1_000
+    params["other_opex_monthly"] = st.number_input("Other OpEx per month (£k)", value=defaults["other_opex_monthly"]//1000, min_value=0, step=1) * 1_000
+    params["operational_inflation"] = st.number_input("Operational inflation (% p.a.)", value=int(defaults["operational_inflation"]*100), min_value=0, max_value=20, step=1) / 100.0
+    params["rd_quarterly"] = st.number_input("R&D spend per quarter (£k)", value=defaults["rd_quarterly"]//1000, min_value=0, step=10) * 1_000
 
 # Expansion costs
 with st.sidebar.expander("Expansion Costs", expanded=False):
-    us_launch_cost = st.number_input("US launch cost (£k)", value=defaults["us_launch_cost"]//1000, min_value=0, step=50) * 1_000
-    eal_launch_cost = st.number_input("EAL launch cost (£k)", value=defaults["eal_launch_cost"]//1000, min_value=0, step=50) * 1_000
-
-# ----------------------------------------------------------------------------------
-# Helper functions
-# ----------------------------------------------------------------------------------
-
-def quarter_to_date(qstr: str) -> pd.Timestamp:
-    q, year = qstr.split()
-    month = (int(q[1]) - 1) * 3 + 1
-    return pd.Timestamp(f"{year}-{month:02d}-01")
-
-def date_to_quarter(date: pd.Timestamp) -> str:
-    return f"Q{((date.month - 1)//3) + 1} {date.year}"
+    params["us_launch_cost"] = st.number_input("US launch cost (£k)", value=defaults["us_launch_cost"]//1000, min_value=0, step=50) * 1_000
+    params["eal_launch_cost"] = st.number_input("EAL launch cost (£k)", value=defaults["eal_launch_cost"]//1000, min_value=0, step=50) * 1_000
 
 # ----------------------------------------------------------------------------------
-# Timeline (fixed 14 quarters: Q3 2025 – Q4 2028)
+# Timeline (fixed 14 quarters: Q3 2025 – Q4 2028) & the shared engine
 # ----------------------------------------------------------------------------------
-base_date = pd.Timestamp("2025-07-01")
-num_quarters = 14
-quarters = [date_to_quarter(base_date + pd.DateOffset(months=3*i)) for i in range(num_quarters)]
+quarters = preset["quarters"]
 
-# ----------------------------------------------------------------------------------
-# Revenue calculations
-# ----------------------------------------------------------------------------------
+result = shared().get_or_compute(("result", result_key(params, quarters)), lambda: run_forecast(params, quarters))
+forecast = {k: v[0] for k, v in result.items()}
 
-def calc_uk_schools(qtrs):
-    schools, revenue = [], []
-    for i in range(len(qtrs)):
-        if i < 8:  # hyper‑growth for 2 years
-            count = starting_uk_schools * (hyper_growth_factor ** (i/4))
-        else:
-            growth_q = (1 + taper_growth_rate) ** 0.25
-            count = schools[-1] * growth_q
-        schools.append(int(count))
-
-        # pricing tiers by year of service
-        year = i//4 + 1
-        annual_price = 5_000 if year == 1 else 10_000 if year == 2 else 15_000
-        revenue.append((count * annual_price)/4)
-    return schools, revenue
-
-
-def calc_mat_revenue(qtrs):
-    trials, conversions, revenue, active = [], [], [], []
-    cohorts = []
-    churn_q = 1 - (1 - mat_annual_churn) ** 0.25
-
-    for i in range(len(qtrs)):
-        # churn existing
-        for cohort in cohorts:
-            cohort["current"] *= (1 - churn_q)
-
-        trials.append(mat_trials_per_quarter)
-        new_conv = 0 if i < 2 else int(trials[i-2] * mat_conversion_rate)
-        conversions.append(new_conv)
-        if new_conv:
-            cohorts.append({"q": i, "initial": new_conv, "current": new_conv})
-
-        rev_q = 0
-        active_mats = 0
-        for cohort in cohorts:
-            active_mats += cohort["current"]
-            yrs = (i - cohort["q"])//4 + 1
-            price = 5_000 if yrs == 1 else 10_000 if yrs == 2 else 15_000
-            rev_q += (cohort["current"] * schools_per_mat * price)/4
-        revenue.append(rev_q)
-        active.append(int(active_mats))
-    return trials, conversions, revenue, active
-
-
-def calc_us_revenue(qtrs):
-    districts, revenue = [], []
-    cohorts = []
-    launch_idx = qtrs.index(us_launch_quarter)
-
-    for i in range(len(qtrs)):
-        if i < launch_idx:
-            districts.append(0)
-            revenue.append(0)
-            continue
-        if i == launch_idx:
-            districts.append(1)
-            cohorts.append({"q": i, "districts": 1})
-        else:
-            districts.append(districts[-1] + districts_per_quarter)
-            cohorts.append({"q": i, "districts": districts_per_quarter})
-
-        rev_q = 0
-        for cohort in cohorts:
-            yrs = (i - cohort["q"])//4
-            price = 100_000 if yrs == 0 else 150_000
-            rev_q += (cohort["districts"] * price)/4
-        revenue.append(rev_q)
-    return districts, revenue
-
-
-def calc_eal_revenue(qtrs):
-    learners, revenue = [], []
-    try:
-        launch_idx = qtrs.index(eal_launch_quarter)
-    except ValueError:
-        return [0]*len(qtrs), [0]*len(qtrs)
-
-    for i in range(len(qtrs)):
-        if i < launch_idx:
-            learners.append(0)
-            revenue.append(0)
-            continue
-        quarters_since = i - launch_idx
-        lrn = initial_eal_learners * (eal_growth_multiplier ** quarters_since)
-        learners.append(int(lrn))
-        revenue.append((lrn * 30)/4)
-    return learners, revenue
-
-# run calculations
-uk_schools, uk_rev = calc_uk_schools(quarters)
-mat_trials, mat_conversions, mat_rev, active_mats = calc_mat_revenue(quarters)
-districts, us_rev = calc_us_revenue(quarters)
-learners, eal_rev = calc_eal_revenue(quarters)
-
-quarterly_rev = [sum(x) for x in zip(uk_rev, mat_rev, us_rev, eal_rev)]
+uk_schools, active_mats, districts, learners = (
+    forecast[k].astype(int).tolist() for k in ("uk_schools", "active_mats", "districts", "learners")
+)
+uk_rev, mat_rev, us_rev, eal_rev = forecast["uk_rev"], forecast["mat_rev"], forecast["us_rev"], forecast["eal_rev"]
+quarterly_rev = forecast["quarterly_rev"]
 
 revenue_df = pd.DataFrame({
     "Quarter": quarters,
@@ -282,70 +149,14 @@ st.divider()
 st.header("Cash‑flow Analysis")
 st.caption("ARR shown for reference; all costs and cash figures are quarterly.")
 
-# Headcount & payroll
-known_salaries = [100_000, 100_000, 90_000, 90_000]
-headcount, payroll = [], []
-for i in range(len(quarters)):
-    if i == 0:
-        hc = initial_employees
-    elif i == 1:
-        hc = headcount[-1] + q4_2025_hires
-    else:
-        hc = headcount[-1] + quarterly_hires
-    headcount.append(hc)
-
-    # salary base
-    if hc <= 4:
-        base = sum(known_salaries[:hc])
-    else:
-        base = sum(known_salaries) + (hc - 4) * avg_new_hire_salary
-    infl = (1 + salary_inflation) ** (i/4)
-    payroll.append((base * infl * 1.15)/4)  # NI + pension assumed 15 %
-
-# COGS components
-api_costs, infra_costs, support_costs, payment_costs, other_var_costs, cogs = [], [], [], [], [], []
-for i, rev in enumerate(quarterly_rev):
-    yr = i//4 + 1
-    api_rate = api_cost_year1 if yr == 1 else api_cost_year2 if yr == 2 else api_cost_year3
-    api = rev * api_rate
-    infra = rev * infrastructure_pct
-    sup = rev * support_pct
-    pay = rev * payment_processing_pct
-    oth = rev * other_variable_pct
-    total = api + infra + sup + pay + oth
-
-    api_costs.append(api)
-    infra_costs.append(infra)
-    support_costs.append(sup)
-    payment_costs.append(pay)
-    other_var_costs.append(oth)
-    cogs.append(total)
-
-# Gross profit
-gross_profit = [r - c for r, c in zip(quarterly_rev, cogs)]
-
-# Variable S&M
-sales_marketing = [r * sales_marketing_pct for r in quarterly_rev]
-
-# Fixed costs (inflated)
-office_rent, other_opex, rd_costs = [], [], []
-for i in range(len(quarters)):
-    infl = (1 + operational_inflation) ** (i/4)
-    office_rent.append(office_rent_monthly * 3 * infl)
-    other_opex.append(other_opex_monthly * 3 * infl)
-    rd_costs.append(rd_quarterly)
-
-# Expansion costs
-expansion_costs = [0]*len(quarters)
-expansion_costs[quarters.index(us_launch_quarter)] += us_launch_cost
-expansion_costs[quarters.index(eal_launch_quarter)] += eal_launch_cost
-
-# Operating cash & cumulative
-operating_cash, cumulative_cash = [], []
-for i in range(len(quarters)):
-    op = gross_profit[i] - payroll[i] - sales_marketing[i] - office_rent[i] - other_opex[i] - rd_costs[i] - expansion_costs[i]
-    operating_cash.append(op)
-    cumulative_cash.append(op if i == 0 else cumulative_cash[-1] + op)
+# Costs & cash from the same engine run
+payroll = forecast["payroll"]
+api_costs, infra_costs, support_costs = forecast["api"], forecast["infra"], forecast["support"]
+payment_costs, other_var_costs, cogs = forecast["payment"], forecast["other_var"], forecast["cogs"]
+gross_profit, sales_marketing = forecast["gross_profit"], forecast["sales_marketing"]
+office_rent, other_opex, rd_costs = forecast["office_rent"], forecast["other_opex"], forecast["rd"]
+expansion_costs = forecast["expansion"]
+operating_cash, cumulative_cash = forecast["operating_cash"], forecast["cumulative_cash"]
 
 # Key cash metrics
 c1, c2, c3, c4 = st.columns(4)
@@ -390,4 +201,4 @@ cash_chart = alt.Chart(cash_df).mark_area(line={"color": "darkblue"}, color="lig
 
 st.altair_chart(cash_chart, use_container_width=True)
 
-st.caption(f"API costs decline from {int(api_cost_year1*100)} % to {int(api_cost_year3*100)} % of revenue over three years; other variable‑cost ratios remain constant.")
+st.caption(f"API costs decline from {int(params['api_cost_year1']*100)} % to {int(params['api_cost_year3']*100)} % of revenue over three years; other variable‑cost ratios remain constant.")
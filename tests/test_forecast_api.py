@@ -0,0 +1,87 @@
+"""forecast_api over a real local server: results and error responses."""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import forecast_api
+
+
+@pytest.fixture(scope="module")
+def url():
+    server = forecast_api.make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, path, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url + path, data=data, method="POST")) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_forecast_and_batch(url):
+    status, one = post(url, "/forecast", {"lines": ["total_arr"], "num_quarters": 4})
+    assert status == 200 and len(one["lines"]["total_arr"]) == 4
+    status, batch = post(url, "/forecast/batch", {"scenarios": [{}, {"hyper_growth_factor": 5}],
+                                                  "lines": ["total_arr"], "num_quarters": 4})
+    assert status == 200 and batch["k"] == 2
+    assert batch["lines"]["total_arr"][0] == one["lines"]["total_arr"]
+
+
+@pytest.mark.parametrize("path, body, message", [
+    ("/forecast", b"{not json", "invalid JSON"),
+    ("/forecast", [], "JSON object"),
+    ("/forecast", {"params": {"warp_speed": 9}}, "unknown levers: warp_speed"),
+    ("/forecast", {"base_date": "2025-13-45"}, "invalid base_date"),
+    ("/forecast", {"base_date": ""}, "invalid base_date"),
+    ("/forecast", {"base_date": 20251001}, "invalid base_date"),
+    ("/forecast", {"num_quarters": 0}, "num_quarters"),
+    ("/forecast", {"lines": "total_arr"}, '"lines" must be a list'),
+    ("/forecast", {"lines": ["total_arr", "profit"]}, "unknown lines: profit"),
+    ("/forecast", {"params": {"pricing": {"uk_school": {"from": [0, 4], "price": [1, 2, 3]}}}},
+     "could not evaluate scenario"),
+    ("/forecast/batch", {"scenarios": [{"pricing": {"us_district": {"from": [4], "price": [1]}}}]},
+     "tenure 0"),
+    ("/forecast/batch", {"params": {"hyper_growth_factor": [2, 3], "mat_conversion_rate": [0.1]}},
+     "same length"),
+    ("/forecast/batch", {}, "needs"),
+    ("/runway", {"scenarios": [{}, {}], "opening_cash": [1, 2, 3]}, "opening_cash"),
+])
+def test_bad_requests_get_a_400(url, path, body, message):
+    status, reply = post(url, path, body)
+    assert status == 400
+    assert message in reply["error"]
+
+
+def test_batch_limit_is_checked_before_stacking(url, monkeypatch):
+    monkeypatch.setattr(forecast_api, "MAX_BATCH", 2)
+    stacked = []
+    monkeypatch.setattr(forecast_api, "stack_params", lambda s: stacked.append(s))
+    status, reply = post(url, "/forecast/batch", {"scenarios": [{}] * 3})
+    assert status == 400 and "exceeds the 2 limit" in reply["error"]
+    status, reply = post(url, "/forecast/batch", {"params": {"hyper_growth_factor": [2, 3, 4]}})
+    assert status == 400 and "exceeds the 2 limit" in reply["error"]
+    assert not stacked
+
+
+def test_unexpected_errors_get_a_json_500(url, monkeypatch, capsys):
+    def boom(body):
+        raise RuntimeError("disk on fire")
+
+    monkeypatch.setattr(forecast_api, "forecast_one", boom)
+    status, reply = post(url, "/forecast", {})
+    assert status == 500 and "disk on fire" in reply["error"]
+    assert "RuntimeError" in capsys.readouterr().err
+
+
+def test_unknown_paths_are_404(url):
+    assert post(url, "/nowhere", {})[0] == 404
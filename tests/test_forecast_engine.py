@@ -0,0 +1,227 @@
+"""Regression pins for forecast_engine, plus stack_params."""
+
+import numpy as np
+import pytest
+
+from forecast_engine import (
+    DEFAULTS, ON_COST, PRICING, align_plans, annual_price, calc_mat_revenue, calc_mat_revenue_stochastic,
+    headcount_plan, levers_plan, load_preset, mat_churn_quantiles, run_forecast, runway, stack_params, uk_vintages,
+)
+
+# Figures the pages showed before they moved onto the shared engine (whole £,
+# as rendered), reproduced by uk_pricing_mode="model_year".
+DATAROOM = {
+    "uk_arr": [81250, 125444, 187944, 226333, 445083, 754442, 1191942, 1810660, 2730976, 3672241, 4604010, 5478076, 6054933],
+    "mat_arr": [0, 0, 175000, 515505, 1012534, 1657596, 2407657, 3257022, 4200301, 5232399, 6320498, 7461558, 8652706],
+    "us_arr": [0, 0, 0, 0, 0, 25000, 175000, 450000, 850000, 1362500, 1937500, 2575000, 3275000],
+    "eal_arr": [0, 0, 0, 0, 0, 0, 0, 0, 0, 225000, 618750, 1307812, 2513672],
+    "quarterly_rev": [31250, 44194, 237500, 428893, 747030, 1023615, 1575062, 2171976, 3010625, 3734478, 4563680, 5513663, 6684490],
+    "cogs": [9062, 12816, 68875, 124379, 179287, 245668, 378015, 521274, 572019, 709551, 867099, 1047596, 1270053],
+    "payroll": [83375, 156780, 181780, 207258, 233220, 259674, 286626, 314084, 342056, 370548, 399569, 429126, 459226],
+    "operating_cash": [-225875, -294164, -213123, -133708, 53468, -56722, 500167, 834196, 1465606, 1162035, 2427366, 3021773, 3761285],
+    "cumulative_cash": [-225875, -520039, -733162, -866871, -813403, -870125, -369958, 464238, 1929844, 3091880, 5519246, 8541019, 12302304],
+}
+
+# the jun13 page shows each stream's ARR as its quarter's revenue × 4
+JUN13 = {
+    "uk_rev": [125000, 164509, 216506, 284938, 750000, 987056, 1299038, 1709630, 2668920, 2778816, 2904413, 3030009, 3171304, 3312600],
+    "mat_rev": [0, 0, 350000, 681010, 994059, 1290123, 1850123, 2379738, 2880618, 3354320, 4026320, 4661858, 5262913, 5831356],
+    "us_rev": [0, 0, 0, 0, 0, 0, 100000, 600000, 1100000, 1600000, 2150000, 2900000, 3650000, 4400000],
+    "eal_rev": [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 3000000, 3900000, 5070000, 6591000],
+    "quarterly_rev": [31250, 41127, 141627, 241487, 436015, 569295, 812290, 1172342, 1662384, 1933284, 3020183, 3622967, 4288554, 5033739],
+    "cogs": [7656, 10076, 34699, 59164, 85023, 111012, 158397, 228607, 241046, 280326, 437927, 525330, 621840, 729892],
+    "payroll": [83375, 180006, 228691, 278318, 328900, 380452, 432988, 486523, 541070, 596646, 653264, 710939, 769688, 829526],
+    "operating_cash": [-258531, -349443, -334869, -321651, -227480, -188315, -574986, 117520, 481170, 624097, 1115733, 1750480, 2180306, 2667540],
+    "cumulative_cash": [-258531, -607974, -942843, -1264494, -1491974, -1680289, -2255275, -2137755, -1656585, -1032489, 83245, 1833724, 4014031, 6681571],
+}
+ANNUALISED = {"uk_rev", "mat_rev", "us_rev", "eal_rev"}
+
+
+def model_year(name: str):
+    preset = load_preset(name)
+    return run_forecast({**preset["params"], "uk_pricing_mode": "model_year"}, preset["quarters"])
+
+
+@pytest.mark.parametrize("name, expected", [("dataroom", DATAROOM), ("jun13", JUN13)])
+def test_model_year_matches_baseline(name, expected):
+    result = model_year(name)
+    for line, values in expected.items():
+        got = result[line][0] * (4 if line in ANNUALISED else 1)
+        np.testing.assert_allclose(got, values, atol=0.5, err_msg=f"{name}: {line}")
+
+
+def test_float32_results_keep_lines_and_precision():
+    preset = load_preset("dataroom")
+    params = {**preset["params"], "hyper_growth_factor": np.linspace(3, 5, 8)}
+    full = run_forecast(params, preset["quarters"])
+    compact = run_forecast(params, preset["quarters"], dtype=np.float32)
+    assert list(compact) == list(full)
+    for line, values in compact.items():
+        assert values.dtype == np.float32 and values.shape == (8, len(preset["quarters"]))
+        np.testing.assert_allclose(values, full[line], rtol=1e-6, atol=1e-2, err_msg=line)
+
+
+# ── UK pricing by vintage ──
+
+def test_model_year_is_the_default():
+    preset = load_preset("dataroom")
+    assert DEFAULTS["uk_pricing_mode"] == "model_year"
+    result = run_forecast(preset["params"], preset["quarters"])
+    for line in ("uk_arr", "cumulative_cash"):
+        np.testing.assert_allclose(result[line][0], DATAROOM[line], atol=0.5)
+
+
+def test_vintages_sum_to_vintage_revenue():
+    preset = load_preset("dataroom")
+    params = {**preset["params"], "uk_pricing_mode": "vintage"}
+    T = len(preset["quarters"])
+    cohorts = uk_vintages(params, T)
+    result = run_forecast(params, preset["quarters"])
+    assert cohorts["revenue"].shape == (1, T, T)
+    np.testing.assert_allclose(cohorts["revenue"].sum(axis=1), result["uk_rev"])
+    np.testing.assert_allclose(cohorts["schools"].sum(axis=1)[0, -1], result["uk_schools"][0, -1], atol=1)
+    assert (np.triu(cohorts["schools"][0]) == cohorts["schools"][0]).all()     # no school before it joins
+    assert (result["uk_rev"] <= run_forecast(preset["params"], preset["quarters"])["uk_rev"] + 1e-6).all()
+
+
+# ── sampled MAT churn ──
+
+def test_sampled_churn_without_churn_is_the_expected_path():
+    preset = load_preset("dataroom")
+    p, T = {**preset["params"], "mat_annual_churn": 0.0}, len(preset["quarters"])
+    expected = calc_mat_revenue(p, T)
+    sampled = calc_mat_revenue_stochastic(p, T, np.random.default_rng(0), draws=50)
+    for want, got in zip(expected, sampled):
+        np.testing.assert_allclose(np.broadcast_to(want, got.shape), got)
+    np.testing.assert_allclose(run_forecast(p, preset["quarters"], rng=np.random.default_rng(1))["total_arr"],
+                               run_forecast(p, preset["quarters"])["total_arr"])
+
+
+def test_sampled_churn_averages_to_the_expected_path():
+    preset = load_preset("dataroom")
+    p, T = preset["params"], len(preset["quarters"])
+    _, _, revenue, active = calc_mat_revenue(p, T)
+    _, _, sampled, mats = calc_mat_revenue_stochastic(p, T, np.random.default_rng(0), draws=20_000)
+    assert (mats == np.floor(mats)).all()
+    np.testing.assert_allclose(sampled.mean(axis=0), revenue[0], rtol=0.01)
+    bands = mat_churn_quantiles(p, preset["quarters"], draws=5_000)
+    assert (bands["active_mats"][0] <= bands["active_mats"][2]).all()
+    assert (bands["active_mats"][2] <= calc_mat_revenue({**p, "mat_annual_churn": 0.0}, T)[3][0]).all()
+
+
+# ── pricing schedules ──
+
+def test_annual_price_follows_the_bands():
+    schedule = {"from": [0, 4, 8], "price": [5, 10, 15]}
+    np.testing.assert_array_equal(annual_price(schedule, np.arange(10)), [5] * 4 + [10] * 4 + [15] * 2)
+    batch = {"from": [0, 4, 8], "price": [[5, 10, 15], [1, 2, 3]]}
+    np.testing.assert_array_equal(annual_price(batch, np.array([0, 5, 9])), [[5, 10, 15], [1, 2, 3]])
+
+
+@pytest.mark.parametrize("schedule, message", [
+    ({"from": [0, 4], "price": [1, 2, 3]}, "prices of shape"),
+    ({"from": [0, 4], "price": [[1, 2, 3]]}, "prices of shape"),
+    ({"from": [4, 8], "price": [1, 2]}, "start at tenure 0"),
+    ({"from": [0, 8, 4], "price": [1, 2, 3]}, "strictly ascending"),
+    ({"from": [0, 4, 4], "price": [1, 2, 3]}, "strictly ascending"),
+    ({"from": [], "price": []}, "non-empty"),
+])
+def test_invalid_schedules_are_rejected(schedule, message):
+    preset = load_preset("dataroom")
+    with pytest.raises(ValueError, match=message):
+        run_forecast({**preset["params"], "pricing": {"mat_school": schedule}}, preset["quarters"])
+
+
+# ── headcount plans ──
+
+def test_levers_plan_reproduces_lever_payroll():
+    preset = load_preset("dataroom")
+    p, qtrs = preset["params"], preset["quarters"]
+    plan = {**p, "headcount_plan": headcount_plan(levers_plan(p, len(qtrs)))}
+    for line in ("headcount", "payroll"):
+        np.testing.assert_allclose(run_forecast(plan, qtrs)[line], run_forecast(p, qtrs)[line])
+
+
+def test_blank_plan_cells_take_defaults():
+    plan = headcount_plan([{"role": "CTO", "start": 0, "salary": 120_000},
+                           {"role": "Eng", "start": 2, "salary": 80_000, "count": 2, "on_cost": 1.2}])
+    np.testing.assert_array_equal(plan["count"], [1, 2])
+    np.testing.assert_array_equal(plan["on_cost"], [ON_COST, 1.2])
+
+
+def test_align_plans_mixes_plan_and_lever_scenarios():
+    preset = load_preset("dataroom")
+    base, qtrs = preset["params"], preset["quarters"]
+    plan = headcount_plan([{"role": "CTO", "start": 0, "salary": 120_000},
+                           {"role": "Eng", "start": 2, "salary": 80_000, "count": 2}])
+    scenarios = [base, {**base, "headcount_plan": plan}, {**base, "quarterly_hires": 3}]
+    aligned = align_plans(scenarios, len(qtrs))
+    lengths = {len(s["headcount_plan"][c]) for s in aligned for c in s["headcount_plan"]}
+    assert len(lengths) == 1
+    assert align_plans([base, base], len(qtrs)) == [base, base]          # no plans: left alone
+    batch = run_forecast(stack_params(aligned), qtrs)
+    for k, s in enumerate(scenarios):
+        np.testing.assert_allclose(batch["payroll"][k], run_forecast(s, qtrs)["payroll"][0])
+
+
+# ── runway ──
+
+def test_runway_on_a_known_cash_series():
+    # operating cash -30k, -60k, +20k, +50k on top of 100k opening cash
+    cum = np.array([[-30_000, -90_000, -70_000, -20_000],
+                    [10_000, 20_000, 30_000, 40_000]], dtype=float)
+    out = runway(cum, opening_cash=[100_000, 0])
+    np.testing.assert_array_equal(out["first_negative_quarter"], [-1, -1])
+    np.testing.assert_array_equal(out["min_cash"], [10_000, 10_000])
+    np.testing.assert_array_equal(out["min_cash_quarter"], [1, 0])
+    np.testing.assert_array_equal(out["breakeven_quarter"], [2, 0])
+    np.testing.assert_allclose(out["runway_months"], [10.0, np.inf])      # 100k at 10k a month
+    assert np.isinf(out["cash_out_months"]).all()
+
+
+def test_cash_out_is_interpolated_within_the_quarter():
+    out = runway(np.array([-30_000.0, -90_000, -150_000]), opening_cash=60_000)
+    assert out["first_negative_quarter"][0] == 1                           # balance 30k, -30k, -90k
+    np.testing.assert_allclose(out["cash_out_months"], [4.5])             # 30k left of a 60k outflow
+    assert out["breakeven_quarter"][0] == -1
+    np.testing.assert_allclose(runway(np.array([-30_000.0]), 0.0)["cash_out_months"], [0.0])
+
+
+# ── stack_params ──
+
+def test_stack_params_matches_single_runs():
+    preset = load_preset("dataroom")
+    base = preset["params"]
+    pricing = {"uk_school": {"from": [0, 4, 8], "price": [6000, 12000, 18000]}}
+    scenarios = [
+        base,
+        {**base, "hyper_growth_factor": base["hyper_growth_factor"] * 1.5},
+        {**base, "pricing": pricing},
+    ]
+    batch = run_forecast(stack_params(scenarios), preset["quarters"])
+    for k, s in enumerate(scenarios):
+        single = run_forecast(s, preset["quarters"])
+        for line in ("total_arr", "cumulative_cash"):
+            np.testing.assert_allclose(batch[line][k], single[line][0])
+
+
+def test_stack_params_fills_missing_levers_from_defaults():
+    stacked = stack_params([{"hyper_growth_factor": 2.0}, {"mat_conversion_rate": 0.3}])
+    np.testing.assert_array_equal(stacked["hyper_growth_factor"], [2.0, DEFAULTS["hyper_growth_factor"]])
+    np.testing.assert_array_equal(stacked["mat_conversion_rate"], [DEFAULTS["mat_conversion_rate"], 0.3])
+
+
+def test_stack_params_completes_pricing():
+    segment = next(iter(PRICING))
+    stacked = stack_params([{}, {"pricing": {}}, {"pricing": {segment: PRICING[segment]}}])
+    assert set(stacked["pricing"]) == set(PRICING)
+
+
+@pytest.mark.parametrize("scenarios", [
+    [],
+    [{"no_such_lever": 1}],
+    [{"headcount_plan": {}}, {}],
+])
+def test_stack_params_rejects(scenarios):
+    with pytest.raises(ValueError):
+        stack_params(scenarios)
@@ -0,0 +1,31 @@
+"""monte_carlo: reproducible draws whatever the worker count."""
+
+import numpy as np
+import pytest
+
+from forecast_engine import timeline
+from monte_carlo import EXAMPLE_SPEC, quantile_bands, simulate
+
+RUN = dict(draws=1_000, num_quarters=6, chunk=150, seed=7)
+
+
+def test_results_do_not_depend_on_worker_count():
+    with simulate(EXAMPLE_SPEC, workers=1, **RUN) as one, simulate(EXAMPLE_SPEC, workers=3, **RUN) as three:
+        np.testing.assert_array_equal(one.values, three.values)
+        np.testing.assert_allclose(one.line_stats("cumulative_cash")["mean"],
+                                   three.line_stats("cumulative_cash")["mean"])
+        np.testing.assert_allclose(one.quantiles("total_arr"), three.quantiles("total_arr"))
+        assert one.values.shape == (1_000, 6, 3)
+
+
+def test_seed_changes_the_draws():
+    with simulate(EXAMPLE_SPEC, workers=1, **RUN) as a, simulate(EXAMPLE_SPEC, workers=1, **{**RUN, "seed": 8}) as b:
+        assert not np.array_equal(a.values, b.values)
+
+
+@pytest.mark.parametrize("draws", [0, -5])
+def test_draws_must_be_positive(draws):
+    with pytest.raises(ValueError, match="at least 1"):
+        simulate(EXAMPLE_SPEC, draws)
+    with pytest.raises(ValueError, match="at least 1"):
+        quantile_bands(EXAMPLE_SPEC, draws, {}, timeline(num_quarters=4))
@@ -0,0 +1,89 @@
+"""portfolio_data loading, reasons and pupil search."""
+
+import pandas as pd
+import pytest
+
+from portfolio_data import PupilIndex, load_judgements, load_portfolio, reason_cells
+
+COLUMNS = ["Pupil Name", "Judgement (%)", "KS2 Standard", "KS2 Statement",
+           "Purpose", "Criterion", "🤖 REASON", "criteria guidance"]
+
+
+def export(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+    return str(path)
+
+
+def row(pupil, purpose, criterion, judgement="50%", reason="ok"):
+    return [pupil, judgement, "Reading", "S1", purpose, criterion, reason, f"guide {criterion}"]
+
+
+@pytest.fixture
+def school(tmp_path):
+    return export(tmp_path / "Oakfield.csv", [
+        row("Amy Jones", "Inform", "C1", "40%", "short"),
+        row("Amy Jones", "Inform", "C1", "60%", "clear"),
+        row("Amy Jones", "Inform", "C1", "60%", "short"),          # repeat: kept once
+        row("Amy Jones", "Entertain", "C1", "", None),
+        row("Ben Amis", "Inform", "C2", "80%", "clear"),
+    ])
+
+
+def test_labels_load_as_categoricals(school):
+    df = load_judgements(school)
+    assert isinstance(df["🤖 REASON"].dtype, pd.CategoricalDtype)
+    assert "School" not in df
+    assert df["Judgement_num"].fillna(-1).tolist() == [40, 60, 60, -1, 80]
+
+
+def test_reason_cells_join_distinct_reasons_in_order(school):
+    reasons = reason_cells(load_judgements(school))
+    assert reasons.loc[("Amy Jones", "Reading", "S1", "C1", "Inform")] == "short | clear"
+    assert reasons.loc[("Ben Amis", "Reading", "S1", "C2", "Inform")] == "clear"
+    assert ("Amy Jones", "Reading", "S1", "C1", "Entertain") not in reasons.index
+
+
+def test_several_exports_are_tagged_and_share_categories(tmp_path, school):
+    export(tmp_path / "Elm Park.csv", [row("Cara Zane", "Persuade", "C9", "70%", "new reason")])
+    df = load_portfolio(str(tmp_path))
+    assert df["School"].value_counts().to_dict() == {"Oakfield": 5, "Elm Park": 1}
+    for col in ("Purpose", "Criterion", "🤖 REASON"):
+        assert isinstance(df[col].dtype, pd.CategoricalDtype)
+    assert {"C1", "C2", "C9"} <= set(df["Criterion"].cat.categories)
+    assert df.loc[df["Pupil Name"] == "Cara Zane", "🤖 REASON"].tolist() == ["new reason"]
+
+
+def test_an_exports_own_school_column_wins(tmp_path, school):
+    path = export(tmp_path / "district.csv", [row("Cara Zane", "Inform", "C1")])
+    pd.read_csv(path).assign(School="Birch").to_csv(path, index=False)
+    df = load_portfolio(str(tmp_path / "*.csv"))
+    assert set(df["School"]) == {"Oakfield", "Birch"}
+
+
+# ── pupil search ──
+
+@pytest.fixture
+def index():
+    return PupilIndex(pd.DataFrame({
+        "Pupil Name": ["Zoe Adams", "Amy Jones", "Ben Amis", "Amy Jones", "Cara Zane"],
+        "School": ["Elm", "Oak", "Oak", "Elm", "Elm"],
+    }))
+
+
+def test_search_matches_any_word_start(index):
+    assert index.search("am") == ["Ben Amis", "Amy Jones"]      # "amis" < "amy jones"
+    assert index.search("ZA") == ["Cara Zane"]
+    assert index.search("amy  jo") == ["Amy Jones"]
+    assert index.search("nobody") == []
+
+
+def test_empty_prefix_lists_full_names_in_order(index):
+    assert index.search("") == ["Amy Jones", "Ben Amis", "Cara Zane", "Zoe Adams"]
+    assert index.search("", limit=2) == ["Amy Jones", "Ben Amis"]
+
+
+def test_search_filters_on_scope(index):
+    assert index.search("", School="Oak") == ["Amy Jones", "Ben Amis"]
+    assert index.search("a", School="Elm") == ["Zoe Adams", "Amy Jones"]
+    assert index.search("", School=None) == index.search("")
+    assert index.scope_values("School") == ["Elm", "Oak"]
@@ -0,0 +1,35 @@
+"""portfolio_export file naming and per-school grouping."""
+
+import pandas as pd
+
+from portfolio_export import NO_SCHOOL, _filenames, export
+
+
+def test_filenames_are_unique_per_school_and_pupil():
+    keys = [("Oak field", "Amy Jones"), ("Oakfield", "Amy Jones"), ("Oak_field", "Amy  Jones"),
+            ("Elm", "amy jones"), ("Elm", "Amy Jones"), ("Elm", "???")]
+    names = _filenames(keys, "html")
+    assert names == ["Oak_field_Amy_Jones.html", "Oakfield_Amy_Jones.html", "Oak_field_Amy_Jones-2.html",
+                     "Elm_amy_jones.html", "Elm_Amy_Jones-2.html", "Elm_pupil.html"]
+    assert len({n.casefold() for n in names}) == len(names)
+
+
+def test_filenames_without_schools():
+    assert _filenames([(None, "Amy Jones"), (None, "Amy-Jones")], "pdf") == ["Amy_Jones.pdf", "Amy-Jones.pdf"]
+
+
+def test_export_keeps_pupils_without_a_school(tmp_path, capsys):
+    rows = [
+        [pupil, "50%", "Reading", "S1", "Inform", "C1", "ok", "guide", school]
+        for pupil, school in [("Amy Jones", "Oak"), ("Amy Jones", "Elm"), ("Ben Amis", None)]
+    ]
+    src = tmp_path / "district.csv"
+    pd.DataFrame(rows, columns=["Pupil Name", "Judgement (%)", "KS2 Standard", "KS2 Statement",
+                                "Purpose", "Criterion", "🤖 REASON", "criteria guidance",
+                                "School"]).to_csv(src, index=False)
+    out = tmp_path / "reports"
+    assert export(str(src), str(out), workers=1) == 3
+    assert sorted(p.name for p in out.iterdir()) == [
+        "Elm_Amy_Jones.html", "No_school_Ben_Amis.html", "Oak_Amy_Jones.html"]
+    assert NO_SCHOOL in capsys.readouterr().err
+    assert "Amy Jones (Oak)" in (out / "Oak_Amy_Jones.html").read_text(encoding="utf-8")
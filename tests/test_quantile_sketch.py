@@ -0,0 +1,63 @@
+"""QuantileSketch accuracy and merging."""
+
+import numpy as np
+import pytest
+
+from quantile_sketch import QuantileSketch
+
+Q = (0.05, 0.1, 0.5, 0.9, 0.95)
+
+
+def rank_error(sketch, values):
+    """Worst |empirical rank − q| of the sketch's estimates, per cell."""
+    est = sketch.quantile(Q)                                  # (len(Q), *cells)
+    ranks = (np.sort(values, axis=0)[None] <= est[:, None]).mean(axis=1)
+    return np.abs(ranks - np.reshape(Q, (-1,) + (1,) * (ranks.ndim - 1))).max()
+
+
+def test_rank_error_is_small():
+    rng = np.random.default_rng(0)
+    values = np.stack([rng.normal(size=50_000), rng.lognormal(size=50_000), rng.uniform(size=50_000)], axis=1)
+    sketch = QuantileSketch.of(values)
+    assert rank_error(sketch, values) < 2e-3
+    np.testing.assert_array_equal(sketch.quantile(0.0), values.min(axis=0))
+    np.testing.assert_array_equal(sketch.quantile(1.0), values.max(axis=0))
+
+
+def test_merged_chunks_match_one_pass():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(size=(60_000, 4, 3))
+    whole = QuantileSketch.of(values)
+    merged = QuantileSketch((4, 3))
+    for chunk in np.array_split(values, 7):
+        merged.merge(QuantileSketch.of(chunk))
+    assert merged.count == whole.count == len(values)
+    assert merged.weights.shape[1] <= merged.slots
+    assert rank_error(merged, values) < 2e-3
+    np.testing.assert_allclose(merged.quantile(Q), whole.quantile(Q), rtol=0.02)
+
+
+def test_update_and_merge_agree():
+    rng = np.random.default_rng(2)
+    a, b = rng.normal(size=(2, 10_000, 5))
+    updated = QuantileSketch.of(a).update(b)
+    merged = QuantileSketch.of(a).merge(QuantileSketch.of(b))
+    np.testing.assert_allclose(updated.quantile(Q), merged.quantile(Q))
+
+
+def test_empty_sketch_is_nan():
+    sketch = QuantileSketch((2, 3))
+    assert np.isnan(sketch.quantile(Q)).all()
+    assert sketch.quantile(0.5).shape == (2, 3)
+    assert sketch.merge(QuantileSketch((2, 3))).count == 0
+
+
+@pytest.mark.parametrize("other", [QuantileSketch((3,)), QuantileSketch((2,), compression=100)])
+def test_merge_rejects_mismatched_sketches(other):
+    with pytest.raises(ValueError):
+        QuantileSketch((2,)).merge(other)
+
+
+def test_update_rejects_wrong_shape():
+    with pytest.raises(ValueError):
+        QuantileSketch((2,)).update(np.zeros((10, 3)))
@@ -0,0 +1,54 @@
+"""ScenarioStore persistence and result keys."""
+
+import numpy as np
+import pytest
+
+import scenario_store
+from forecast_engine import load_preset, run_forecast
+from scenario_store import ScenarioStore, result_key
+from shared_cache import SharedCache
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ScenarioStore(str(tmp_path))
+
+
+def test_scenarios_round_trip(store, tmp_path):
+    params = {"hyper_growth_factor": np.float64(3.5), "ramp": np.array([1, 2])}
+    store.save("Board deck", params)
+    store.save("Aardvark", {})
+    assert store.names() == ["Aardvark", "Board deck"]
+    assert ScenarioStore(str(tmp_path)).load("Board deck") == {"hyper_growth_factor": 3.5, "ramp": [1, 2]}
+    store.delete("Board deck")
+    with pytest.raises(KeyError):
+        store.load("Board deck")
+
+
+def test_results_are_computed_once_and_survive_restarts(store, tmp_path):
+    preset = load_preset("dataroom")
+    calls = []
+
+    def compute(params, qtrs):
+        calls.append(1)
+        return run_forecast(params, qtrs)
+
+    first = store.cached(preset["params"], preset["quarters"], compute)
+    again = ScenarioStore(str(tmp_path), memory=SharedCache(2**24))
+    second = again.cached(preset["params"], preset["quarters"], compute)
+    again.cached(preset["params"], preset["quarters"], compute)
+    assert len(calls) == 1
+    assert again.memory.stats()["hits"] == 1
+    np.testing.assert_array_equal(first["total_arr"], second["total_arr"])
+
+
+def test_result_key_depends_on_everything(monkeypatch):
+    params, qtrs = {"a": 1, "b": [1, 2]}, ["Q1 2026", "Q2 2026"]
+    key = result_key(params, qtrs)
+    assert key == result_key({"b": [1, 2], "a": 1}, qtrs)
+    assert key == result_key({"a": np.int64(1), "b": np.array([1, 2])}, qtrs)
+    assert key != result_key({**params, "a": 2}, qtrs)
+    assert key != result_key(params, qtrs[:1])
+    assert key != result_key(params, qtrs, kind="fan")
+    monkeypatch.setattr(scenario_store, "ENGINE_VERSION", scenario_store.ENGINE_VERSION + 1)
+    assert key != result_key(params, qtrs)
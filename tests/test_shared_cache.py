@@ -0,0 +1,76 @@
+"""SharedCache LRU eviction and accounting."""
+
+import threading
+
+import numpy as np
+
+from shared_cache import SharedCache
+
+
+def block(kb: int) -> np.ndarray:
+    return np.zeros(kb * 128)                     # kb KiB of float64
+
+
+def test_evicts_least_recently_used_within_budget():
+    cache = SharedCache(3 * 1024)
+    for key in "abc":
+        cache.put(key, block(1))
+    cache.get("a")                                # a is now the most recent
+    cache.put("d", block(1))
+    assert cache.get("b") is None
+    assert all(cache.get(k) is not None for k in "acd")
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["bytes"] == 3 * 1024
+    assert stats["evictions"] == 1
+
+
+def test_large_entry_evicts_several():
+    cache = SharedCache(4 * 1024)
+    for key in "abcd":
+        cache.put(key, block(1))
+    cache.put("big", block(3))
+    assert cache.stats()["evictions"] == 3
+    assert cache.get("d") is not None and cache.get("big") is not None
+
+
+def test_oversize_values_are_not_kept():
+    cache = SharedCache(1024)
+    cache.put("a", block(1))
+    value = cache.put("huge", block(2))
+    assert value.shape == (256,)
+    assert cache.get("huge") is None and cache.get("a") is not None
+    assert cache.stats()["oversize"] == 1
+
+
+def test_replacing_a_key_keeps_byte_count():
+    cache = SharedCache(4 * 1024)
+    cache.put("a", block(1))
+    cache.put("a", block(2))
+    assert cache.stats()["bytes"] == 2 * 1024 and cache.stats()["entries"] == 1
+
+
+def test_values_are_frozen():
+    cache = SharedCache(1024)
+    value = cache.put("a", {"x": block(1)})
+    assert not value["x"].flags.writeable
+
+
+def test_get_or_compute_computes_once():
+    cache = SharedCache(1024)
+    calls = []
+    gate = threading.Event()
+
+    def compute():
+        calls.append(1)
+        gate.wait(1)
+        return block(1)
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=("k", compute)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 3